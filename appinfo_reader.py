@@ -0,0 +1,366 @@
+import os
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+
+# appinfo.vdf layout (little-endian):
+#
+#   header   u32 magic, u32 universe, and from v29 on an i64 offset of the
+#            string table at the end of the file
+#   entries  u32 appid (0 ends the list), u32 size of the rest of the entry,
+#            ENTRY_HEADER_SIZE bytes of change info, then the app's binary
+#            KeyValues up to the end of the entry
+#   strings  v29 only: u32 count, then that many NUL-terminated key names.
+#            Binary KeyValues keys are u32 indexes into it instead of inline
+#            NUL-terminated strings.
+MAGIC_V27 = 0x07564427
+MAGIC_V28 = 0x07564428
+MAGIC_V29 = 0x07564429
+# info state, last updated, PICS token, text SHA-1, change number; v28 added
+# the SHA-1 of the binary data
+ENTRY_HEADER_SIZE = {MAGIC_V27: 40, MAGIC_V28: 60, MAGIC_V29: 60}
+
+# Binary KeyValues type bytes
+KV_MAP = 0x00
+KV_STRING = 0x01
+KV_INT32 = 0x02
+KV_FLOAT32 = 0x03
+KV_POINTER = 0x04
+KV_WIDE_STRING = 0x05
+KV_COLOR = 0x06
+KV_UINT64 = 0x07
+KV_END = 0x08
+KV_INT64 = 0x0A
+KV_END_ALT = 0x0B
+
+_U32 = struct.Struct("<I")
+_ENTRY = struct.Struct("<II")
+_SCALARS = {
+    KV_INT32: struct.Struct("<i"),
+    KV_FLOAT32: struct.Struct("<f"),
+    KV_POINTER: struct.Struct("<i"),
+    KV_COLOR: struct.Struct("<i"),
+    KV_UINT64: struct.Struct("<Q"),
+    KV_INT64: struct.Struct("<q"),
+}
+
+INDEX_FILE = os.path.join(os.path.dirname(__file__), "appinfo_index.bin")
+_INDEX_MAGIC = b"GSAI"
+_INDEX_VERSION = 1
+# index magic, index version, appinfo magic, appinfo mtime_ns, appinfo size, app count, path length
+_INDEX_HEADER = struct.Struct("<4sHIqQIH")
+
+class AppInfoReader:
+    """
+    Selective reader for Steam's binary appcache/appinfo.vdf.
+
+    The file is memory-mapped. Opening it only walks the per-app entry
+    headers to find where each app's data starts (or reuses the offsets
+    saved for this mtime and size), and get() decodes just the app asked
+    for, so looking up a few apps never reads the rest of the file.
+    """
+    def __init__(self, path, index_file=INDEX_FILE):
+        self.path = path
+        self.index_file = index_file
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.magic, self.universe = struct.unpack_from("<II", self._map, 0)
+            if self.magic not in ENTRY_HEADER_SIZE:
+                raise ValueError(f"Unsupported appinfo.vdf version 0x{self.magic:08x}")
+            if self.magic >= MAGIC_V29:
+                self._entries_offset = 16
+                self._string_table_offset = struct.unpack_from("<q", self._map, 8)[0]
+            else:
+                self._entries_offset = 8
+                self._string_table_offset = None
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"{path} is not a readable appinfo.vdf: {e}")
+        except BaseException:
+            self.close()
+            raise
+        self._strings = None
+        stat_result = os.fstat(self._file.fileno())
+        self._stamp = (self.magic, stat_result.st_mtime_ns, stat_result.st_size)
+        if not self._load_index():
+            self._build_index()
+            self._save_index()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._appids)
+
+    def __contains__(self, appid):
+        return self._offset(appid) is not None
+
+    def app_ids(self):
+        return list(self._appids)
+
+    def get(self, appid, default=None):
+        """
+        Returns the app's KeyValues ("common", "extended", "config", ...), or
+        default if the app is not in the file.
+        """
+        offset = self._offset(appid)
+        if offset is None:
+            return default
+        size = _ENTRY.unpack_from(self._map, offset)[1]
+        start = offset + _ENTRY.size + ENTRY_HEADER_SIZE[self.magic]
+        data = self._read_kv(start, offset + _ENTRY.size + size)
+        return data.get("appinfo", data)
+
+    def _offset(self, appid):
+        appid = int(appid)
+        position = bisect_left(self._appids, appid)
+        if position < len(self._appids) and self._appids[position] == appid:
+            return self._offsets[position]
+        return None
+
+    def _build_index(self):
+        entries = []
+        position = self._entries_offset
+        end = self._string_table_offset or len(self._map)
+        while position + _ENTRY.size <= end:
+            appid, size = _ENTRY.unpack_from(self._map, position)
+            if appid == 0:
+                break
+            entries.append((appid, position))
+            position += _ENTRY.size + size
+        entries.sort()
+        self._appids = array("I", (appid for appid, _ in entries))
+        self._offsets = array("Q", (offset for _, offset in entries))
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, "rb") as f:
+                data = f.read()
+            (magic, version, appinfo_magic, mtime_ns, size, count,
+             path_length) = _INDEX_HEADER.unpack_from(data, 0)
+        except (OSError, struct.error):
+            return False
+        position = _INDEX_HEADER.size
+        path = data[position:position + path_length].decode("utf-8", errors="replace")
+        if (magic != _INDEX_MAGIC or version != _INDEX_VERSION or (appinfo_magic, mtime_ns, size) != self._stamp
+                or path != os.path.abspath(self.path)):
+            return False
+        position += path_length
+        appids = array("I")
+        offsets = array("Q")
+        appids.frombytes(data[position:position + count * appids.itemsize])
+        position += count * appids.itemsize
+        offsets.frombytes(data[position:position + count * offsets.itemsize])
+        if len(appids) != count or len(offsets) != count:
+            return False
+        self._appids = appids
+        self._offsets = offsets
+        return True
+
+    def _save_index(self):
+        # Local import: library_persistence is only needed when the index changes
+        from library_persistence import atomic_write_bytes
+        path = os.path.abspath(self.path).encode("utf-8")
+        header = _INDEX_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, *self._stamp, len(self._appids), len(path))
+        try:
+            atomic_write_bytes(self.index_file, [header, path, self._appids.tobytes(), self._offsets.tobytes()])
+        except OSError as e:
+            print(f"Error saving appinfo index: {e}")
+
+    def _string_table(self):
+        # Depot ids are keys too, so the table can hold hundreds of thousands
+        # of strings; they are split in one go and only decoded when used.
+        if self._strings is None:
+            count = _U32.unpack_from(self._map, self._string_table_offset)[0]
+            self._strings = self._map[self._string_table_offset + 4:].split(b"\0", count)[:count]
+        return self._strings
+
+    def _key(self, strings, index):
+        key = strings[index]
+        if type(key) is bytes:
+            key = strings[index] = key.decode("utf-8", errors="replace")
+        return key
+
+    def _read_cstring(self, position):
+        end = self._map.find(b"\0", position)
+        if end < 0:
+            raise ValueError("Unterminated string in appinfo.vdf")
+        return self._map[position:end].decode("utf-8", errors="replace"), end + 1
+
+    def _read_kv(self, position, end):
+        strings = self._string_table() if self._string_table_offset is not None else None
+        root = {}
+        stack = [root]
+        data = self._map
+        while position < end:
+            kind = data[position]
+            position += 1
+            if kind == KV_END or kind == KV_END_ALT:
+                if len(stack) == 1:
+                    break
+                stack.pop()
+                continue
+            if strings is not None:
+                key = self._key(strings, _U32.unpack_from(data, position)[0])
+                position += 4
+            else:
+                key, position = self._read_cstring(position)
+            if kind == KV_MAP:
+                block = {}
+                stack[-1][key] = block
+                stack.append(block)
+            elif kind == KV_STRING:
+                stack[-1][key], position = self._read_cstring(position)
+            elif kind == KV_WIDE_STRING:
+                text_end = position
+                while data[text_end:text_end + 2] != b"\0\0":
+                    if text_end >= end:
+                        raise ValueError("Unterminated wide string in appinfo.vdf")
+                    text_end += 2
+                stack[-1][key] = data[position:text_end].decode("utf-16-le", errors="replace")
+                position = text_end + 2
+            elif kind in _SCALARS:
+                scalar = _SCALARS[kind]
+                stack[-1][key] = scalar.unpack_from(data, position)[0]
+                position += scalar.size
+            else:
+                raise ValueError(f"Unknown KeyValues type 0x{kind:02x} in appinfo.vdf")
+        return root
+
+def _encode_kv(data, key_id):
+    """
+    Binary KeyValues for a dict of dicts, strings and ints. key_id turns a
+    key into its encoded form (inline string or string table index).
+    """
+    out = bytearray()
+    for key, value in data.items():
+        if isinstance(value, dict):
+            out += bytes([KV_MAP]) + key_id(key) + _encode_kv(value, key_id)
+        elif isinstance(value, int):
+            out += bytes([KV_INT32]) + key_id(key) + struct.pack("<i", value)
+        else:
+            out += bytes([KV_STRING]) + key_id(key) + value.encode("utf-8") + b"\0"
+    out.append(KV_END)
+    return bytes(out)
+
+def write_appinfo(path, apps, magic=MAGIC_V29):
+    """
+    Writes {appid: keyvalues} as an appinfo.vdf. Only used to build the
+    benchmark's and the tests' synthetic files.
+    """
+    strings = {}
+
+    def key_id(key):
+        if magic < MAGIC_V29:
+            return key.encode("utf-8") + b"\0"
+        return _U32.pack(strings.setdefault(key, len(strings)))
+
+    header_size = ENTRY_HEADER_SIZE[magic]
+    with open(path, "wb") as f:
+        f.write(struct.pack("<II", magic, 1))
+        if magic >= MAGIC_V29:
+            f.write(struct.pack("<q", 0))
+        for appid, keyvalues in apps.items():
+            body = bytes(header_size) + _encode_kv({"appinfo": keyvalues}, key_id)
+            f.write(_ENTRY.pack(appid, len(body)) + body)
+        f.write(_U32.pack(0))
+        if magic >= MAGIC_V29:
+            string_table_offset = f.tell()
+            f.write(_U32.pack(len(strings)))
+            for key in strings:
+                f.write(key.encode("utf-8") + b"\0")
+            f.seek(8)
+            f.write(struct.pack("<q", string_table_offset))
+
+def _synthetic_app(appid):
+    return {
+        "appid": appid,
+        "common": {
+            "name": f"Synthetic Game {appid}",
+            "type": "Game",
+            "oslist": "windows,linux",
+            "releasestate": "released",
+            "associations": {str(i): {"type": "developer", "name": f"Studio {appid % 700}"} for i in range(3)},
+            "category": {f"category_{i}": 1 for i in range(12)},
+        },
+        "extended": {
+            "developer": f"Studio {appid % 700}",
+            "publisher": f"Publisher {appid % 90}",
+            "genres": "Action",
+            "gamedescription": "A synthetic description. " * 20,
+        },
+        "config": {
+            "installdir": f"Synthetic Game {appid}",
+            "launch": {str(i): {"executable": f"bin/game{i}.exe", "arguments": "-windowed"} for i in range(3)},
+        },
+        "depots": {str(appid + i): {"manifests": {"public": str(appid * 7919 + i)}} for i in range(1, 5)},
+    }
+
+def _measure(mode, appinfo_path, index_file, appids):
+    """
+    Returns (seconds, RSS growth in bytes) of reading `appids` the given way.
+    """
+    import time
+    import psutil
+
+    process = psutil.Process()
+    before = process.memory_info().rss
+    start = time.perf_counter()
+    if mode == "full":
+        # Decode every app, as a whole-file load does
+        with AppInfoReader(appinfo_path, index_file) as reader:
+            everything = {appid: reader.get(appid) for appid in reader.app_ids()}
+        details = [everything[appid] for appid in appids]
+    else:
+        with AppInfoReader(appinfo_path, index_file) as reader:
+            details = [reader.get(appid) for appid in appids]
+    return time.perf_counter() - start, process.memory_info().rss - before
+
+if __name__ == "__main__":
+    # Time and RSS of looking up a few apps: decoding the whole file vs the
+    # offset index built on first open vs the index saved by the last run.
+    #   python appinfo_reader.py [path to appinfo.vdf]   synthetic v29 file if omitted
+    import subprocess
+    import sys
+    import tempfile
+
+    if len(sys.argv) == 6 and sys.argv[1] == "--measure":
+        appids = [int(appid) for appid in sys.argv[5].split(",")]
+        print(*_measure(sys.argv[2], sys.argv[3], sys.argv[4], appids))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if len(sys.argv) > 1:
+            appinfo_path = sys.argv[1]
+        else:
+            appinfo_path = os.path.join(directory, "appinfo.vdf")
+            write_appinfo(appinfo_path, {appid: _synthetic_app(appid) for appid in range(10, 200_010, 5)})
+        index_file = os.path.join(directory, "appinfo_index.bin")
+        with AppInfoReader(appinfo_path, index_file) as reader:
+            all_appids = reader.app_ids()
+        os.remove(index_file)
+        lookup = ",".join(str(appid) for appid in all_appids[::max(1, len(all_appids) // 5)][:5])
+        print(f"{len(all_appids)} apps, {os.path.getsize(appinfo_path) / 2**20:.1f} MiB, looking up {lookup}")
+
+        print(f"{'read':>24} {'seconds':>9} {'RSS MiB':>9}")
+        for mode, label in (("full", "decode whole file"), ("indexed", "index built on open"),
+                            ("indexed", "saved index")):
+            if mode == "full" or label == "index built on open":
+                if os.path.exists(index_file):
+                    os.remove(index_file)
+            output = subprocess.run([sys.executable, __file__, "--measure", mode, appinfo_path, index_file, lookup],
+                                    capture_output=True, text=True, check=True).stdout
+            seconds, rss = output.split()
+            print(f"{label:>24} {float(seconds):>9.3f} {int(rss) / 2**20:>9.1f}")
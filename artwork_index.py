@@ -0,0 +1,210 @@
+import os
+import re
+import threading
+
+# Asset file names in appcache/librarycache/<appid>/, best first for each kind
+ASSET_FILES = (
+    ("library_hero.jpg", "hero"),
+    ("library_600x900.jpg", "grid"),
+    ("library_600x900_2x.jpg", "grid"),
+    ("library_header.jpg", "header"),
+    ("header.jpg", "header"),
+    ("logo.png", "logo"),
+    ("icon.jpg", "icon"),
+)
+_ASSET_RANK = {name: (kind, rank) for rank, (name, kind) in enumerate(ASSET_FILES)}
+# The icon is stored under the hash of its contents, e.g. 82afae56...faea.jpg
+_ICON_FILE = re.compile(r"[0-9a-f]{40}\.(?:jpg|png|ico)")
+# Older Steam clients keep everything in librarycache itself as <appid>_<name>
+_FLAT_FILE = re.compile(r"(\d+)_(.+)")
+
+def _add_asset(assets, ranks, kind, rank, path):
+    if kind not in ranks or rank < ranks[kind]:
+        assets[kind] = path
+        ranks[kind] = rank
+
+def _scan_app_dir(path, mtime_ns):
+    """
+    Returns {kind: path} for one librarycache/<appid> folder, whose mtime
+    is mtime_ns, and {folder: mtime_ns} of it and its subfolders. Files in
+    the subfolders (localized or per-user artwork) only fill in kinds the
+    folder itself lacks.
+    """
+    assets, ranks = {}, {}
+    subdirs = []
+    dir_mtimes = {path: mtime_ns}
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name.lower()
+                if name in _ASSET_RANK:
+                    kind, rank = _ASSET_RANK[name]
+                    _add_asset(assets, ranks, kind, rank, entry.path)
+                elif _ICON_FILE.fullmatch(name):
+                    _add_asset(assets, ranks, "icon", len(ASSET_FILES), entry.path)
+                elif entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+    except OSError:
+        return assets, dir_mtimes
+    nested_rank = len(ASSET_FILES) + 1
+    for subdir in subdirs:
+        try:
+            dir_mtimes[subdir] = os.stat(subdir).st_mtime_ns
+            with os.scandir(subdir) as entries:
+                for entry in entries:
+                    name = entry.name.lower()
+                    if name in _ASSET_RANK:
+                        kind, rank = _ASSET_RANK[name]
+                        _add_asset(assets, ranks, kind, nested_rank + rank, entry.path)
+        except OSError:
+            continue
+    return assets, dir_mtimes
+
+def _unchanged(dir_mtimes):
+    """
+    True if none of the folders has changed since: adding, removing or
+    replacing a file in a folder changes its mtime, but not its parent's.
+    """
+    for folder, mtime_ns in dir_mtimes.items():
+        try:
+            if os.stat(folder).st_mtime_ns != mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+class ArtworkIndex:
+    """
+    Maps appids to the artwork Steam has cached for them in
+    appcache/librarycache, so lookups are dictionary hits.
+
+    refresh lists librarycache once and rescans only the appid folders
+    whose mtime, or the mtime of one of their subfolders, changed since the
+    previous refresh; folders that are gone are dropped. A file rewritten
+    in place keeps its path, so the index stays correct without reading it
+    again.
+    """
+    def __init__(self, librarycache_path):
+        self.librarycache_path = librarycache_path
+        self._dirs = {} # appid -> ({folder: mtime_ns} of it and its subfolders, {kind: path})
+        self._flat = {} # appid -> {kind: path} from <appid>_<name> files
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Brings the index up to date. Returns the number of appid folders
+        that had to be scanned.
+        """
+        dirs = {}
+        flat, flat_ranks = {}, {}
+        scanned = 0
+        try:
+            with os.scandir(self.librarycache_path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    try:
+                        if name.isdigit() and entry.is_dir(follow_symlinks=False):
+                            mtime_ns = entry.stat(follow_symlinks=False).st_mtime_ns
+                            cached = self._dirs.get(name)
+                            if cached and cached[0].get(entry.path) == mtime_ns and _unchanged(cached[0]):
+                                dirs[name] = cached
+                            else:
+                                assets, dir_mtimes = _scan_app_dir(entry.path, mtime_ns)
+                                dirs[name] = (dir_mtimes, assets)
+                                scanned += 1
+                            continue
+                    except OSError:
+                        continue
+                    match = _FLAT_FILE.fullmatch(name.lower())
+                    if match and match.group(2) in _ASSET_RANK:
+                        appid = match.group(1)
+                        kind, rank = _ASSET_RANK[match.group(2)]
+                        _add_asset(flat.setdefault(appid, {}), flat_ranks.setdefault(appid, {}), kind, rank, entry.path)
+        except OSError as e:
+            print(f"Error reading Steam artwork cache {self.librarycache_path}: {e}")
+        with self._lock:
+            self._dirs = dirs
+            self._flat = flat
+        return scanned
+
+    def get(self, appid):
+        """
+        Returns {kind: path} (hero, grid, header, logo, icon) for appid,
+        without touching the disk.
+        """
+        appid = str(appid)
+        with self._lock:
+            assets = dict(self._flat.get(appid, ()))
+            cached = self._dirs.get(appid)
+        if cached:
+            assets.update(cached[1])
+        return assets
+
+    def app_ids(self):
+        with self._lock:
+            return set(self._dirs) | set(self._flat)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def shared_artwork_index(steam_install_path):
+    """
+    The ArtworkIndex of a Steam install, built on first use and shared by
+    every caller afterwards. Call refresh on it when Steam may have
+    downloaded new artwork (e.g. before an import).
+    """
+    path = os.path.join(steam_install_path, "appcache", "librarycache")
+    key = os.path.normcase(os.path.abspath(path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ArtworkIndex(path)
+            index.refresh()
+        return index
+
+if __name__ == "__main__":
+    # Benchmark on a synthesized librarycache: the old five exists() probes
+    # per appid against index lookups, plus the incremental refresh.
+    import tempfile
+    import time
+
+    count = 3000
+    with tempfile.TemporaryDirectory() as steam_path:
+        librarycache = os.path.join(steam_path, "appcache", "librarycache")
+        os.makedirs(librarycache)
+        for appid in range(10, 10 + count):
+            folder = os.path.join(librarycache, str(appid))
+            os.mkdir(folder)
+            for name in ("library_hero.jpg", "library_600x900.jpg", "header.jpg", "logo.png", f"{appid:040x}.jpg"):
+                open(os.path.join(folder, name), "wb").close()
+
+        def probe(appid):
+            folder = os.path.join(librarycache, str(appid))
+            paths = {kind: os.path.join(folder, name) for name, kind in (
+                ("library_hero.jpg", "hero"), ("library_600x900.jpg", "grid"), ("library_header.jpg", "header"),
+                ("logo.png", "logo"), ("82afae56cfd88514886adb316b6d0f672dcbfaea.jpg", "icon"))}
+            return {kind: path for kind, path in paths.items() if os.path.exists(path)}
+
+        started = time.perf_counter()
+        for appid in range(10, 10 + count):
+            probe(appid)
+        probe_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index = shared_artwork_index(steam_path)
+        build_time = time.perf_counter() - started
+        started = time.perf_counter()
+        for appid in range(10, 10 + count):
+            index.get(appid)
+        lookup_time = time.perf_counter() - started
+
+        open(os.path.join(librarycache, "10", "library_hero_blur.jpg"), "wb").close()
+        started = time.perf_counter()
+        rescanned = index.refresh()
+        refresh_time = time.perf_counter() - started
+
+        print(f"{count} appids")
+        print(f"exists() probes: {probe_time * 1000:.1f} ms")
+        print(f"index build (one scandir pass): {build_time * 1000:.1f} ms")
+        print(f"index lookups: {lookup_time * 1000:.1f} ms")
+        print(f"refresh after one folder changed: {refresh_time * 1000:.1f} ms, {rescanned} folder rescanned")
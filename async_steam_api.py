@@ -0,0 +1,379 @@
+import copy
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+import httpx
+from steam_api_client import (STEAM_API_URL, RETRY_STATUSES, SteamApiError, shared_steam_api_client, batch_ids,
+                              in_input_order)
+from response_cache import STALE_WHILE_REVALIDATE_ENDPOINTS, cache_key, serves_stale
+from steam_workshop_integrator import (QUERY_FILES_PATH, GET_DETAILS_PATH, SEARCH_PROJECTION, DETAILS_PROJECTION,
+                                       query_files_params, get_details_params, parse_workshop_items)
+
+class AsyncRateLimiter:
+    """
+    asyncio counterpart of steam_api_client.RateLimiter.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class AsyncSteamApiClient:
+    """
+    asyncio counterpart of SteamApiClient on an httpx.AsyncClient: pooled
+    keep-alive connections, per-host rate limits, timeouts, retries with
+    backoff on 429/5xx, and the same ResponseCache handling, including
+    stale_while_revalidate. Cache reads and writes run on a worker thread,
+    so SQLite never blocks the loop. At most max_concurrency requests are
+    in flight at once; more wait their turn, and a request identical to one
+    in flight shares its response.
+
+    Must be used from a single event loop, e.g. an AsyncRunner's.
+    """
+    def __init__(self, base_url=STEAM_API_URL, timeout=(5.0, 15.0), max_concurrency=8, max_retries=3, backoff=0.5,
+                 max_backoff=8.0, rate=10.0, burst=10, cache=None, stale_while_revalidate=False):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate = rate
+        self.burst = burst
+        self.cache = cache
+        self.stale_while_revalidate = stale_while_revalidate
+        self._revalidating = {} # cache key -> Task revalidating a stale response
+        self._http = None
+        self._semaphore = None
+        self._limiters = {}
+        self._in_flight = {} # cache key -> [Task of the request being made, waiters]
+
+    def _client(self):
+        # Created on first use so it binds to the loop that runs the requests
+        if self._http is None:
+            connect, read = self.timeout
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._http
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = AsyncRateLimiter(self.rate, self.burst)
+        return limiter
+
+    def _retry_delay(self, attempt, response):
+        delay = self.backoff * 2 ** attempt
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        return min(delay, self.max_backoff)
+
+    async def get(self, path, params=None):
+        """
+        GETs base_url/path and returns the decoded JSON. Raises SteamApiError.
+        """
+        key = cache_key(path, params)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            in_flight[1] += 1
+            # shield: one caller giving up must not cancel the others' request
+            return copy.deepcopy(await asyncio.shield(in_flight[0]))
+        task = asyncio.ensure_future(self._get(path, params))
+        in_flight = self._in_flight[key] = [task, 0] # task, waiters
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        data = await asyncio.shield(task)
+        # Waiters copy the shared result, so this caller must not change it under them
+        return copy.deepcopy(data) if in_flight[1] else data
+
+    async def _get(self, path, params):
+        cached = await asyncio.to_thread(self.cache.lookup, path, params) if self.cache is not None else None
+        if cached is not None:
+            if cached.fresh:
+                return cached.data()
+            if serves_stale(self.stale_while_revalidate, path):
+                self._revalidate_in_background(path, params, cached)
+                return cached.data()
+        try:
+            return await self._fetch(path, params, cached)
+        except SteamApiError as e:
+            if cached is not None and (e.status is None or e.status in RETRY_STATUSES):
+                print(f"Serving cached response for {path}: {e}")
+                return cached.data()
+            raise
+
+    async def _fetch(self, path, params, cached):
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        response = await self._request(path, params, headers)
+        if response.status_code == 304 and cached is not None:
+            await asyncio.to_thread(self.cache.refresh, cached, path)
+            return cached.data()
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise SteamApiError(f"Response from {path} is not JSON: {e}", response.status_code)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.store, path, params, data, response.headers.get("ETag", ""),
+                                    response.headers.get("Last-Modified", ""))
+        return data
+
+    def _revalidate_in_background(self, path, params, cached):
+        key = cache_key(path, params)
+        if key in self._revalidating:
+            return
+        async def revalidate():
+            try:
+                await self._fetch(path, params, cached)
+            except SteamApiError as e:
+                print(f"Could not revalidate cached response for {path}: {e}")
+        # Kept here until done: the loop only holds weak references to tasks
+        task = self._revalidating[key] = asyncio.ensure_future(revalidate())
+        task.add_done_callback(lambda _: self._revalidating.pop(key, None))
+
+    async def _request(self, path, params, headers):
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        client = self._client()
+        limiter = self._limiter(url)
+        for attempt in range(self.max_retries + 1):
+            response = None
+            async with self._semaphore:
+                await limiter.acquire()
+                try:
+                    response = await client.get(url, params=params, headers=headers)
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    error = SteamApiError(f"Request to {path} failed: {e!r}")
+                except (httpx.HTTPError, httpx.InvalidURL) as e:
+                    # Redirect loops, undecodable bodies, bad URLs: retrying will not help
+                    raise SteamApiError(f"Request to {path} failed: {e!r}")
+            if response is not None:
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                error = SteamApiError(f"Request to {path} failed with HTTP {response.status_code}", response.status_code)
+            if attempt == self.max_retries:
+                raise error
+            await asyncio.sleep(self._retry_delay(attempt, response))
+        if response.status_code >= 400:
+            raise SteamApiError(f"Request to {path} failed with HTTP {response.status_code}", response.status_code)
+        return response
+
+    async def aclose(self):
+        for task in list(self._revalidating.values()):
+            task.cancel()
+        await asyncio.gather(*self._revalidating.values(), return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+class AsyncSteamApi:
+    """
+    The Steam Web API calls Gameshelf makes, as coroutines. Failures raise
+    SteamApiError. By default requests share the response cache of the
+    shared SteamApiClient.
+    """
+    def __init__(self, api_key, client=None):
+        self.api_key = api_key
+        self.client = client or AsyncSteamApiClient(cache=shared_steam_api_client().cache,
+                                                    stale_while_revalidate=STALE_WHILE_REVALIDATE_ENDPOINTS)
+
+    def _require_key(self):
+        if not self.api_key:
+            raise SteamApiError("Steam Web API Key not provided.")
+
+    async def search_workshop_items(self, appid, search_text="", page=1, num_per_page=10, profile=SEARCH_PROJECTION):
+        self._require_key()
+        data = await self.client.get(QUERY_FILES_PATH,
+                                     query_files_params(self.api_key, appid, search_text, page, num_per_page, profile))
+        items = parse_workshop_items(data, profile)
+        if items is None:
+            raise SteamApiError(f"Unexpected response format for workshop search: {data}")
+        return {"items": items, "total_results": data["response"].get("totalcount", 0)}
+
+    async def search_workshop_pages(self, appid, search_text="", pages=5, num_per_page=10,
+                                    profile=SEARCH_PROJECTION):
+        """
+        Fetches result pages 1 to pages at the same time and returns their
+        items in page order.
+        """
+        results = await asyncio.gather(*(self.search_workshop_items(appid, search_text, page, num_per_page, profile)
+                                         for page in range(1, pages + 1)))
+        return {"items": [item for result in results for item in result["items"]],
+                "total_results": max((result["total_results"] for result in results), default=0)}
+
+    async def get_workshop_item_details(self, publishedfileids, profile=DETAILS_PROJECTION):
+        """
+        Fetches the unique ids in concurrent chunks of up to 100; items come
+        back in the order of publishedfileids.
+        """
+        self._require_key()
+        publishedfileids, chunks = batch_ids(publishedfileids)
+        responses = await asyncio.gather(*(self.client.get(GET_DETAILS_PATH, get_details_params(self.api_key, chunk, profile))
+                                           for chunk in chunks))
+        results = []
+        for data in responses:
+            items = parse_workshop_items(data, profile)
+            if items is None:
+                raise SteamApiError(f"Unexpected response format for workshop item details: {data}")
+            results.append(items)
+        return {"items": in_input_order(publishedfileids, results, "publishedfileid")}
+
+    async def get_friends_list(self, steam_id):
+        self._require_key()
+        data = await self.client.get("ISteamUser/GetFriendList/v1/",
+                                     {"key": self.api_key, "steamid": steam_id, "relationship": "friend"})
+        try:
+            return data["friendslist"]["friends"]
+        except (KeyError, TypeError):
+            raise SteamApiError(f"Unexpected response format for friends list: {data}")
+
+    async def get_player_summaries(self, steam_ids):
+        """
+        Fetches the unique ids in concurrent chunks of 100, the most the
+        endpoint takes; players come back in the order of steam_ids.
+        """
+        self._require_key()
+        steam_ids, chunks = batch_ids(steam_ids)
+        responses = await asyncio.gather(*(self.client.get("ISteamUser/GetPlayerSummaries/v2/",
+                                                           {"key": self.api_key, "steamids": ",".join(chunk)})
+                                           for chunk in chunks))
+        try:
+            return in_input_order(steam_ids, [data["response"]["players"] for data in responses], "steamid")
+        except (KeyError, TypeError):
+            raise SteamApiError(f"Unexpected response format for player summaries: {responses}")
+
+class AsyncRunner:
+    """
+    Runs coroutines on an asyncio event loop in a background thread, so
+    the Qt event loop never waits on the network.
+
+    submit's callback gets (result, error) on the runner's thread; UI
+    code should hand it to its own thread, e.g. through a Qt signal.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="AsyncRunner", daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine, callback=None):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        if callback is not None:
+            def done(future):
+                if future.cancelled():
+                    return
+                error = future.exception()
+                callback(None if error else future.result(), error)
+            future.add_done_callback(done)
+        return future
+
+    def run_in_thread(self, function, callback=None):
+        """
+        Runs a blocking function on the loop's default thread pool, e.g.
+        file system scans, with the same callback as submit.
+        """
+        return self.submit(asyncio.to_thread(function), callback)
+
+    def stop(self):
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+if __name__ == "__main__":
+    # Five pages of workshop results from a local stand-in API that takes
+    # 200 ms per request, one after another and then concurrently; then a
+    # 1,000-friend summaries lookup. tests/test_async_steam_api.py checks
+    # the results.
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+
+    latency = 0.2
+    hits = {}
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            path, _, query = self.path.partition("?")
+            hits[path] = hits.get(path, 0) + 1
+            params = {key: values[0] for key, values in parse_qs(query).items()}
+            if path == "/ISteamUser/GetPlayerSummaries/v2/":
+                steam_ids = params["steamids"].split(",")
+                # The API returns players in no particular order
+                body = {"response": {"players": [{"steamid": steam_id, "personaname": f"player {steam_id}"}
+                                                 for steam_id in reversed(steam_ids)]}}
+            else:
+                page = int(params.get("page", 1))
+                body = {"response": {"totalcount": 50, "publishedfiledetails": [
+                    {"publishedfileid": str(page * 100 + number), "title": f"page {page} item {number}"} for number in range(10)]}}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    runner = AsyncRunner()
+    api = AsyncSteamApi("key", AsyncSteamApiClient(base_url=base_url, max_concurrency=10, rate=100, burst=10))
+
+    async def one_by_one():
+        return [await api.search_workshop_items(440, "hat", page) for page in range(1, 6)]
+
+    started = time.perf_counter()
+    runner.submit(one_by_one()).result()
+    sequential = time.perf_counter() - started
+
+    delivered = threading.Event()
+    outcome = {}
+
+    def on_done(result, error):
+        outcome.update(result=result, error=error, thread=threading.current_thread().name)
+        delivered.set()
+
+    started = time.perf_counter()
+    runner.submit(api.search_workshop_pages(440, "hat", pages=5), on_done)
+    # The submitting thread (the Qt UI thread in Gameshelf) is free meanwhile
+    free = time.perf_counter() - started
+    delivered.wait(10)
+    concurrent = time.perf_counter() - started
+
+    friend_ids = [str(76561190000000000 + number) for number in range(1000)]
+    started = time.perf_counter()
+    runner.submit(api.get_player_summaries(friend_ids + friend_ids[:300])).result()
+    summaries_time = time.perf_counter() - started
+    summaries_calls = hits["/ISteamUser/GetPlayerSummaries/v2/"]
+
+    runner.submit(api.client.aclose()).result()
+    runner.stop()
+    server.shutdown()
+    print(f"5 pages one after another: {sequential * 1000:.0f} ms")
+    print(f"5 pages concurrently: {concurrent * 1000:.0f} ms (single request: {latency * 1000:.0f} ms)")
+    print(f"submit returned in {free * 1000:.2f} ms; results delivered on the {outcome['thread']} thread")
+    print(f"summaries of 1,000 friends (plus 300 duplicates): {summaries_calls} calls in {summaries_time * 1000:.0f} ms")
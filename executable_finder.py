@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from library_persistence import atomic_write_json
+
+CACHE_VERSION = 2
+EXECUTABLE_CACHE_FILE = os.path.join(os.path.dirname(__file__), "executable_cache.json")
+
+# Folders that ship installers, runtimes or tools rather than the game
+SKIPPED_DIRS = frozenset((
+    "redist", "redists", "_commonredist", "commonredist", "redistributables", "directx", "dotnet",
+    "vcredist", "dxsetup", "installer", "installers", "__installer", "support", "crashreporter",
+    "crashpad", "easyanticheat", "battleye", "__macosx", "prereqs", "prerequisites", "docs", "manual",
+))
+# Executable names that are never the game itself
+_NON_GAME_NAME = re.compile(r"unins\d*|setup|install|redist|dxsetup|crash(?:handler|report|pad|sender|dump)|"
+                            r"bugreport|dotnet|directx|uploader|updater|cleanup|helper|touchup|cefprocess")
+# Folders games commonly keep their main executable in
+_GAME_BINARY_DIRS = frozenset(("binaries", "win64", "win32", "x64", "x86", "bin", "bin64", "bin32", "game"))
+_WORD = re.compile(r"[a-z0-9]+")
+
+def _words(text):
+    return _WORD.findall(text.lower())
+
+def _scan(install_dir, max_depth):
+    """
+    One depth-limited pass over install_dir. Returns a candidate
+    [relative path, size] for every .exe outside the skipped folders, and
+    {relative path: mtime_ns} of every folder scanned.
+    """
+    candidates = []
+    dir_mtimes = {}
+    pending = [(install_dir, 0)]
+    while pending:
+        directory, depth = pending.pop()
+        try:
+            dir_mtimes[os.path.relpath(directory, install_dir)] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if depth < max_depth and entry.name.lower() not in SKIPPED_DIRS:
+                                pending.append((entry.path, depth + 1))
+                        elif entry.name.lower().endswith(".exe"):
+                            candidates.append([os.path.relpath(entry.path, install_dir), entry.stat().st_size])
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return candidates, dir_mtimes
+
+def _unchanged(install_dir, dir_mtimes):
+    """
+    True if no folder scanned has changed since: adding, removing or
+    renaming an executable anywhere in the scan changes its folder's mtime.
+    """
+    for relative_dir, mtime_ns in dir_mtimes.items():
+        try:
+            if os.stat(os.path.join(install_dir, relative_dir)).st_mtime_ns != mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+def _score(relative_path, size, game_name):
+    """
+    Higher is more likely the game: name similarity to the game, file size,
+    and how close to the install root / in a usual binaries folder it is.
+    None for executables that are not the game at all.
+    """
+    parts = relative_path.replace("\\", "/").split("/")
+    stem = os.path.splitext(parts[-1])[0].lower()
+    compact_stem = "".join(_words(stem))
+    name_words = _words(game_name)
+    compact_name = "".join(name_words)
+
+    # Installers, crash reporters and the like, unless the game's own name
+    # has the word ("Crash Bandicoot")
+    non_game = _NON_GAME_NAME.search(compact_stem)
+    if non_game and non_game.group() not in compact_name:
+        return None
+    score = 0.0
+    if compact_name:
+        if compact_stem == compact_name:
+            score += 60
+        score += 30 * SequenceMatcher(None, compact_stem, compact_name).ratio()
+        shared = set(_words(stem)) & set(name_words)
+        score += 10 * len(shared) / len(set(name_words))
+        # Initials, e.g. "gtav" for "Grand Theft Auto V"
+        if len(name_words) > 1 and compact_stem == "".join(word[0] for word in name_words):
+            score += 25
+    if "launcher" in compact_stem:
+        score -= 10
+    # Game binaries are large: 1 MiB -> 0, 100 MiB -> +12, under 1 MiB -> -5
+    mib = size / (1024 * 1024)
+    score += 6 * math.log10(mib) if mib >= 1 else -5
+    folders = [part.lower() for part in parts[:-1]]
+    score -= 3 * sum(1 for folder in folders if folder not in _GAME_BINARY_DIRS)
+    score += 2 * sum(1 for folder in folders if folder in _GAME_BINARY_DIRS)
+    return score
+
+class ExecutableFinder:
+    """
+    Finds and ranks the executables in game install folders.
+
+    Each install folder is scanned once, to a limited depth, and the raw
+    candidates are cached with the mtimes of the folders scanned, so later
+    lookups rank from the cache after a stat per folder instead of listing
+    them again. find_for_games spreads a batch of folders over a thread
+    pool.
+    """
+    def __init__(self, cache_file=EXECUTABLE_CACHE_FILE, max_depth=4):
+        self.cache_file = cache_file
+        self.max_depth = max_depth
+        self.entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable executable cache {self.cache_file}: {e}")
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            document = {"version": CACHE_VERSION, "entries": dict(self.entries)}
+            self._dirty = False
+        try:
+            atomic_write_json(self.cache_file, document, indent=None)
+        except OSError as e:
+            print(f"Error saving executable cache: {e}")
+
+    def _candidates(self, install_dir):
+        if not os.path.isdir(install_dir):
+            return []
+        key = os.path.normcase(os.path.abspath(install_dir))
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and entry["max_depth"] >= self.max_depth and _unchanged(install_dir, entry["dir_mtimes"]):
+            return entry["candidates"]
+        candidates, dir_mtimes = _scan(install_dir, self.max_depth)
+        with self._lock:
+            self.entries[key] = {"dir_mtimes": dir_mtimes, "max_depth": self.max_depth, "candidates": candidates}
+            self._dirty = True
+        return candidates
+
+    def find(self, install_dir, game_name):
+        """
+        Returns the full paths of the executables in install_dir, most likely
+        game executable first. Installers, redistributables and crash
+        reporters are left out.
+        """
+        ranked = []
+        for relative_path, size in self._candidates(install_dir):
+            score = _score(relative_path, size, game_name)
+            if score is not None:
+                ranked.append((score, os.path.join(install_dir, relative_path)))
+        ranked.sort(key=lambda candidate: -candidate[0])
+        return [path for _, path in ranked]
+
+    def find_for_games(self, games, workers=8):
+        """
+        Ranks the executables of many games at once. games is an iterable of
+        (install_dir, game_name); returns {install_dir: ranked paths}.
+        """
+        games = list(games)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda game: self.find(*game), games)
+            ranked = {install_dir: paths for (install_dir, _), paths in zip(games, results)}
+        self.save()
+        return ranked
+
+_shared_finder = None
+_shared_finder_lock = threading.Lock()
+
+def shared_executable_finder():
+    """
+    The ExecutableFinder every executable lookup in Gameshelf shares, so
+    executable_cache.json is read once per run.
+    """
+    global _shared_finder
+    with _shared_finder_lock:
+        if _shared_finder is None:
+            _shared_finder = ExecutableFinder()
+        return _shared_finder
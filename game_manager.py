@@ -1,89 +1,396 @@
 import os
 import json
+import uuid
+import threading
+from library_journal import LibraryJournal
+from library_persistence import PersistenceWorker, atomic_write_json
+from search_index import SearchIndex
+from game_record import Game, changed_fields
+from library_schema import read_library, library_document
+from library_loader import iter_game_batches, LibraryNeedsMigration
+from library_snapshot import LibrarySnapshot, write_snapshot
+
+# Fields that get a secondary index, mapped to the function that normalizes
+# a value into its index key.
+INDEXED_FIELDS = {
+    "platform": lambda value: str(value).casefold(),
+    "genre": lambda value: str(value).casefold(),
+    "steam_app_id": lambda value: str(value),
+    "executable_path": lambda value: os.path.normcase(os.path.normpath(value)) if value else "",
+}
+
 class GameManager:
-    def __init__(self):
-        self.games = []
+    def __init__(self, journaled=False, autoload=True):
+        self.games = {} # game id -> Game, in insertion order
+        self.indexes = {field: {} for field in INDEXED_FIELDS}
+        # Filled as games are loaded or added, so searching never has to
+        # build it; progressive loads index one batch at a time.
+        self.search_index = SearchIndex()
         self.games_file = os.path.join(os.path.dirname(__file__), "games.json")
-        self.load_games()
+        self.snapshot_file = os.path.join(os.path.dirname(__file__), "games.snapshot")
+        # In journaled mode each change is appended to games.json.journal and
+        # games.json is only rewritten when the journal needs compacting.
+        self.journal = LibraryJournal(self.games_file) if journaled else None
+        # Saves run on a background thread; the lock keeps it from copying the
+        # library while the UI thread is halfway through a change.
+        self._lock = threading.RLock()
+        self.persistence = PersistenceWorker()
+        # While a progressive load is running the library is incomplete, so
+        # saves are held back until it finishes.
+        self._loading = False
+        self._save_after_load = False
+        # Set when the library could not be read; saving is disabled then
+        self.load_error = None
+        if autoload:
+            self.load_games()
+
+    def _set_games(self, game_list):
+        """
+        Replaces the whole library and rebuilds every index.
+        """
+        with self._lock:
+            self.games = {}
+            self.indexes = {field: {} for field in INDEXED_FIELDS}
+            self.search_index = SearchIndex()
+            for game in game_list:
+                if not isinstance(game, Game):
+                    game = Game.from_dict(game)
+                self.games[game.id] = game
+                self._index_game(game)
+
+    def _index_game(self, game):
+        for field, normalize in INDEXED_FIELDS.items():
+            key = normalize(game.get(field, ""))
+            self.indexes[field].setdefault(key, set()).add(game["id"])
+        self.search_index.add(game["id"], game)
+
+    def _unindex_game(self, game):
+        for field, normalize in INDEXED_FIELDS.items():
+            key = normalize(game.get(field, ""))
+            ids = self.indexes[field].get(key)
+            if ids is not None:
+                ids.discard(game["id"])
+                if not ids:
+                    del self.indexes[field][key]
+        self.search_index.remove(game["id"], game)
+
+    def _snapshot(self):
+        with self._lock:
+            return [game.to_dict() for game in self.games.values()]
 
     def save_games(self):
-        with open(self.games_file, "w", encoding="utf-8") as f:
-            json.dump(self.games, f, indent=4)
+        """
+        Schedules a background save. Calls made in quick succession are
+        coalesced into one write; use flush() to force it.
+        """
+        if self.load_error is not None:
+            print(f"Not saving: {self.games_file} could not be loaded ({self.load_error})")
+            return
+        if self._loading:
+            self._save_after_load = True
+            return
+        if self.journal:
+            self.persistence.schedule("journal", self._write_journal)
+        else:
+            self.persistence.schedule("snapshot", self._write_snapshot)
+
+    def _write_journal(self):
+        self.journal.write_pending()
+        if self.journal.needs_compaction():
+            # Changes are logged after they are made, so holding the lock from
+            # the copy until the journal is rotated means every line folded
+            # into the new snapshot is already in the copy.
+            with self._lock:
+                self.journal.compact(self._snapshot())
+
+    def _write_snapshot(self):
+        atomic_write_json(self.games_file, library_document(self._snapshot()))
         print(f"Games saved to {self.games_file}")
 
+    def flush(self):
+        self.persistence.flush()
+
     def load_games(self):
-        if os.path.exists(self.games_file):
+        if self.journal:
+            game_list, migrated = self.journal.load()
+        elif os.path.exists(self.games_file):
             with open(self.games_file, "r", encoding="utf-8") as f:
-                self.games = json.load(f)
-            # Ensure new fields exist for old game entries
-            for game in self.games:
-                if "workshop_content_paths" not in game:
-                    game["workshop_content_paths"] = []
-                if "developer" not in game:
-                    game["developer"] = ""
-                if "publisher" not in game:
-                    game["publisher"] = ""
-                if "game_type" not in game:
-                    game["game_type"] = ""
-                if "os_list" not in game:
-                    game["os_list"] = ""
-                if "release_state" not in game:
-                    game["release_state"] = ""
-                if "description" not in game:
-                    game["description"] = ""
-            print(f"Games loaded from {self.games_file}")
+                game_list, migrated = read_library(json.load(f))
         else:
-            self.games = []
+            self._set_games([])
             print("No games.json found, starting with empty game list.")
+            return
+
+        self._set_games(game_list)
+        self.load_error = None
+        if migrated:
+            # Write the upgraded library back so later loads are a plain parse
+            if self.journal:
+                self.journal.compact(self._snapshot())
+            else:
+                self._write_snapshot()
+        print(f"Games loaded from {self.games_file}")
+
+    def load_games_progressively(self, batch_size=500):
+        """
+        Generator alternative to load_games. Parses games.json incrementally,
+        adds each batch to the library and yields the batch's Games, so a
+        caller can show the first rows before the whole file has been read.
+        Libraries that need a schema migration are loaded by load_games and
+        yielded as one batch.
+
+        If parsing fails part way, or the generator is closed early, the
+        library is read again whole by load_games and the games not yielded
+        yet come as a last batch. If that fails too, the error is raised and
+        load_error is set: saving is disabled so the incomplete library never
+        replaces the file on disk.
+        """
+        self._set_games([])
+        self.load_error = None
+        # Saves wait until the library is complete
+        self._loading = True
+        puts, deleted_ids = self.journal.read_changes() if self.journal else ({}, set())
+        snapshot_ids = set()
+        yielded_ids = set()
+        finished = False
+        try:
+            batches = iter_game_batches(self.games_file, batch_size) if os.path.exists(self.games_file) else []
+            for batch in batches:
+                if puts or deleted_ids:
+                    snapshot_ids.update(game["id"] for game in batch)
+                    batch = LibraryJournal.apply_changes(batch, puts, deleted_ids)
+                games = self._add_loaded_games(batch)
+                yielded_ids.update(game.id for game in games)
+                yield games
+            new_games = [game for game_id, game in puts.items() if game_id not in snapshot_ids]
+            finished = True
+            if new_games:
+                yield self._add_loaded_games(new_games)
+        except LibraryNeedsMigration:
+            finished = True
+            if not self._load_whole():
+                raise self.load_error
+            yield self.get_all_games()
+            return
+        except Exception as e:
+            finished = True
+            print(f"Error loading {self.games_file} progressively, reading it whole instead: {e}")
+            if not self._load_whole():
+                raise
+            yield [game for game in self.get_all_games() if game.id not in yielded_ids]
+            return
+        finally:
+            if not finished:
+                # Closed before the end: read the rest now rather than hold saves back for good
+                self._load_whole()
+        print(f"Games loaded from {self.games_file}")
+        self._finish_loading()
+
+    def _load_whole(self):
+        """
+        Replaces a partly loaded library with load_games. Returns False, with
+        load_error set and saving disabled, if the library cannot be read.
+        """
+        try:
+            self.load_games()
+        except Exception as e:
+            self.load_error = e
+            self._loading = False
+            self._save_after_load = False
+            print(f"Could not load {self.games_file}, saving is disabled: {e}")
+            return False
+        self._finish_loading()
+        return True
+
+    def _finish_loading(self):
+        self._loading = False
+        if self._save_after_load:
+            self._save_after_load = False
+            self.save_games()
+
+    def save_snapshot(self, path=None):
+        """
+        Writes the library as a binary snapshot (see library_snapshot.py)
+        that LibrarySnapshot can open without parsing it.
+        """
+        path = path or self.snapshot_file
+        write_snapshot(path, self._snapshot())
+        print(f"Library snapshot saved to {path}")
+        return path
+
+    def load_snapshot(self, path=None):
+        """
+        Replaces the library with the games in a binary snapshot. The
+        library is written to games.json as usual when it is next saved.
+        """
+        path = path or self.snapshot_file
+        with LibrarySnapshot(path) as snapshot:
+            self._set_games(snapshot)
+        if self.journal:
+            # The journal only records changes, so fold the new library into games.json now
+            self.journal.compact(self._snapshot())
+        print(f"Games loaded from {path}")
+
+    def _add_loaded_games(self, game_list):
+        games = [Game.from_dict(game) for game in game_list]
+        with self._lock:
+            for game in games:
+                self.games[game.id] = game
+                self._index_game(game)
+        return games
+
+    def close(self):
+        self.persistence.stop()
+        if self.journal:
+            self.journal.close()
 
     def add_game(self, title, platform, genre, executable_path="", launch_arguments="", iso_paths=None, artwork=None,
                  cloud_save_path="", workshop_content_paths=None, steam_app_id="",
                  developer="", publisher="", game_type="", os_list="", release_state="", description=""):
-        if iso_paths is None:
-            iso_paths = []
-        if artwork is None:
-            artwork = {}
-        if workshop_content_paths is None:
-            workshop_content_paths = []
-        game = {
-            "title": title,
-            "platform": platform,
-            "genre": genre,
-            "executable_path": executable_path,
-            "launch_arguments": launch_arguments,
-            "iso_paths": iso_paths,
-            "artwork": artwork,
-            "cloud_save_path": cloud_save_path,
-            "steam_app_id": steam_app_id,
-            "workshop_content_paths": workshop_content_paths,
-            "developer": developer,
-            "publisher": publisher,
-            "game_type": game_type,
-            "os_list": os_list,
-            "release_state": release_state,
-            "description": description
-        }
-        self.games.append(game)
+        game = Game(
+            id=uuid.uuid4().hex,
+            title=title,
+            platform=platform,
+            genre=genre,
+            executable_path=executable_path,
+            launch_arguments=launch_arguments,
+            iso_paths=iso_paths,
+            artwork=artwork,
+            cloud_save_path=cloud_save_path,
+            steam_app_id=steam_app_id,
+            workshop_content_paths=workshop_content_paths,
+            developer=developer,
+            publisher=publisher,
+            game_type=game_type,
+            os_list=os_list,
+            release_state=release_state,
+            description=description
+        )
+        with self._lock:
+            self.games[game.id] = game
+            self._index_game(game)
+        if self.journal:
+            self.journal.append_put(game.to_dict())
         print(f"Added game: {title}")
+        return game["id"]
+
+    def add_games(self, records):
+        """
+        Bulk add for imports: like merge_games, but games that are already in
+        the library are left untouched.
+        """
+        return self.merge_games(records, update_existing=False)
+
+    def merge_games(self, records, update_existing=True):
+        """
+        Adds game records (dicts of game fields) in one batch. A record with
+        the steam_app_id or executable_path of a game already in the library,
+        or earlier in the batch, updates that game instead of adding a
+        duplicate: empty fields are filled and fields edited by hand are kept
+        (see changed_fields). The library is saved once at the end.
+
+        Returns {"added": [...], "updated": [...], "skipped": [...]}, lists of
+        the ids of the games each record was added as or matched.
+        """
+        report = {"added": [], "updated": [], "skipped": []}
+        changed = []
+        with self._lock:
+            for record in records:
+                game = self._find_duplicate(record)
+                if game is None:
+                    game = Game.from_dict(dict(record, id=record.get("id") or uuid.uuid4().hex))
+                    self.games[game.id] = game
+                    self._index_game(game)
+                    report["added"].append(game.id)
+                    changed.append(game)
+                    continue
+                changes = changed_fields(game, record) if update_existing else {}
+                if not changes:
+                    report["skipped"].append(game.id)
+                    continue
+                self._unindex_game(game)
+                for field, value in changes.items():
+                    game[field] = value
+                self._index_game(game)
+                report["updated"].append(game.id)
+                changed.append(game)
+        if self.journal:
+            for game in changed:
+                self.journal.append_put(game.to_dict())
+        print(f"Merged games: {len(report['added'])} added, {len(report['updated'])} updated, {len(report['skipped'])} skipped")
+        if changed:
+            self.save_games()
+        return report
+
+    def _find_duplicate(self, record):
+        """
+        Returns the game a record describes, matched by steam_app_id and then
+        by executable path. Games with different Steam app ids never match.
+        """
+        steam_app_id = record.get("steam_app_id")
+        if steam_app_id:
+            game = self.find_game_by_steam_app_id(steam_app_id)
+            if game is not None:
+                return game
+        executable_path = record.get("executable_path")
+        if executable_path:
+            ids = self.indexes["executable_path"].get(INDEXED_FIELDS["executable_path"](executable_path), ())
+            for game_id in ids:
+                game = self.games[game_id]
+                if not steam_app_id or not game.steam_app_id:
+                    return game
+        return None
 
     def get_all_games(self):
-        return self.games
-
-    def search_games(self, query, search_by="title"):
-        results = []
-        for game in self.games:
-            if search_by == "title" and query.lower() in game["title"].lower():
-                results.append(game)
-            elif search_by == "platform" and query.lower() in game["platform"].lower():
-                results.append(game)
-            elif search_by == "genre" and query.lower() in game["genre"].lower():
-                results.append(game)
-        return results
-
-    def edit_game(self, index, new_title, new_platform, new_genre, new_executable_path, new_launch_arguments, new_iso_paths, new_artwork, new_cloud_save_path, new_steam_app_id, new_workshop_content_paths,
+        return list(self.games.values())
+
+    def get_game(self, game_id):
+        return self.games.get(game_id)
+
+    def find_games(self, **criteria):
+        """
+        Returns the games whose indexed fields equal every given value,
+        e.g. find_games(platform="PC (Steam)", genre="Action").
+        """
+        if not criteria:
+            return self.get_all_games()
+        id_sets = []
+        for field, value in criteria.items():
+            if field not in INDEXED_FIELDS:
+                raise ValueError(f"Field '{field}' is not indexed.")
+            id_sets.append(self.indexes[field].get(INDEXED_FIELDS[field](value), set()))
+        # Intersect starting from the smallest set so the cost follows the result size
+        id_sets.sort(key=len)
+        matching_ids = id_sets[0].intersection(*id_sets[1:])
+        return [self.games[game_id] for game_id in matching_ids]
+
+    def find_game_by_steam_app_id(self, steam_app_id):
+        ids = self.indexes["steam_app_id"].get(INDEXED_FIELDS["steam_app_id"](steam_app_id))
+        return self.games[next(iter(ids))] if ids else None
+
+    def find_game_by_executable_path(self, executable_path):
+        ids = self.indexes["executable_path"].get(INDEXED_FIELDS["executable_path"](executable_path))
+        return self.games[next(iter(ids))] if ids else None
+
+    def search_games(self, query, search_by="title", limit=None):
+        """
+        Ranked search on one field, or on title, platform, genre, developer,
+        publisher and description when search_by is "all". With a limit only
+        the best `limit` matches are returned; an empty query returns every game.
+        """
+        if not query.strip():
+            return self.get_all_games()
+        fields = None if search_by == "all" else [search_by]
+        return [self.games[game_id] for game_id in self.search_index.search(query, fields, limit)]
+
+    def edit_game(self, game_id, new_title, new_platform, new_genre, new_executable_path, new_launch_arguments, new_iso_paths, new_artwork, new_cloud_save_path, new_steam_app_id, new_workshop_content_paths,
                   new_developer, new_publisher, new_game_type, new_os_list, new_release_state, new_description):
-        if 0 <= index < len(self.games):
-            game = self.games[index]
+        game = self.games.get(game_id)
+        if game is None:
+            print(f"Error: No game with id {game_id} to edit.")
+            return False
+        with self._lock:
+            self._unindex_game(game)
             game["title"] = new_title
             game["platform"] = new_platform
             game["genre"] = new_genre
@@ -100,31 +407,40 @@ class GameManager:
             game["os_list"] = new_os_list
             game["release_state"] = new_release_state
             game["description"] = new_description
-            print(f"Edited game at index {index}: {new_title}")
-            return True
-        else:
-            print(f"Error: Index {index} out of bounds for editing.")
+            self._index_game(game)
+        if self.journal:
+            self.journal.append_put(game.to_dict())
+        print(f"Edited game {game_id}: {new_title}")
+        return True
+
+    def record_play_session(self, game_id, start, end):
+        """
+        Adds a finished play session (Unix timestamps) to the game's play
+        history and total playtime.
+        """
+        game = self.games.get(game_id)
+        if game is None:
+            print(f"Error: No game with id {game_id} to record a play session for.")
             return False
+        start, end = int(start), int(end)
+        duration = max(0, end - start)
+        with self._lock:
+            game["play_sessions"] = game["play_sessions"] + ({"start": start, "end": end, "duration": duration},)
+            game["playtime_seconds"] = game["playtime_seconds"] + duration
+            game["last_played"] = max(game["last_played"], end)
+        if self.journal:
+            self.journal.append_put(game.to_dict())
+        self.save_games()
+        print(f"Recorded {duration} s played for {game['title']}")
+        return True
 
-    def delete_game(self, index):
-        if 0 <= index < len(self.games):
-            deleted_game = self.games.pop(index)
-            print(f"Deleted game: {deleted_game['title']}")
-            return True
-        return False
-
-    def save_games(self, filename="games.json"):
-        import json
-        with open(filename, "w") as f:
-            json.dump(self.games, f, indent=4)
-        print(f"Game data saved to {filename}")
-
-    def load_games(self, filename="games.json"):
-        import json
-        import os
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                self.games = json.load(f)
-            print(f"Game data loaded from {filename}")
-        else:
-            print(f"No game data file found at {filename}")
\ No newline at end of file
+    def delete_game(self, game_id):
+        with self._lock:
+            deleted_game = self.games.pop(game_id, None)
+            if deleted_game is None:
+                return False
+            self._unindex_game(deleted_game)
+        if self.journal:
+            self.journal.append_delete(game_id)
+        print(f"Deleted game: {deleted_game['title']}")
+        return True
@@ -0,0 +1,191 @@
+import sys
+from types import MappingProxyType
+
+# Field order matches the games.json schema
+FIELDS = (
+    "id", "title", "platform", "genre", "executable_path", "launch_arguments", "iso_paths", "artwork",
+    "cloud_save_path", "steam_app_id", "workshop_content_paths", "developer", "publisher", "game_type",
+    "os_list", "release_state", "description", "playtime_seconds", "last_played", "play_sessions",
+)
+# Categorical fields whose values repeat across the library ("PC (Steam)",
+# "Unknown", publishers, os lists); each distinct value is stored once.
+INTERNED_FIELDS = frozenset(("platform", "genre", "developer", "publisher", "game_type", "os_list", "release_state"))
+# Stored as tuples, so every game without paths shares the one empty tuple
+LIST_FIELDS = frozenset(("iso_paths", "workshop_content_paths", "play_sessions"))
+# Fields that are not strings; every other missing field defaults to ""
+DEFAULTS = {"playtime_seconds": 0, "last_played": 0}
+# Read-only, so it can be shared by every game without artwork
+EMPTY_ARTWORK = MappingProxyType({})
+# Fields an import refreshes even when the library has a value: Gameshelf
+# derives them from the Steam install and they cannot be edited by hand
+IMPORT_OWNED_FIELDS = frozenset(("artwork", "workshop_content_paths"))
+# Shown for games whose executable was not found; never a real path
+EXECUTABLE_NOT_FOUND = "Not found"
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+class Game:
+    """
+    Compact record for one library entry.
+
+    Supports the dict-style access the rest of Gameshelf uses (game["title"],
+    game.get("artwork", {}), "developer" in game) and converts to and from
+    the games.json representation. Keys that Gameshelf does not know about
+    are kept in `extra` so they survive a load/save round trip.
+    """
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, **fields):
+        for field in FIELDS:
+            self[field] = fields.pop(field, None)
+        self.extra = fields or None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if field in LIST_FIELDS:
+                value = list(value)
+            elif field == "artwork":
+                value = dict(value)
+            data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __setitem__(self, key, value):
+        if key in LIST_FIELDS:
+            value = tuple(value) if value else ()
+        elif key == "artwork":
+            value = dict(value) if value else EMPTY_ARTWORK
+        elif key in INTERNED_FIELDS:
+            value = _intern(value) if value is not None else ""
+        elif key in FIELDS:
+            value = value if value is not None else DEFAULTS.get(key, "")
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        setattr(self, key, value)
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in FIELDS or bool(self.extra and key in self.extra)
+
+    def keys(self):
+        return list(FIELDS) + list(self.extra or ())
+
+    def __repr__(self):
+        return f"Game(id={self.id!r}, title={self.title!r})"
+
+def _is_empty(field, value):
+    return not value or (field == "executable_path" and value == EXECUTABLE_NOT_FOUND)
+
+def changed_fields(existing, record):
+    """
+    Returns the fields of an imported record that would change an existing
+    game. The import fills fields the game has empty and refreshes the
+    IMPORT_OWNED_FIELDS; anything else the library has, e.g. a title the
+    user edited, is kept. Empty values in the record never clear what the
+    library has.
+    """
+    changes = {}
+    for field, value in record.items():
+        if field == "id" or _is_empty(field, value):
+            continue
+        current = existing.get(field)
+        if field not in IMPORT_OWNED_FIELDS and not _is_empty(field, current):
+            continue
+        if field in LIST_FIELDS:
+            same = current is not None and tuple(current) == tuple(value)
+        elif field == "artwork":
+            same = current is not None and dict(current) == dict(value)
+        else:
+            same = current == value
+        if not same:
+            changes[field] = value
+    return changes
+
+def _synthetic_game_dicts(count):
+    publishers = [f"Publisher {i}" for i in range(300)]
+    genres = ["Action", "RPG", "Strategy", "Puzzle", "Unknown", "Simulation", "Racing"]
+    for i in range(count):
+        steam = i % 3 != 0
+        yield {
+            "id": f"{i:032x}",
+            "title": f"Game Title {i}",
+            "platform": "PC (Steam)" if steam else "PC",
+            "genre": genres[i % len(genres)],
+            "executable_path": f"C:\\Games\\Game{i}\\bin\\game{i}.exe",
+            "launch_arguments": f"steam://rungameid/{i}" if steam else "",
+            "iso_paths": [],
+            "artwork": {"grid": f"C:\\Steam\\appcache\\librarycache\\{i}\\library_600x900.jpg"} if steam else {},
+            "cloud_save_path": "",
+            "steam_app_id": str(i) if steam else "",
+            "workshop_content_paths": [],
+            "developer": f"Studio {i % 2000}",
+            "publisher": publishers[i % len(publishers)],
+            "game_type": "game" if steam else "",
+            "os_list": "windows" if steam else "",
+            "release_state": "released" if steam else "",
+            "description": "",
+        }
+
+def _measure(representation, count):
+    """
+    Builds `count` games the way games.json loading would and returns the RSS growth in bytes.
+    """
+    import json
+    import psutil
+
+    # Parse from JSON text so strings are not shared more than a real load
+    # would share them. Chunks keep the transient dicts of the Game run small.
+    games = list(_synthetic_game_dicts(count))
+    chunks = [json.dumps(games[start:start + 1000]) for start in range(0, count, 1000)]
+    del games
+    process = psutil.Process()
+    before = process.memory_info().rss
+    data = []
+    for chunk in chunks:
+        if representation == "game":
+            data.extend(Game.from_dict(entry) for entry in json.loads(chunk))
+        else:
+            data.extend(json.loads(chunk))
+    return process.memory_info().rss - before
+
+if __name__ == "__main__":
+    # Memory benchmark: RSS of the library as dicts vs Game records, each in a fresh process
+    import subprocess
+
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        print(_measure(sys.argv[2], int(sys.argv[3])))
+        sys.exit(0)
+
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'games':>10} {'dict MiB':>10} {'Game MiB':>10} {'saved':>7}")
+    for count in counts:
+        results = {}
+        for representation in ("dict", "game"):
+            output = subprocess.run([sys.executable, __file__, "--measure", representation, str(count)],
+                                    capture_output=True, text=True, check=True).stdout
+            results[representation] = int(output.strip()) / (1024 * 1024)
+        saved = 1 - results["game"] / results["dict"] if results["dict"] else 0
+        print(f"{count:>10} {results['dict']:>10.1f} {results['game']:>10.1f} {saved:>6.0%}")
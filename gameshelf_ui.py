@@ -1,21 +1,43 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLineEdit, QComboBox, QMessageBox, QLabel, QStackedWidget, QFormLayout, QFileDialog, QAction, QMenu, QProgressDialog, QDialog, QStackedLayout, QTextEdit
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLineEdit, QComboBox, QMessageBox, QLabel, QStackedWidget, QFormLayout, QFileDialog, QAction, QMenu, QProgressDialog, QDialog, QStackedLayout, QTextEdit, QInputDialog
 from scan_results_dialog import ScanResultsDialog
-from PyQt5.QtCore import Qt, QTimer, QSettings
+from PyQt5.QtCore import Qt, QTimer, QSettings, QEvent, pyqtSignal
 from styles import Style
 from game_manager import GameManager
+from game_record import EXECUTABLE_NOT_FOUND
+from sqlite_game_manager import SQLiteGameManager, migrate_from_json
 from iso_manager import IsoManager
-from steam_integrator import find_steam_install_path, get_steam_library_folders, get_installed_steam_games, get_steam_artwork_paths, find_game_executable, find_steam_userdata_path, get_steam_cloud_save_paths, is_steam_game_running, get_steam_workshop_content_paths, check_steamworks_sdk_installed, get_game_details_from_appinfo_vdf
+from steam_integrator import find_steam_install_path, get_steam_library_folders, get_installed_steam_games, get_steam_artwork_paths, find_game_executable, find_steam_userdata_path, get_steam_cloud_save_paths, get_workshop_inventory, check_steamworks_sdk_installed, get_game_details_from_appinfo_vdf, get_current_steam_user_id
 from steam_import_dialog import SteamImportDialog
+from executable_finder import shared_executable_finder
+from artwork_index import shared_artwork_index
+from save_backup import SaveBackupStore
+from process_snapshot import ProcessSnapshotService
+from session_tracker import SessionTracker
 from settings_dialog import SettingsDialog
 from steam_workshop_integrator import SteamWorkshopIntegrator
+from async_steam_api import AsyncRunner, AsyncSteamApi
 from PyQt5.QtGui import QPixmap, QIcon
 
 import os
+import concurrent.futures
 import pygame
 import subprocess
+import time
 from PyQt5.QtWidgets import QMessageBox
 
+# Searches show this many of the best matches; filling the table with tens of
+# thousands of rows for a one- or two-letter query would take far longer
+# than the search itself.
+SEARCH_RESULT_LIMIT = 500
+
 class GameshelfUI(QMainWindow):
+    # Emitted from the process snapshot thread; Qt delivers it on the UI thread
+    process_states_changed = pyqtSignal(dict)
+    # Emitted from session waiter threads with (game id, start, end)
+    play_session_ended = pyqtSignal(str, float, float)
+    # Emitted from the async runner thread with (callback, result, error)
+    background_result = pyqtSignal(object, object, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Gameshelf")
@@ -29,8 +51,6 @@ class GameshelfUI(QMainWindow):
         self.setFocusPolicy(Qt.StrongFocus)
         self.setFocus()
 
-        self.game_manager = GameManager()
-        self.game_manager.load_games()
         self.iso_manager = IsoManager()
 
         # Determine the path for QSettings
@@ -47,6 +67,16 @@ class GameshelfUI(QMainWindow):
             # Ensure the default path is saved if not already
             if not temp_settings.contains("config_file_location"):
                 temp_settings.setValue("config_file_location", self.settings.fileName())
+
+        self.game_manager = self._create_game_manager()
+        self.save_backups = SaveBackupStore()
+        # One process snapshot per tick gives every row its running status
+        self.process_service = ProcessSnapshotService()
+        self.process_states_changed.connect(self._on_process_states_changed)
+        self.process_service.subscribe(self.process_states_changed.emit)
+        self.process_service.start()
+        self.play_session_ended.connect(self._on_play_session_ended)
+        self.session_tracker = SessionTracker(self.play_session_ended.emit, self.process_service)
         self.steam_path = find_steam_install_path()
         self.steam_userdata_path = find_steam_userdata_path(self.steam_path)
 
@@ -58,6 +88,13 @@ class GameshelfUI(QMainWindow):
                                 "will be unavailable because no Steam Web API Key "
                                 "is configured. Please go to Settings to add your API key.")
         self.steam_workshop_integrator = SteamWorkshopIntegrator(api_key=steam_api_key)
+        # Steam Web API calls from the UI run on the runner's event loop
+        self.async_runner = AsyncRunner()
+        self.async_steam_api = AsyncSteamApi(steam_api_key)
+        self.background_result.connect(self._on_background_result)
+        # Filled in by the first background refresh; edits read its content paths
+        self.workshop_inventory = None
+        self._refresh_workshop_inventory()
 
         # Konami Code setup
         self.konami_code_sequence = [
@@ -143,9 +180,17 @@ class GameshelfUI(QMainWindow):
         search_layout.addWidget(self.search_input)
 
         self.search_by_combo = QComboBox(self)
-        self.search_by_combo.addItems(["Title", "Platform", "Genre"])
+        self.search_by_combo.addItems(["Title", "Platform", "Genre", "All"])
+        self.search_by_combo.currentIndexChanged.connect(lambda _: self._perform_search())
         search_layout.addWidget(self.search_by_combo)
 
+        # Filter as the user types, once typing pauses
+        self.search_debounce_timer = QTimer(self)
+        self.search_debounce_timer.setSingleShot(True)
+        self.search_debounce_timer.setInterval(150)
+        self.search_debounce_timer.timeout.connect(self._perform_search)
+        self.search_input.textChanged.connect(lambda _: self.search_debounce_timer.start())
+
         self.search_button = QPushButton("Search")
         self.search_button.clicked.connect(self._perform_search)
         search_layout.addWidget(self.search_button)
@@ -230,6 +275,12 @@ class GameshelfUI(QMainWindow):
         cloud_save_layout = QHBoxLayout()
         cloud_save_layout.addWidget(self.cloud_save_path_edit_input)
         cloud_save_layout.addWidget(self.browse_cloud_save_button)
+        self.backup_saves_button = QPushButton("Back Up Saves")
+        self.backup_saves_button.clicked.connect(self._backup_saves)
+        cloud_save_layout.addWidget(self.backup_saves_button)
+        self.restore_saves_button = QPushButton("Restore Saves...")
+        self.restore_saves_button.clicked.connect(self._restore_saves)
+        cloud_save_layout.addWidget(self.restore_saves_button)
         self.edit_form_layout.addRow("Cloud Save Path:", cloud_save_layout)
 
         # Informational label about Steam Cloud Sync limitations
@@ -272,7 +323,64 @@ class GameshelfUI(QMainWindow):
 
         self._create_menu_bar()
         self._init_gamepad()
-        self._update_game_table()
+        self._start_progressive_load()
+
+    def _create_game_manager(self):
+        if self.settings.value("library_storage", "JSON") == "SQLite":
+            games_file = os.path.join(os.path.dirname(__file__), "games.json")
+            db_file = os.path.join(os.path.dirname(__file__), "games.db")
+            if not os.path.exists(db_file) and (os.path.exists(games_file) or os.path.exists(games_file + ".journal")):
+                try:
+                    migrate_from_json(games_file, db_file)
+                except Exception as e:
+                    # games.json is untouched and games.db was not created, so the next start tries again
+                    print(f"Error migrating the library to SQLite: {e}")
+                    QMessageBox.critical(self, "Library Migration Failed",
+                                         f"Could not move the library to SQLite: {e}\n\n"
+                                         "Gameshelf will keep using games.json for now.")
+                    return GameManager(journaled=True, autoload=False)
+            return SQLiteGameManager(db_file)
+        return GameManager(journaled=True, autoload=False)
+
+    def _start_progressive_load(self):
+        # The library is parsed a slice at a time between UI events, so the
+        # window is usable and the first rows show before the whole file is read.
+        self.game_table.setRowCount(0)
+        self.library_batches = self.game_manager.load_games_progressively()
+        QTimer.singleShot(0, self._load_library_batches)
+
+    def _load_library_batches(self):
+        if self.library_batches is None:
+            return
+        deadline = time.perf_counter() + 0.05
+        try:
+            while time.perf_counter() < deadline:
+                games = next(self.library_batches)
+                if not self.search_input.text().strip():
+                    self._append_game_rows(games)
+        except StopIteration:
+            self.library_batches = None
+            if self.search_input.text().strip():
+                self._perform_search()
+            return
+        except Exception as e:
+            self.library_batches = None
+            print(f"Error loading library: {e}")
+            QMessageBox.critical(self, "Library", f"Could not load the game library: {e}\n\n"
+                                 "Saving is disabled until Gameshelf is restarted, so the library file is not "
+                                 "overwritten with an incomplete one.")
+            return
+        QTimer.singleShot(0, self._load_library_batches)
+
+    def _finish_progressive_load(self):
+        if self.library_batches is not None:
+            try:
+                for _ in self.library_batches:
+                    pass
+            except Exception as e:
+                # The manager has disabled saving; closing must go on
+                print(f"Error loading library: {e}")
+            self.library_batches = None
 
     def _import_from_steam(self):
         # This method will contain the logic for importing Steam games.
@@ -298,14 +406,23 @@ class GameshelfUI(QMainWindow):
         all_appids = [appid for appid in steam_games.keys()]
         appinfo_details = get_game_details_from_appinfo_vdf(steam_path, all_appids)
 
+        # Rank every game's executables at once on a worker pool
+        executables = shared_executable_finder().find_for_games(
+            (game_info['full_install_path'], game_info['name']) for game_info in steam_games.values())
+
+        # Pick up artwork Steam downloaded since the index was last refreshed
+        if steam_path:
+            shared_artwork_index(steam_path).refresh()
+
         found_steam_games_list = []
         for appid, game_info in steam_games.items():
             artwork = get_steam_artwork_paths(steam_path, appid)
-            game_executable_path = find_game_executable(game_info['full_install_path'], game_info['name'])
+            candidates = executables.get(game_info['full_install_path'])
+            game_executable_path = candidates[0] if candidates else None
             cloud_save_path = get_steam_cloud_save_paths(steam_userdata_path, appid) if steam_userdata_path else ""
             print(f"DEBUG: AppID: {appid}, Userdata Path: {steam_userdata_path}, Calculated Cloud Save Path: {cloud_save_path}")
 
-            game_info['executable_path'] = game_executable_path if game_executable_path else 'Not found'
+            game_info['executable_path'] = game_executable_path if game_executable_path else EXECUTABLE_NOT_FOUND
             game_info['artwork'] = artwork
             game_info['cloud_save_path'] = cloud_save_path
             found_steam_games_list.append(game_info)
@@ -315,6 +432,11 @@ class GameshelfUI(QMainWindow):
             if dialog.exec_() == QDialog.Accepted:
                 selected_games = dialog.get_selected_games()
                 if selected_games:
+                    # One pass over every library's workshop manifests, skipped if nothing changed; the lookups below read the result
+                    if self.steam_path:
+                        self.workshop_inventory = get_workshop_inventory(self.steam_path)
+                        self.workshop_inventory.refresh_if_stale()
+                    records = []
                     for game_data in selected_games:
                         appid = game_data['appid']
                         
@@ -323,27 +445,29 @@ class GameshelfUI(QMainWindow):
                             game_data.update(appinfo_details[str(appid)])
 
                         cloud_save_path = get_steam_cloud_save_paths(self.steam_userdata_path, appid)
-                        workshop_content_paths = get_steam_workshop_content_paths(self.steam_path, appid)
-
-                        self.game_manager.add_game(
-                            title=game_data["name"],
-                            platform="PC (Steam)",
-                            genre=game_data.get("genres", ""), # Use genre from appinfo.vdf if available
-                            executable_path=game_data['executable_path'],
-                            launch_arguments=f"steam://rungameid/{appid}",
-                            artwork=game_data['artwork'],
-                            cloud_save_path=cloud_save_path,
-                            steam_app_id=appid,
-                            workshop_content_paths=workshop_content_paths,
-                            developer=game_data.get("developer", ""),
-                            publisher=game_data.get("publisher", ""),
-                            game_type=game_data.get("type", ""),
-                            os_list=game_data.get("oslist", ""),
-                            release_state=game_data.get("releasestate", ""),
-                            description=game_data.get("gamedescription", "")
-                        )
+                        workshop_content_paths = self.workshop_inventory.content_paths(appid) if self.workshop_inventory else []
+
+                        records.append({
+                            "title": game_data["name"],
+                            "platform": "PC (Steam)",
+                            "genre": game_data.get("genres", ""), # Use genre from appinfo.vdf if available
+                            "executable_path": "" if game_data['executable_path'] == EXECUTABLE_NOT_FOUND else game_data['executable_path'],
+                            "launch_arguments": f"steam://rungameid/{appid}",
+                            "artwork": game_data['artwork'],
+                            "cloud_save_path": cloud_save_path,
+                            "steam_app_id": appid,
+                            "workshop_content_paths": workshop_content_paths,
+                            "developer": game_data.get("developer", ""),
+                            "publisher": game_data.get("publisher", ""),
+                            "game_type": game_data.get("type", ""),
+                            "os_list": game_data.get("oslist", ""),
+                            "release_state": game_data.get("releasestate", ""),
+                            "description": game_data.get("gamedescription", "")
+                        })
+                    # Re-importing refreshes games already in the library instead of duplicating them
+                    report = self.game_manager.merge_games(records)
                     self._update_game_table()
-                    QMessageBox.information(self, "Games Added", f"Successfully added {len(selected_games)} Steam games.")
+                    QMessageBox.information(self, "Games Added", self._import_summary(report, "Steam games"))
                 else:
                     QMessageBox.information(self, "No Games Selected", "No Steam games were selected to add.")
         else:
@@ -389,6 +513,7 @@ class GameshelfUI(QMainWindow):
             # Settings saved, re-apply if necessary
             updated_api_key = dialog.get_steam_api_key()
             self.steam_workshop_integrator = SteamWorkshopIntegrator(api_key=updated_api_key)
+            self.async_steam_api.api_key = updated_api_key
             self._update_game_table() # Re-update game table in case artwork preference changed
             new_theme = self.settings.value("theme_preference", "Dark").lower()
             self.apply_theme(new_theme)
@@ -459,7 +584,7 @@ class GameshelfUI(QMainWindow):
                 self.gamepad_status_label.setText("Gamepad: Connected")
 
     def _show_add_game_form(self):
-        self.current_edit_game_index = -1
+        self.current_edit_game_id = None
         self.title_input.clear()
         self.platform_input.clear()
         self.genre_edit_input.clear()
@@ -510,14 +635,15 @@ class GameshelfUI(QMainWindow):
             QMessageBox.warning(self, "Input Error", "Title, Platform, and Genre cannot be empty.")
             return
 
-        original_game = self.game_manager.get_all_games()[self.current_edit_game_index]
+        original_game = self.game_manager.get_game(self.current_edit_game_id)
         steam_app_id = original_game.get("steam_app_id")
         artwork = original_game.get("artwork")
         workshop_content_paths = original_game.get("workshop_content_paths", []) # Preserve existing if not Steam game
 
-        if steam_app_id:
-            # If it's a Steam game, re-fetch workshop content paths
-            workshop_content_paths = get_steam_workshop_content_paths(self.steam_path, steam_app_id)
+        inventory = self.workshop_inventory
+        if steam_app_id and inventory and inventory.refreshed:
+            # If it's a Steam game, take its workshop content paths from the inventory the background refresh built
+            workshop_content_paths = inventory.content_paths(steam_app_id)
 
         # Read new fields from UI (assuming they exist)
         developer = self.developer_edit_input.text().strip()
@@ -528,7 +654,7 @@ class GameshelfUI(QMainWindow):
         description = self.description_edit_input.toPlainText().strip() # Assuming QTextEdit for description
 
         self.game_manager.edit_game(
-            self.current_edit_game_index,
+            self.current_edit_game_id,
             title,
             platform,
             genre,
@@ -565,7 +691,7 @@ class GameshelfUI(QMainWindow):
     def _perform_search(self):
         query = self.search_input.text()
         category = self.search_by_combo.currentText().lower()
-        results = self.game_manager.search_games(query, category)
+        results = self.game_manager.search_games(query, category, limit=SEARCH_RESULT_LIMIT)
         self._update_game_table(results)
 
     def _clear_search(self):
@@ -576,12 +702,17 @@ class GameshelfUI(QMainWindow):
         self.game_table.setRowCount(0)
         if games is None:
             games = self.game_manager.get_all_games()
+        self._append_game_rows(games)
 
+    def _append_game_rows(self, games):
+        self.process_service.watch(game.get("executable_path") for game in games if game.get("steam_app_id"))
         for game in games:
             row_position = self.game_table.rowCount()
             self.game_table.insertRow(row_position)
 
-            self.game_table.setItem(row_position, 0, QTableWidgetItem(game["title"]))
+            title_item = QTableWidgetItem(game["title"])
+            title_item.setData(Qt.UserRole, game["id"])
+            self.game_table.setItem(row_position, 0, title_item)
             self.game_table.setItem(row_position, 1, QTableWidgetItem(game["platform"]))
             self.game_table.setItem(row_position, 2, QTableWidgetItem(game["genre"]))
 
@@ -604,32 +735,65 @@ class GameshelfUI(QMainWindow):
                 artwork_label.setAlignment(Qt.AlignCenter)
             self.game_table.setCellWidget(row_position, 3, artwork_label)
 
-            status = ""
-            if game.get("steam_app_id"):
-                game_executable_path = game.get("executable_path")
-                if game_executable_path and is_steam_game_running(game_executable_path):
-                    status = "Running"
-                else:
-                    status = "Installed"
-            else:
-                status = "N/A"
-            self.game_table.setItem(row_position, 4, QTableWidgetItem(status))
+            self.game_table.setItem(row_position, 4, QTableWidgetItem(self._game_status(game)))
 
             edit_button = QPushButton("Edit")
-            edit_button.clicked.connect(lambda _, r=row_position: self._edit_game_from_ui(r))
+            edit_button.clicked.connect(lambda _, game_id=game["id"]: self._edit_game_from_ui(game_id))
             self.game_table.setCellWidget(row_position, 5, edit_button)
 
             delete_button = QPushButton("Delete")
-            delete_button.clicked.connect(lambda _, r=row_position: self._delete_game_from_ui(r))
+            delete_button.clicked.connect(lambda _, game_id=game["id"]: self._delete_game_from_ui(game_id))
             self.game_table.setCellWidget(row_position, 6, delete_button)
 
             launch_button = QPushButton("Launch")
-            launch_button.clicked.connect(lambda _, r=row_position: self._launch_game(r))
+            launch_button.clicked.connect(lambda _, game_id=game["id"]: self._launch_game(game_id))
             self.game_table.setCellWidget(row_position, 7, launch_button)
 
-    def _edit_game_from_ui(self, row):
-        self.current_edit_game_index = row
-        game_to_edit = self.game_manager.get_all_games()[row]
+    def _game_status(self, game, running=None):
+        if not game.get("steam_app_id"):
+            return "N/A"
+        if running is None:
+            running = self.process_service.is_running(game.get("executable_path"))
+        return "Running" if running else "Installed"
+
+    def _on_process_states_changed(self, changes):
+        changes = {os.path.normcase(os.path.normpath(path)): running for path, running in changes.items()}
+        for row in range(self.game_table.rowCount()):
+            title_item = self.game_table.item(row, 0)
+            game = self.game_manager.get_game(title_item.data(Qt.UserRole)) if title_item else None
+            if not game or not game.get("executable_path"):
+                continue
+            running = changes.get(os.path.normcase(os.path.normpath(game["executable_path"])))
+            if running is not None:
+                self.game_table.setItem(row, 4, QTableWidgetItem(self._game_status(game, running)))
+
+    def _on_play_session_ended(self, game_id, start, end):
+        if self.game_manager.get_game(game_id):
+            self.game_manager.record_play_session(game_id, start, end)
+
+    def _refresh_workshop_inventory(self):
+        """
+        Brings the workshop inventory up to date on the async runner's
+        thread pool; a few stats when no workshop folder changed.
+        """
+        if not self.steam_path:
+            return
+        steam_path = self.steam_path
+        def refresh():
+            inventory = get_workshop_inventory(steam_path)
+            inventory.refresh_if_stale()
+            self.workshop_inventory = inventory
+        def done(result, error):
+            if error:
+                print(f"Error refreshing workshop inventory: {error}")
+        self.async_runner.run_in_thread(refresh, done)
+
+    def _edit_game_from_ui(self, game_id):
+        self.current_edit_game_id = game_id
+        game_to_edit = self.game_manager.get_game(game_id)
+        # Ready by the time the edit is saved, unless Steam is still changing items
+        if game_to_edit.get("steam_app_id"):
+            self._refresh_workshop_inventory()
 
         self.title_edit_input.setText(game_to_edit.get("title", ""))
         self.platform_edit_input.setText(game_to_edit.get("platform", ""))
@@ -663,17 +827,14 @@ class GameshelfUI(QMainWindow):
 
         self.stacked_widget.setCurrentWidget(self.edit_form_widget)
 
-    def _delete_game_from_ui(self, row):
-        # Get the game from the game manager based on the row
-        # Assuming game_manager has a way to get games by index or ID
-        # For now, let's assume we can get the game's title from the table
-        # Get the game title for the confirmation message
-        game_title = self.game_table.item(row, 0).text()
+    def _delete_game_from_ui(self, game_id):
+        game_title = self.game_manager.get_game(game_id)["title"]
         reply = QMessageBox.question(self, 'Delete Game', f"Are you sure you want to delete '{game_title}'?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            self.game_manager.delete_game(row) # Pass the row (index) directly
+            self.game_manager.delete_game(game_id)
+            self.game_manager.save_games()
             self._update_game_table()
             QMessageBox.information(self, "Game Deleted", f"'{game_title}' has been deleted.")
 
@@ -690,8 +851,8 @@ class GameshelfUI(QMainWindow):
             self.iso_paths_edit_input.setText(",".join(file_paths))
 
     def _open_cloud_save_folder(self):
-        if self.current_edit_game_index != -1:
-            game = self.game_manager.get_all_games()[self.current_edit_game_index]
+        if self.current_edit_game_id is not None:
+            game = self.game_manager.get_game(self.current_edit_game_id)
             cloud_save_path = game.get("cloud_save_path")
 
             if cloud_save_path and os.path.exists(cloud_save_path):
@@ -699,6 +860,75 @@ class GameshelfUI(QMainWindow):
                     subprocess.Popen(f'explorer "{cloud_save_path}"')
                 except Exception as e:
                     QMessageBox.critical(self, "Error", f"Could not open folder: {e}")
+    def _backup_saves(self):
+        if self.current_edit_game_id is None:
+            return
+        game = self.game_manager.get_game(self.current_edit_game_id)
+        cloud_save_path = game.get("cloud_save_path")
+        if not cloud_save_path or not os.path.isdir(cloud_save_path):
+            QMessageBox.warning(self, "Back Up Saves", f"No save folder found for {game['title']}.")
+            return
+        self._set_save_backup_buttons_enabled(False)
+        self._run_in_background(lambda: self.save_backups.snapshot(game["id"], cloud_save_path),
+                                lambda snapshot, error: self._on_saves_backed_up(game, snapshot, error))
+
+    def _on_saves_backed_up(self, game, snapshot, error):
+        self._set_save_backup_buttons_enabled(True)
+        if error:
+            QMessageBox.critical(self, "Back Up Saves", f"Could not back up saves: {error}")
+            return
+        stats = snapshot["stats"]
+        message = (f"Backup {snapshot['id']} of {game['title']}: {stats['files_hashed']} of "
+                   f"{stats['files']} files changed, {stats['new_bytes'] / 1024:.0f} KiB stored.")
+        if snapshot["skipped"]:
+            message += f" {len(snapshot['skipped'])} could not be read and were left out."
+        QMessageBox.information(self, "Back Up Saves", message)
+
+    def _set_save_backup_buttons_enabled(self, enabled):
+        # One backup or restore at a time; the store works on one snapshot at once
+        self.backup_saves_button.setEnabled(enabled)
+        self.restore_saves_button.setEnabled(enabled)
+
+    def _restore_saves(self):
+        if self.current_edit_game_id is None:
+            return
+        game = self.game_manager.get_game(self.current_edit_game_id)
+        cloud_save_path = game.get("cloud_save_path")
+        snapshots = self.save_backups.snapshots(game["id"])
+        if not cloud_save_path or not snapshots:
+            QMessageBox.information(self, "Restore Saves", f"There are no save backups of {game['title']}.")
+            return
+        labels = [f"Backup {snapshot['id']} - {time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot['created']))}"
+                  for snapshot in reversed(snapshots)]
+        label, accepted = QInputDialog.getItem(self, "Restore Saves", "Backup to restore:", labels, 0, False)
+        if not accepted:
+            return
+        snapshot_id = list(reversed(snapshots))[labels.index(label)]["id"]
+        reply = QMessageBox.question(self, "Restore Saves",
+                                     f"Replace the saves in {cloud_save_path} with backup {snapshot_id}? "
+                                     "Files not in the backup will be deleted.",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self._set_save_backup_buttons_enabled(False)
+        self._run_in_background(lambda: self.save_backups.restore(game["id"], snapshot_id, cloud_save_path, delete_extra=True),
+                                lambda written, error: self._on_saves_restored(game, snapshot_id, error))
+
+    def _on_saves_restored(self, game, snapshot_id, error):
+        self._set_save_backup_buttons_enabled(True)
+        if error:
+            QMessageBox.critical(self, "Restore Saves", f"Could not restore saves: {error}")
+            return
+        QMessageBox.information(self, "Restore Saves", f"Restored backup {snapshot_id} of {game['title']}.")
+
+    def _import_summary(self, report, what):
+        summary = f"Successfully added {len(report['added'])} {what}."
+        if report["updated"]:
+            summary += f" Updated {len(report['updated'])} already in the library."
+        if report["skipped"]:
+            summary += f" Skipped {len(report['skipped'])} already in the library."
+        return summary
+
     def _scan_for_games(self):
         scan_directory = QFileDialog.getExistingDirectory(self, "Select Directory to Scan", "")
         if not scan_directory:
@@ -719,24 +949,26 @@ class GameshelfUI(QMainWindow):
         if dialog.exec_() == QDialog.Accepted:
             selected_executables = dialog.get_selected_executables()
             if selected_executables:
+                records = []
                 for exe_path in selected_executables:
                     # Derive title from filename, remove .exe extension
                     title = os.path.splitext(os.path.basename(exe_path))[0]
-                    self.game_manager.add_game(
-                        title=title,
-                        platform="PC", # Assuming PC for .exe files
-                        genre="Unknown", # Can be updated later
-                        executable_path=exe_path,
-                        launch_arguments="",
-                        iso_paths=[]
-                    )
+                    records.append({
+                        "title": title,
+                        "platform": "PC", # Assuming PC for .exe files
+                        "genre": "Unknown", # Can be updated later
+                        "executable_path": exe_path,
+                        "launch_arguments": "",
+                        "iso_paths": []
+                    })
+                report = self.game_manager.add_games(records)
                 self._update_game_table()
-                QMessageBox.information(self, "Games Added", f"Successfully added {len(selected_executables)} games.")
+                QMessageBox.information(self, "Games Added", self._import_summary(report, "games"))
             else:
                 QMessageBox.information(self, "No Games Selected", "No games were selected to add.")
 
-    def _launch_game(self, row):
-        game_to_launch = self.game_manager.get_all_games()[row]
+    def _launch_game(self, game_id):
+        game_to_launch = self.game_manager.get_game(game_id)
         game_title = game_to_launch.get("title", "Unknown Game")
         steam_app_id = game_to_launch.get("steam_app_id")
         executable_path = game_to_launch.get("executable_path", "")
@@ -755,6 +987,8 @@ class GameshelfUI(QMainWindow):
             try:
                 steam_url = f"steam://rungameid/{steam_app_id}"
                 os.startfile(steam_url)
+                if executable_path and os.path.isfile(executable_path):
+                    self.session_tracker.track_executable(game_id, executable_path)
                 QMessageBox.information(self, "Launch Game", f"Successfully launched {game_title} via Steam.")
             except Exception as e:
                 QMessageBox.critical(self, "Launch Error", f"An error occurred while launching {game_title} via Steam: {e}")
@@ -769,7 +1003,8 @@ class GameshelfUI(QMainWindow):
 
         try:
             command = [executable_path] + launch_args
-            subprocess.Popen(command)
+            process = subprocess.Popen(command)
+            self.session_tracker.track_process(game_id, process, executable_path)
             QMessageBox.information(self, "Launch Game", f"Successfully launched {game_title}.")
         except FileNotFoundError:
             QMessageBox.critical(self, "Launch Error", f"Executable not found at: {executable_path}")
@@ -784,16 +1019,16 @@ class GameshelfUI(QMainWindow):
         if not index.isValid():
             return
 
-        row = index.row()
-        game = self.game_manager.get_all_games()[row]
+        game_id = self.game_table.item(index.row(), 0).data(Qt.UserRole)
+        game = self.game_manager.get_game(game_id)
 
         context_menu = QMenu(self)
 
         launch_action = context_menu.addAction("Launch Game")
-        launch_action.triggered.connect(lambda: self._launch_game(row))
+        launch_action.triggered.connect(lambda: self._launch_game(game_id))
 
         show_info_action = context_menu.addAction("Show Game Info")
-        show_info_action.triggered.connect(lambda: self._edit_game_from_ui(row))
+        show_info_action.triggered.connect(lambda: self._edit_game_from_ui(game_id))
 
         icon_pixmap = None
         app_id = game.get("steam_app_id")
@@ -824,6 +1059,23 @@ class GameshelfUI(QMainWindow):
         self.stacked_widget.setCurrentWidget(self.workshop_page)
         self._perform_workshop_search()
 
+    def _run_steam_api(self, coroutine, on_done):
+        """
+        Runs a Steam Web API coroutine off the UI thread; on_done(result,
+        error) is called back on the UI thread.
+        """
+        self.async_runner.submit(coroutine, lambda result, error: self.background_result.emit(on_done, result, error))
+
+    def _run_in_background(self, function, on_done):
+        """
+        Runs a blocking function, e.g. a save backup, off the UI thread;
+        on_done(result, error) is called back on the UI thread.
+        """
+        self.async_runner.run_in_thread(function, lambda result, error: self.background_result.emit(on_done, result, error))
+
+    def _on_background_result(self, on_done, result, error):
+        on_done(result, error)
+
     def _perform_workshop_search(self):
         search_text = self.workshop_search_input.text()
         # Using a common appid for testing, e.g., 440 for Team Fortress 2
@@ -831,10 +1083,16 @@ class GameshelfUI(QMainWindow):
         # or be configurable.
         appid = 440 # Example: Team Fortress 2 AppID
 
-        results = self.steam_workshop_integrator.search_workshop_items(
-            appid=appid,
-            search_text=search_text
-        )
+        self.workshop_search_button.setEnabled(False)
+        # The first five result pages are fetched at the same time
+        self._run_steam_api(self.async_steam_api.search_workshop_pages(appid=appid, search_text=search_text, pages=5),
+                            self._show_workshop_results)
+
+    def _show_workshop_results(self, results, error):
+        self.workshop_search_button.setEnabled(True)
+        if error is not None:
+            QMessageBox.critical(self, "Workshop Search Error", f"An error occurred during search: {error}")
+            return
 
         self.workshop_results_table.setColumnCount(4) # Title, Description, PublishedFileId, Creator
         self.workshop_results_table.setHorizontalHeaderLabels(["Title", "Description", "File ID", "Creator"])
@@ -864,48 +1122,55 @@ class GameshelfUI(QMainWindow):
             QMessageBox.warning(self, "SteamID Not Found", "Could not determine current Steam user ID.")
             return
 
-        # Fetch friends list
-        friends_list = get_steam_friends_list(steam_api_key, current_steam_id)
-
-        if friends_list:
-            # Extract SteamIDs of friends to get their summaries
-            friend_steam_ids = [friend['steamid'] for friend in friends_list]
-            player_summaries = get_steam_player_summaries(steam_api_key, friend_steam_ids)
-
-            if player_summaries:
-                # Update the UI with friends' information
-                friends_info = []
-                for player in player_summaries:
-                    persona_name = player.get('personaname', 'Unknown')
-                    persona_state = player.get('personastate', 0) # 0 = Offline, 1 = Online, etc.
-                    game_extra_info = player.get('gameextrainfo', '')
-                    
-                    status = "Offline"
-                    if persona_state == 1:
-                        status = "Online"
-                    elif persona_state == 2:
-                        status = "Busy"
-                    elif persona_state == 3:
-                        status = "Away"
-                    elif persona_state == 4:
-                        status = "Snooze"
-                    elif persona_state == 5:
-                        status = "Looking to Trade"
-                    elif persona_state == 6:
-                        status = "Looking to Play"
-                    
-                    if game_extra_info:
-                        status += f" (Playing: {game_extra_info})"
-                    
-                    friends_info.append(f"{persona_name}: {status}")
-                
-                self.steam_friends_label.setText("\n".join(friends_info))
-            else:
-                self.steam_friends_label.setText("Could not retrieve player summaries for friends.")
-        else:
-            self.steam_friends_label.setText("Could not retrieve Steam friends list.")
-        
+        self.steam_friends_label.setText("Loading Steam friends...")
         self.stacked_widget.setCurrentWidget(self.steam_friends_page)
+        self._run_steam_api(self._fetch_steam_friends(current_steam_id), self._show_steam_friends)
+
+    async def _fetch_steam_friends(self, steam_id):
+        # Runs on the async runner's loop, not the UI thread
+        friends_list = await self.async_steam_api.get_friends_list(steam_id)
+        if not friends_list:
+            return []
+        # Extract SteamIDs of friends to get their summaries
+        friend_steam_ids = [friend['steamid'] for friend in friends_list]
+        return await self.async_steam_api.get_player_summaries(friend_steam_ids)
+
+    def _show_steam_friends(self, player_summaries, error):
+        if error is not None:
+            self.steam_friends_label.setText(f"Could not retrieve Steam friends: {error}")
+            return
+        if not player_summaries:
+            self.steam_friends_label.setText("No Steam friends found.")
+            return
+
+        # Update the UI with friends' information
+        friends_info = []
+        for player in player_summaries:
+            persona_name = player.get('personaname', 'Unknown')
+            persona_state = player.get('personastate', 0) # 0 = Offline, 1 = Online, etc.
+            game_extra_info = player.get('gameextrainfo', '')
+
+            status = "Offline"
+            if persona_state == 1:
+                status = "Online"
+            elif persona_state == 2:
+                status = "Busy"
+            elif persona_state == 3:
+                status = "Away"
+            elif persona_state == 4:
+                status = "Snooze"
+            elif persona_state == 5:
+                status = "Looking to Trade"
+            elif persona_state == 6:
+                status = "Looking to Play"
+
+            if game_extra_info:
+                status += f" (Playing: {game_extra_info})"
+
+            friends_info.append(f"{persona_name}: {status}")
+
+        self.steam_friends_label.setText("\n".join(friends_info))
+
     def _import_from_arc(self):
         ARC_GAMES_PATH = "C:\\Program Files (x86)\\Arc"
         if not os.path.exists(ARC_GAMES_PATH):
@@ -927,18 +1192,20 @@ class GameshelfUI(QMainWindow):
         if dialog.exec_() == QDialog.Accepted:
             selected_executables = dialog.get_selected_executables()
             if selected_executables:
+                records = []
                 for exe_path in selected_executables:
                     title = os.path.splitext(os.path.basename(exe_path))[0]
-                    self.game_manager.add_game(
-                        title=title,
-                        platform="PC",
-                        genre="Unknown",
-                        executable_path=exe_path,
-                        launch_arguments="",
-                        iso_paths=[]
-                    )
+                    records.append({
+                        "title": title,
+                        "platform": "PC",
+                        "genre": "Unknown",
+                        "executable_path": exe_path,
+                        "launch_arguments": "",
+                        "iso_paths": []
+                    })
+                report = self.game_manager.add_games(records)
                 self._update_game_table()
-                QMessageBox.information(self, "Arc Games Import", f"Successfully added {len(selected_executables)} games from Arc.")
+                QMessageBox.information(self, "Arc Games Import", self._import_summary(report, "games from Arc"))
             else:
                 QMessageBox.information(self, "Arc Games Import", "No games were selected to add from Arc.")
 
@@ -952,7 +1219,25 @@ class GameshelfUI(QMainWindow):
             self.steam_cloud_status_label.setText("Steam Cloud Sync: Steamworks SDK not detected. Features unavailable.")
 
     def closeEvent(self, event):
+        # Saving is held back until the library is fully loaded
+        self._finish_progressive_load()
+        # Games still running are recorded up to now, and their waiters no longer report them
+        for game_id, start in self.session_tracker.stop().items():
+            self._on_play_session_ended(game_id, start, time.time())
+        # Sessions that ended just before are still queued on play_session_ended; record them before the final save
+        QApplication.sendPostedEvents(self, QEvent.MetaCall)
         self.game_manager.save_games()
+        self.game_manager.close() # flushes the pending background save
+        self.process_service.stop()
+        try:
+            self.async_runner.submit(self.async_steam_api.client.aclose()).result(timeout=5)
+        except (concurrent.futures.TimeoutError, Exception) as e:
+            # A hung or failing close must not keep the rest of the shutdown from running
+            print(f"Error closing the Steam Web API client: {e!r}")
+        finally:
+            if self.async_steam_api.client.cache is not None:
+                self.async_steam_api.client.cache.flush() # last-used times of the lookups since the last batch
+            self.async_runner.stop()
         if self.iso_manager.get_mounted_drive_letter():
             self.iso_manager.dismount_iso()
         pygame.quit()
@@ -0,0 +1,164 @@
+import os
+import json
+import threading
+from library_persistence import atomic_write_json
+from library_schema import read_library, library_document
+
+class LibraryJournal:
+    """
+    Append-only change log kept next to the games.json snapshot.
+
+    Every add/edit/delete becomes one JSON line ("put" carries the full game,
+    "delete" carries its id). Lines are buffered until write_pending appends
+    them in a single write, so the cost of a save follows the size of the
+    changes. Loading replays the log on top of the snapshot, and compaction
+    folds the log back into a fresh snapshot on a background thread.
+    """
+    def __init__(self, snapshot_path, compact_threshold=1024 * 1024):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        # While a compaction runs, the log it is folding is parked here so new
+        # changes can keep going to a fresh journal file.
+        self.compacting_path = self.journal_path + ".compacting"
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._journal_file = None
+        self._pending_lines = []
+        self._compaction_thread = None
+
+    def load(self):
+        """
+        Returns (games, migrated): the snapshot's games with every logged
+        change applied, and whether the snapshot needed a schema migration.
+        """
+        games = []
+        migrated = False
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                games, migrated = read_library(json.load(f))
+        puts, deleted_ids = self.read_changes()
+        snapshot_ids = {game["id"] for game in games}
+        games = self.apply_changes(games, puts, deleted_ids)
+        games.extend(game for game_id, game in puts.items() if game_id not in snapshot_ids)
+        return games, migrated
+
+    def read_changes(self):
+        """
+        Returns (puts, deleted_ids) from the logged records: the latest
+        version of every game written since the snapshot, in the order they
+        were first written, and the ids deleted since the snapshot.
+        """
+        puts = {}
+        deleted_ids = set()
+        # Replaying is idempotent, so a compaction that died half way through
+        # leaves nothing worse than a log that is applied twice.
+        for path in (self.compacting_path, self.journal_path):
+            for record in self._read_records(path):
+                if record.get("op") == "put":
+                    puts[record["game"]["id"]] = record["game"]
+                    deleted_ids.discard(record["game"]["id"])
+                elif record.get("op") == "delete":
+                    puts.pop(record["id"], None)
+                    deleted_ids.add(record["id"])
+        return puts, deleted_ids
+
+    @staticmethod
+    def apply_changes(games, puts, deleted_ids):
+        """
+        Returns the snapshot games with logged edits and deletes applied.
+        Games added since the snapshot are left for the caller to append.
+        """
+        return [puts.get(game["id"], game) for game in games if game["id"] not in deleted_ids]
+
+    def _read_records(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; everything before it is good.
+                    print(f"Warning: Skipping unreadable journal record in {path}")
+
+    def append_put(self, game):
+        self._append({"op": "put", "game": game})
+
+    def append_delete(self, game_id):
+        self._append({"op": "delete", "id": game_id})
+
+    def _append(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._pending_lines.append(line)
+
+    def write_pending(self):
+        with self._lock:
+            if not self._pending_lines:
+                return
+            if self._journal_file is None:
+                self._journal_file = open(self.journal_path, "a", encoding="utf-8")
+            self._journal_file.write("".join(self._pending_lines))
+            self._journal_file.flush()
+            os.fsync(self._journal_file.fileno())
+            self._pending_lines = []
+
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal_path)
+        except OSError:
+            return 0
+
+    def needs_compaction(self):
+        return self.journal_size() >= self.compact_threshold
+
+    def compact(self, games, wait=False):
+        """
+        Folds the journal into a new snapshot of `games` in the background.
+        `games` must reflect every change logged so far and must not be
+        modified afterwards, so callers that log changes from other threads
+        must keep them out from taking `games` until this returns.
+        """
+        self.write_pending()
+        with self._lock:
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return False
+            # Windows cannot rename or delete a file that is still open
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+            if os.path.exists(self.compacting_path):
+                # A previous compaction never finished; fold its log in first.
+                with open(self.compacting_path, "a", encoding="utf-8") as pending:
+                    for record in self._read_records(self.journal_path):
+                        pending.write(json.dumps(record, separators=(",", ":")) + "\n")
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+            elif os.path.exists(self.journal_path):
+                os.replace(self.journal_path, self.compacting_path)
+            self._compaction_thread = threading.Thread(target=self._write_snapshot, args=(games,), daemon=True)
+            self._compaction_thread.start()
+        if wait:
+            self._compaction_thread.join()
+        return True
+
+    def _write_snapshot(self, games):
+        try:
+            atomic_write_json(self.snapshot_path, library_document(games))
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+            print(f"Compacted library journal into {self.snapshot_path}")
+        except OSError as e:
+            print(f"Error compacting library journal: {e}")
+
+    def close(self):
+        self.write_pending()
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+        with self._lock:
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
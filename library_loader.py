@@ -0,0 +1,108 @@
+import json
+from library_schema import SCHEMA_VERSION
+
+READ_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+
+class LibraryNeedsMigration(Exception):
+    """
+    Raised when games.json is not at the current schema version and has to
+    go through the full load_games path instead.
+    """
+
+class _Reader:
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def next_char(self):
+        """
+        Skips whitespace and returns the next character without consuming it ("" at end of file).
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.next_char() != char:
+            raise ValueError(f"Malformed games.json: expected {char!r}")
+        self.position += 1
+
+    def value(self, decoder):
+        """
+        Decodes the next JSON value, reading more of the file until it is complete.
+        """
+        self.next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def iter_game_batches(path, batch_size=500):
+    """
+    Yields the game dicts of a current-version games.json in lists of
+    batch_size, parsing the file incrementally instead of all at once.
+    Raises LibraryNeedsMigration before yielding anything if the file is at an
+    older schema version.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f)
+        if reader.next_char() != "{":
+            raise LibraryNeedsMigration()
+        reader.expect("{")
+
+        # Header keys come before "games" in files this build writes
+        version = 0
+        while True:
+            if reader.next_char() == "}":
+                return
+            key = reader.value(decoder)
+            reader.expect(":")
+            if key == "games":
+                break
+            value = reader.value(decoder)
+            if key == "schema_version":
+                version = value
+            if reader.next_char() == ",":
+                reader.expect(",")
+        if version != SCHEMA_VERSION:
+            raise LibraryNeedsMigration()
+
+        reader.expect("[")
+        batch = []
+        if reader.next_char() != "]":
+            while True:
+                batch.append(reader.value(decoder))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+                if reader.next_char() == ",":
+                    reader.expect(",")
+                    continue
+                reader.expect("]")
+                break
+        if batch:
+            yield batch
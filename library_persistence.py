@@ -0,0 +1,115 @@
+import os
+import json
+import tempfile
+import threading
+import time
+
+def atomic_write_json(path, data, indent=4):
+    """
+    Writes data to a temporary file next to path and renames it into place,
+    so readers never see a half-written file.
+    """
+    _atomic_write(path, "w", lambda f: json.dump(data, f, indent=indent), encoding="utf-8")
+
+def atomic_write_bytes(path, chunks):
+    """
+    Binary counterpart of atomic_write_json; writes each bytes-like chunk in turn.
+    """
+    def write(f):
+        for chunk in chunks:
+            f.write(chunk)
+    _atomic_write(path, "wb", write)
+
+def _atomic_write(path, mode, write, encoding=None):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class PersistenceWorker:
+    """
+    Runs save jobs on a background thread.
+
+    Jobs are keyed, so scheduling the same key again before it runs replaces
+    the earlier job. A burst of changes is written once, `delay` seconds after
+    the last one, and never later than `max_delay` after the first.
+    """
+    def __init__(self, delay=0.5, max_delay=5.0):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._first_scheduled = None
+        self._last_scheduled = None
+        self._running = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="PersistenceWorker", daemon=True)
+        self._thread.start()
+
+    def schedule(self, key, job):
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("PersistenceWorker has been stopped")
+            now = time.monotonic()
+            if not self._pending:
+                self._first_scheduled = now
+            self._last_scheduled = now
+            self._pending[key] = job
+            self._condition.notify_all()
+
+    def _due_in(self):
+        deadline = min(self._last_scheduled + self.delay, self._first_scheduled + self.max_delay)
+        return deadline - time.monotonic()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (self._running or not self._pending or self._due_in() > 0):
+                    self._condition.wait(self._due_in() if self._pending and not self._running else None)
+                if self._stopped:
+                    return
+                jobs = self._take_pending()
+            self._execute(jobs)
+
+    def _take_pending(self):
+        jobs = list(self._pending.values())
+        self._pending = {}
+        self._running = True
+        return jobs
+
+    def _execute(self, jobs):
+        try:
+            for job in jobs:
+                try:
+                    job()
+                except Exception as e:
+                    print(f"Error in background save: {e}")
+        finally:
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+
+    def flush(self):
+        """
+        Runs every pending job now, on the calling thread, after any write in progress.
+        """
+        with self._condition:
+            while self._running:
+                self._condition.wait()
+            jobs = self._take_pending()
+        self._execute(jobs)
+
+    def stop(self):
+        self.flush()
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
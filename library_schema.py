@@ -0,0 +1,79 @@
+import uuid
+
+# Version of the games.json layout written by this build. Version 0 is the
+# original bare list of games; later versions wrap the list as
+# {"schema_version": N, "games": [...]}.
+SCHEMA_VERSION = 3
+
+# from_version -> function upgrading a list of game dicts to from_version + 1
+MIGRATIONS = {}
+
+def migration(from_version):
+    def register(function):
+        MIGRATIONS[from_version] = function
+        return function
+    return register
+
+@migration(0)
+def _add_metadata_fields(games):
+    """
+    Fields added after the first release, backfilled for old entries.
+    """
+    defaults = {
+        "workshop_content_paths": [],
+        "developer": "",
+        "publisher": "",
+        "game_type": "",
+        "os_list": "",
+        "release_state": "",
+        "description": "",
+    }
+    for game in games:
+        for field, default in defaults.items():
+            if field not in game:
+                game[field] = list(default) if isinstance(default, list) else default
+    return games
+
+@migration(1)
+def _assign_ids(games):
+    """
+    Gives every game the stable id the library is keyed by.
+    """
+    for game in games:
+        if not game.get("id"):
+            game["id"] = uuid.uuid4().hex
+    return games
+
+@migration(2)
+def _add_play_history(games):
+    """
+    Playtime tracking: total seconds played, the Unix time the game was last
+    closed (0 if never) and the list of recorded sessions.
+    """
+    for game in games:
+        game.setdefault("playtime_seconds", 0)
+        game.setdefault("last_played", 0)
+        game.setdefault("play_sessions", [])
+    return games
+
+def read_library(document):
+    """
+    Takes a parsed games.json document of any known version and returns
+    (games, migrated), where migrated tells whether any migration ran.
+    """
+    if isinstance(document, list):
+        version, games = 0, document
+    else:
+        version, games = document.get("schema_version", 0), document.get("games", [])
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"games.json has schema version {version}, newer than this Gameshelf supports ({SCHEMA_VERSION})")
+
+    migrated = version < SCHEMA_VERSION
+    while version < SCHEMA_VERSION:
+        print(f"Migrating library from schema version {version} to {version + 1}")
+        games = MIGRATIONS[version](games)
+        version += 1
+    return games, migrated
+
+def library_document(games):
+    return {"schema_version": SCHEMA_VERSION, "games": games}
@@ -0,0 +1,249 @@
+import bisect
+import json
+import mmap
+import struct
+import sys
+from array import array
+from game_record import Game, FIELDS, LIST_FIELDS
+from library_persistence import atomic_write_bytes
+from library_schema import SCHEMA_VERSION
+
+# Layout of a binary library snapshot (all integers little-endian):
+#
+#   header          HEADER, see below
+#   string offsets  (string_count + 1) u64 offsets into the string data
+#   string data     every distinct string once, UTF-8, back to back
+#   records         one RECORD per game: a u32 string id per field in FIELDS,
+#                   then one for a JSON object of extra keys (0 if none)
+#   id index        u32 record numbers sorted by game id
+#
+# String id 0 is always "". List fields and artwork are stored as compact JSON
+# text. A field holding something other than a string goes into the extra
+# object, so every value round-trips exactly.
+MAGIC = b"GSHELFSN"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHIIIQQQQ")
+RECORD = struct.Struct("<" + "I" * (len(FIELDS) + 1))
+_STRING_SPAN = struct.Struct("<QQ")
+_INDEX_ENTRY = struct.Struct("<I")
+_JSON_FIELDS = LIST_FIELDS | {"artwork"}
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def write_snapshot(path, games):
+    """
+    Writes game dicts (as stored in games.json) to a binary snapshot at path.
+    """
+    string_ids = {"": 0}
+    strings = [b""]
+
+    def string_id(text):
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text.encode("utf-8"))
+        return string_ids[text]
+
+    records = bytearray()
+    game_ids = []
+    for game in games:
+        extra = {key: value for key, value in game.items() if key not in FIELDS}
+        slots = []
+        for field in FIELDS:
+            value = game.get(field)
+            if field in _JSON_FIELDS:
+                slots.append(string_id(json.dumps(value, separators=(",", ":"))) if value else 0)
+            elif value is None or isinstance(value, str):
+                slots.append(string_id(value or ""))
+            else:
+                extra[field] = value
+                slots.append(0)
+        slots.append(string_id(json.dumps(extra, separators=(",", ":"))) if extra else 0)
+        records += RECORD.pack(*slots)
+        game_ids.append(game.get("id") or "")
+
+    offsets = array("Q", [0])
+    for data in strings:
+        offsets.append(offsets[-1] + len(data))
+    index = array("I", sorted(range(len(game_ids)), key=game_ids.__getitem__))
+
+    strings_offset = HEADER.size
+    data_offset = strings_offset + len(offsets) * offsets.itemsize
+    # Records start on a 4 byte boundary
+    padding = -(data_offset + offsets[-1]) % 4
+    records_offset = data_offset + offsets[-1] + padding
+    index_offset = records_offset + len(records)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, SCHEMA_VERSION, len(game_ids), len(strings), RECORD.size,
+                         strings_offset, data_offset, records_offset, index_offset)
+    atomic_write_bytes(path, [header, _little_endian(offsets).tobytes(), b"".join(strings), b"\0" * padding,
+                              records, _little_endian(index).tobytes()])
+
+class LibrarySnapshot:
+    """
+    Read-only view of a binary snapshot.
+
+    The file is memory-mapped and a game is only decoded when it is accessed,
+    so opening a snapshot costs the same however large the library is and
+    only the pages of the records actually used are read from disk.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, format_version, schema_version, self._count, self._string_count, record_size,
+             self._strings_offset, self._data_offset, self._records_offset,
+             self._index_offset) = HEADER.unpack_from(self._map, 0)
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f"{path} is not a Gameshelf library snapshot")
+        except BaseException:
+            self.close()
+            raise
+        if magic != MAGIC or format_version != FORMAT_VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a Gameshelf library snapshot this build can read")
+        if schema_version != SCHEMA_VERSION:
+            self.close()
+            raise ValueError(f"{path} was written for schema version {schema_version}; "
+                             f"save a new snapshot from games.json")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._decode(position)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("snapshot record out of range")
+        return self._decode(position)
+
+    def get(self, game_id, default=None):
+        """
+        Looks a game up by id with a binary search over the id index.
+        """
+        position = bisect.bisect_left(_IdIndex(self), game_id)
+        if position < self._count:
+            record = self._index_record(position)
+            if self._field(record, 0) == game_id:
+                return self._decode(record)
+        return default
+
+    def _string(self, string_id):
+        if not string_id:
+            return ""
+        start, end = _STRING_SPAN.unpack_from(self._map, self._strings_offset + string_id * 8)
+        return self._map[self._data_offset + start:self._data_offset + end].decode("utf-8")
+
+    def _slots(self, record):
+        return RECORD.unpack_from(self._map, self._records_offset + record * RECORD.size)
+
+    def _field(self, record, field_number):
+        offset = self._records_offset + record * RECORD.size + field_number * 4
+        return self._string(_INDEX_ENTRY.unpack_from(self._map, offset)[0])
+
+    def _index_record(self, position):
+        return _INDEX_ENTRY.unpack_from(self._map, self._index_offset + position * 4)[0]
+
+    def _decode(self, record):
+        slots = self._slots(record)
+        data = {}
+        for field, string_id in zip(FIELDS, slots):
+            value = self._string(string_id)
+            if field in _JSON_FIELDS:
+                value = json.loads(value) if value else None
+            data[field] = value
+        if slots[-1]:
+            data.update(json.loads(self._string(slots[-1])))
+        return Game.from_dict(data)
+
+class _IdIndex:
+    """
+    Sequence of game ids in sorted order, decoded on demand for bisect.
+    """
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def __getitem__(self, position):
+        return self.snapshot._field(self.snapshot._index_record(position), 0)
+
+def _measure(representation, path, touched):
+    """
+    Opens the library at path and reads `touched` games (all of them if 0).
+    Returns (seconds, RSS growth in bytes).
+    """
+    import time
+    import psutil
+    from library_schema import read_library
+
+    process = psutil.Process()
+    before = process.memory_info().rss
+    start = time.perf_counter()
+    if representation == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            games = [Game.from_dict(game) for game in read_library(json.load(f))[0]]
+        games = games[:touched] if touched else games
+    else:
+        snapshot = LibrarySnapshot(path)
+        games = [snapshot[position] for position in range(touched or len(snapshot))]
+    return time.perf_counter() - start, process.memory_info().rss - before
+
+if __name__ == "__main__":
+    # Load time and RSS of games.json vs a snapshot, each measured in a
+    # fresh process. tests/test_library_snapshot.py checks the round trip.
+    #   python library_snapshot.py [games.json]   uses a synthetic library if omitted
+    import os
+    import subprocess
+    import tempfile
+    from game_record import _synthetic_game_dicts
+    from library_persistence import atomic_write_json
+    from library_schema import read_library, library_document
+
+    if len(sys.argv) == 5 and sys.argv[1] == "--measure":
+        print(*_measure(sys.argv[2], sys.argv[3], int(sys.argv[4])))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if len(sys.argv) > 1:
+            json_path = sys.argv[1]
+        else:
+            json_path = os.path.join(directory, "games.json")
+            atomic_write_json(json_path, library_document(list(_synthetic_game_dicts(200_000))))
+        snapshot_path = os.path.join(directory, "games.snapshot")
+        with open(json_path, "r", encoding="utf-8") as f:
+            games = [Game.from_dict(game).to_dict() for game in read_library(json.load(f))[0]]
+        write_snapshot(snapshot_path, games)
+
+        print(f"{len(games)} games, games.json {os.path.getsize(json_path) / 2**20:.1f} MiB, "
+              f"snapshot {os.path.getsize(snapshot_path) / 2**20:.1f} MiB")
+
+        print(f"{'load':>24} {'seconds':>9} {'RSS MiB':>9}")
+        for representation, path in (("json", json_path), ("snapshot", snapshot_path)):
+            for touched in (50, 0):
+                output = subprocess.run([sys.executable, __file__, "--measure", representation, path, str(touched)],
+                                        capture_output=True, text=True, check=True).stdout
+                seconds, rss = output.split()
+                label = f"{representation}, {'first 50' if touched else 'all'} games"
+                print(f"{label:>24} {float(seconds):>9.3f} {int(rss) / 2**20:>9.1f}")
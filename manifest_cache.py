@@ -0,0 +1,84 @@
+import os
+import json
+import threading
+from library_persistence import atomic_write_json
+
+CACHE_VERSION = 1
+MANIFEST_CACHE_FILE = os.path.join(os.path.dirname(__file__), "steam_manifest_cache.json")
+
+class ManifestCache:
+    """
+    Parsed appmanifest data kept between runs, keyed by the manifest's path
+    and checked against its mtime and size, so a scan only parses manifests
+    that are new or changed since the last one.
+
+    get/put may be called from several scanner threads at once. Entries for
+    manifests that a scan no longer finds are dropped by prune.
+    """
+    def __init__(self, cache_file=MANIFEST_CACHE_FILE):
+        self.cache_file = cache_file
+        self.entries = {}
+        self._seen = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest cache {self.cache_file}: {e}")
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            document = {"version": CACHE_VERSION, "entries": dict(self.entries)}
+            self._dirty = False
+        try:
+            atomic_write_json(self.cache_file, document, indent=None)
+        except OSError as e:
+            print(f"Error saving manifest cache: {e}")
+
+    def _key(self, path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def get(self, path, stat_result):
+        """
+        Returns a copy of the cached parse of the manifest at path, or None if
+        there is none for this mtime and size.
+        """
+        key = self._key(path)
+        with self._lock:
+            self._seen.add(key)
+            entry = self.entries.get(key)
+        if entry and entry["mtime_ns"] == stat_result.st_mtime_ns and entry["size"] == stat_result.st_size:
+            return dict(entry["game_info"])
+        return None
+
+    def put(self, path, stat_result, game_info):
+        key = self._key(path)
+        with self._lock:
+            self._seen.add(key)
+            self.entries[key] = {"mtime_ns": stat_result.st_mtime_ns, "size": stat_result.st_size,
+                                 "game_info": dict(game_info)}
+            self._dirty = True
+
+    def prune(self, library_folders):
+        """
+        Drops the entries of manifests in library_folders that were not seen
+        since the last prune, i.e. games that have been uninstalled.
+        """
+        folders = {self._key(folder) for folder in library_folders}
+        with self._lock:
+            stale = [key for key in self.entries if key not in self._seen and os.path.dirname(key) in folders]
+            for key in stale:
+                del self.entries[key]
+            self._dirty = self._dirty or bool(stale)
+            self._seen = set()
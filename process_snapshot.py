@@ -0,0 +1,127 @@
+import os
+import time
+import threading
+import psutil
+
+def _path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+class ProcessSnapshot:
+    """
+    The running processes at one moment, as hashed sets of executable paths
+    and process names, so any number of games can be checked against it
+    without walking the process list again.
+    """
+    def __init__(self):
+        exe_paths = set()
+        names = set()
+        # Processes we may not read the executable of (other users, system)
+        # can only be matched by name.
+        names_without_exe = set()
+        for process in psutil.process_iter(["name", "exe"]):
+            name = (process.info["name"] or "").lower()
+            exe = process.info["exe"]
+            names.add(name)
+            if exe:
+                exe_paths.add(_path_key(exe))
+            else:
+                names_without_exe.add(name)
+        self.exe_paths = frozenset(exe_paths)
+        self.names = frozenset(names)
+        self.names_without_exe = frozenset(names_without_exe)
+        self.taken_at = time.monotonic()
+
+    def has_name(self, process_name):
+        return process_name.lower() in self.names
+
+    def is_running(self, executable_path):
+        """
+        True if a process runs executable_path. A process whose executable
+        cannot be read counts when its name matches the file name.
+        """
+        if not executable_path:
+            return False
+        return (_path_key(executable_path) in self.exe_paths
+                or os.path.basename(executable_path).lower() in self.names_without_exe)
+
+_latest = None
+_latest_lock = threading.Lock()
+
+def current_snapshot(max_age=1.0):
+    """
+    Returns a snapshot no older than max_age seconds, shared by every caller
+    in that window.
+    """
+    global _latest
+    with _latest_lock:
+        if _latest is None or time.monotonic() - _latest.taken_at > max_age:
+            _latest = ProcessSnapshot()
+        return _latest
+
+class ProcessSnapshotService:
+    """
+    Takes one process snapshot per tick on a background thread and tells
+    subscribers which watched executables started or stopped since the
+    previous tick.
+
+    Callbacks get a dict of executable path -> running and are called on
+    the service thread; UI code should hand them to its own thread (e.g.
+    through a Qt signal).
+    """
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self._watched = {} # path key -> executable path as given
+        self._running = set() # path keys of watched executables running at the last tick
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, executable_paths):
+        with self._lock:
+            for path in executable_paths:
+                if path:
+                    self._watched.setdefault(_path_key(path), path)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def is_running(self, executable_path):
+        """
+        Running state from the service's latest snapshot.
+        """
+        return current_snapshot(max_age=self.interval).is_running(executable_path)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error taking process snapshot: {e}")
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        """
+        Takes a snapshot now and notifies subscribers of any changes.
+        """
+        snapshot = current_snapshot(max_age=0)
+        with self._lock:
+            running = {key for key, path in self._watched.items() if snapshot.is_running(path)}
+            changes = {self._watched[key]: True for key in running - self._running}
+            changes.update({self._watched[key]: False for key in self._running - running})
+            self._running = running
+        if changes:
+            for callback in list(self._subscribers):
+                callback(changes)
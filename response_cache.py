@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+RESPONSE_CACHE_FILE = os.path.join(os.path.dirname(__file__), "steam_api_cache.db")
+# Seconds a response stays fresh, per endpoint
+ENDPOINT_TTLS = {
+    "IPublishedFileService/QueryFiles/v1/": 15 * 60,
+    "IPublishedFileService/GetDetails/v1/": 60 * 60,
+    "ISteamUser/GetFriendList/v1/": 5 * 60,
+    "ISteamUser/GetPlayerSummaries/v2/": 60,
+}
+DEFAULT_TTL = 5 * 60
+# Seconds past its TTL a response may still be served, per endpoint, below
+# ResponseCache.max_stale: a friend's status from last week is wrong, not old
+ENDPOINT_MAX_STALE = {
+    "ISteamUser/GetFriendList/v1/": 24 * 60 * 60,
+    "ISteamUser/GetPlayerSummaries/v2/": 5 * 60,
+}
+# Endpoints whose stale responses are worth showing at once while they are
+# revalidated: workshop listings and details change slowly
+STALE_WHILE_REVALIDATE_ENDPOINTS = frozenset((
+    "IPublishedFileService/QueryFiles/v1/",
+    "IPublishedFileService/GetDetails/v1/",
+))
+# Last-used times are written once this many lookups are pending
+TOUCH_BATCH_SIZE = 100
+# Parameters that are not part of a cache key
+EXCLUDED_PARAMS = frozenset(("key",))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT '',
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+def endpoint(path):
+    """
+    The ENDPOINT_TTLS key of a request path.
+    """
+    return path.strip("/") + "/"
+
+def serves_stale(stale_while_revalidate, path):
+    """
+    Whether a client's stale_while_revalidate setting, True for every
+    endpoint or a collection of endpoints, covers path.
+    """
+    return stale_while_revalidate is True or endpoint(path) in (stale_while_revalidate or ())
+
+def cache_key(path, params):
+    """
+    The key of a request: its path and parameters, in a fixed order and
+    without the API key, so every user and parameter order share an entry.
+    """
+    normalized = sorted((str(name), str(value)) for name, value in (params or {}).items()
+                        if name not in EXCLUDED_PARAMS)
+    return hashlib.sha256(json.dumps([path.strip("/"), normalized]).encode("utf-8")).hexdigest()
+
+class CachedResponse:
+    __slots__ = ("key", "body", "etag", "last_modified", "stored_at", "expires_at")
+
+    def __init__(self, key, body, etag, last_modified, stored_at, expires_at):
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+    def data(self):
+        return json.loads(self.body)
+
+class ResponseCache:
+    """
+    Steam Web API responses kept on disk in SQLite.
+
+    Each entry is fresh for its endpoint's TTL (ENDPOINT_TTLS) and, once
+    stale, can still be served for up to max_stale seconds (less for the
+    endpoints in ENDPOINT_MAX_STALE) while it is revalidated, or when the
+    API cannot be reached. ETag / Last-Modified validators are kept so
+    revalidation can be a conditional request. The least recently used
+    entries are evicted when the cache grows past max_bytes; lookups only
+    note when an entry was used, and the notes are written in batches.
+    """
+    def __init__(self, cache_file=RESPONSE_CACHE_FILE, max_bytes=50 * 1024 * 1024, max_stale=7 * 24 * 60 * 60):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._touched = {} # key -> last used, not written yet
+        self.connection = sqlite3.connect(cache_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self._size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl(self, path):
+        return ENDPOINT_TTLS.get(endpoint(path), DEFAULT_TTL)
+
+    def max_stale_for(self, path):
+        return min(self.max_stale, ENDPOINT_MAX_STALE.get(endpoint(path), self.max_stale))
+
+    def lookup(self, path, params):
+        """
+        Returns the CachedResponse for the request, fresh or not, or None
+        if there is none or it is too stale to use.
+        """
+        key = cache_key(path, params)
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT body, etag, last_modified, stored_at, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now > row[4] + self.max_stale_for(path):
+                self._delete(key)
+                self.connection.commit()
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._write_touches()
+                self.connection.commit()
+        return CachedResponse(key, row[0], row[1], row[2], row[3], row[4])
+
+    def store(self, path, params, data, etag="", last_modified=""):
+        key = cache_key(path, params)
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        with self._lock:
+            self._write_touches()
+            self._delete(key)
+            self.connection.execute(
+                "INSERT INTO responses (key, path, body, etag, last_modified, stored_at, expires_at, last_used, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, path, body, etag or "", last_modified or "", now, now + self.ttl(path), now, len(body)))
+            self._size += len(body)
+            self._evict()
+            self.connection.commit()
+
+    def refresh(self, cached, path):
+        """
+        Marks cached fresh again, after the API answered 304 Not Modified.
+        """
+        now = time.time()
+        with self._lock:
+            self.connection.execute("UPDATE responses SET expires_at = ?, last_used = ? WHERE key = ?",
+                                    (now + self.ttl(path), now, cached.key))
+            self.connection.commit()
+
+    def flush(self):
+        """
+        Writes the last-used times of lookups since the last write.
+        """
+        with self._lock:
+            if self._touched:
+                self._write_touches()
+                self.connection.commit()
+
+    def _write_touches(self):
+        # Eviction goes by last_used, so it must see every lookup so far
+        self.connection.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                    [(last_used, key) for key, last_used in self._touched.items()])
+        self._touched.clear()
+
+    def _delete(self, key):
+        row = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= row[0]
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self.connection.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            evicted.append((key,))
+            self._size -= size
+            if self._size <= self.max_bytes:
+                break
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+            self._touched.clear()
+            self._size = 0
+
+    def size(self):
+        return self._size
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self.connection.close()
+
+if __name__ == "__main__":
+    # Repeated browsing against a local stand-in API that answers in 50 ms:
+    # cold and cached timings, a stale response served once the API is gone,
+    # and batched lookups. tests/test_response_cache.py checks the behaviour.
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from steam_api_client import SteamApiClient
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(0.05)
+            data = json.dumps({"response": {"path": self.path.split("?")[0], "padding": "x" * 2000}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(os.path.join(directory, "cache.db"))
+        client = SteamApiClient(base_url=base_url, cache=cache, rate=1000, burst=100)
+        pages = [("IPublishedFileService/QueryFiles/v1/", {"appid": 440, "page": page, "key": "secret"}) for page in range(1, 6)]
+
+        started = time.perf_counter()
+        for path, params in pages:
+            client.get(path, params)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        for path, params in pages:
+            # Another key and parameter order hit the same entries
+            client.get(path, dict(reversed(list(dict(params, key="other").items()))))
+        warm = time.perf_counter() - started
+
+        server.shutdown()
+        server.server_close()
+        cache.connection.execute("UPDATE responses SET expires_at = ?", (time.time() - 1,))
+        stale = SteamApiClient(base_url=base_url, cache=cache, stale_while_revalidate=True)
+        started = time.perf_counter()
+        stale.get(*pages[-1])
+        stale_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            cache.lookup(*pages[-1])
+        lookups_time = time.perf_counter() - started
+        cache.close()
+
+    print(f"5 result pages from the API: {cold * 1000:.0f} ms")
+    print(f"same pages from the cache: {warm * 1000:.1f} ms")
+    print(f"stale page with the API offline (stale-while-revalidate): {stale_time * 1000:.1f} ms")
+    print(f"1,000 cached lookups, last-used times written in batches: {lookups_time * 1000:.1f} ms")
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from library_persistence import atomic_write_bytes, atomic_write_json
+
+SAVE_BACKUP_DIR = os.path.join(os.path.dirname(__file__), "save_backups")
+CHUNK_SIZE = 256 * 1024
+# Chunks start with one of these: zlib-compressed or stored as is
+_COMPRESSED, _RAW = b"z", b"r"
+
+class SaveBackupStore:
+    """
+    Incremental backups of save folders in a content-addressed store.
+
+    Files are split into fixed-size chunks, and each chunk is stored once,
+    zlib-compressed unless it does not compress (already compressed or
+    encrypted saves), under the SHA-256 of its contents in chunks/, however
+    many files or snapshots use it. A snapshot is a small manifest in
+    snapshots/<game id>/ listing every file with its size, mtime and chunk
+    hashes. Files whose size and mtime match the previous snapshot reuse
+    its chunk list without being read, so only files that changed are
+    hashed and only chunks never seen before take up space. Files and
+    folders that could not be read are listed under "skipped", so a
+    restore never deletes what the snapshot could not back up.
+    """
+    def __init__(self, root=SAVE_BACKUP_DIR, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.chunks_dir = os.path.join(root, "chunks")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        self._lock = threading.Lock()
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _snapshot_path(self, game_id, snapshot_id):
+        return os.path.join(self.snapshots_dir, game_id, f"{snapshot_id:06d}.json")
+
+    def snapshots(self, game_id):
+        """
+        Returns the manifests of game_id's snapshots, oldest first, without
+        their file lists.
+        """
+        manifests = []
+        for snapshot_id in self._snapshot_ids(game_id):
+            manifest = self.load_snapshot(game_id, snapshot_id)
+            if manifest:
+                manifest.pop("files", None)
+                manifests.append(manifest)
+        return manifests
+
+    def _snapshot_ids(self, game_id):
+        try:
+            names = os.listdir(os.path.join(self.snapshots_dir, game_id))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-5]) for name in names if name.endswith(".json") and name[:-5].isdigit())
+
+    def load_snapshot(self, game_id, snapshot_id):
+        try:
+            with open(self._snapshot_path(game_id, snapshot_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def snapshot(self, game_id, source_dir, label=""):
+        """
+        Backs up source_dir as game_id's next snapshot and returns its
+        manifest. The manifest's "stats" say how many files were hashed
+        and how many new chunks and bytes the store gained; "skipped"
+        lists the files, and folders ending in /, that could not be read.
+        """
+        if not os.path.isdir(source_dir):
+            raise FileNotFoundError(f"Save folder not found: {source_dir}")
+        with self._lock:
+            snapshot_ids = self._snapshot_ids(game_id)
+            previous = self.load_snapshot(game_id, snapshot_ids[-1]) if snapshot_ids else None
+            previous_files = previous["files"] if previous else {}
+            stats = {"files": 0, "files_hashed": 0, "bytes_hashed": 0, "new_chunks": 0, "new_bytes": 0}
+            files = {}
+            skipped = []
+            for path, relative_path, stat_result in _walk(source_dir, skipped):
+                stats["files"] += 1
+                entry = previous_files.get(relative_path)
+                if entry and entry["size"] == stat_result.st_size and entry["mtime_ns"] == stat_result.st_mtime_ns:
+                    files[relative_path] = entry
+                    continue
+                try:
+                    chunks = self._store_file(path, stats)
+                except OSError as e:
+                    print(f"Error backing up {path}: {e}")
+                    skipped.append(relative_path)
+                    continue
+                stats["files_hashed"] += 1
+                files[relative_path] = {"size": stat_result.st_size, "mtime_ns": stat_result.st_mtime_ns, "chunks": chunks}
+
+            snapshot_id = snapshot_ids[-1] + 1 if snapshot_ids else 1
+            manifest = {
+                "id": snapshot_id,
+                "game_id": game_id,
+                "created": time.time(),
+                "label": label,
+                "source": source_dir,
+                "size": sum(entry["size"] for entry in files.values()),
+                "stats": stats,
+                "files": files,
+                "skipped": skipped,
+            }
+            os.makedirs(os.path.dirname(self._snapshot_path(game_id, snapshot_id)), exist_ok=True)
+            atomic_write_json(self._snapshot_path(game_id, snapshot_id), manifest, indent=None)
+        print(f"Snapshot {snapshot_id} of {source_dir}: {stats['files_hashed']} of {stats['files']} files changed, "
+              f"{stats['new_bytes']} bytes stored")
+        return manifest
+
+    def _store_file(self, path, stats):
+        chunks = []
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append(digest)
+                stats["bytes_hashed"] += len(data)
+                chunk_path = self._chunk_path(digest)
+                if not os.path.exists(chunk_path):
+                    stored = _encode_chunk(data)
+                    os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+                    atomic_write_bytes(chunk_path, stored)
+                    stats["new_chunks"] += 1
+                    stats["new_bytes"] += len(stored[0]) + len(stored[1])
+        return chunks
+
+    def restore(self, game_id, snapshot_id, target_dir, delete_extra=False):
+        """
+        Writes snapshot_id's files into target_dir with their original
+        mtimes. Files already there with the snapshot's size and mtime are
+        left alone; with delete_extra, files the snapshot does not have are
+        removed, except those it skipped because they could not be read.
+        Returns the number of files written.
+        """
+        # Held throughout, so prune cannot delete the snapshot or its chunks mid-restore
+        with self._lock:
+            manifest = self.load_snapshot(game_id, snapshot_id)
+            if manifest is None:
+                raise KeyError(f"No snapshot {snapshot_id} for game {game_id}")
+            written = 0
+            for relative_path, entry in manifest["files"].items():
+                path = os.path.join(target_dir, relative_path)
+                try:
+                    stat_result = os.stat(path)
+                    if stat_result.st_size == entry["size"] and stat_result.st_mtime_ns == entry["mtime_ns"]:
+                        continue
+                except FileNotFoundError:
+                    pass
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write_bytes(path, (self._read_chunk(digest) for digest in entry["chunks"]))
+                os.utime(path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                written += 1
+        if delete_extra:
+            skipped = manifest.get("skipped", [])
+            for path, relative_path, _ in list(_walk(target_dir)):
+                if relative_path not in manifest["files"] and not _is_skipped(relative_path, skipped):
+                    os.remove(path)
+        print(f"Restored snapshot {snapshot_id} to {target_dir}: {written} files written")
+        return written
+
+    def _read_chunk(self, digest):
+        with open(self._chunk_path(digest), "rb") as f:
+            kind = f.read(1)
+            data = f.read()
+        if kind == _COMPRESSED:
+            data = zlib.decompress(data)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup chunk {digest} is corrupt")
+        return data
+
+    def prune(self, game_id, keep):
+        """
+        Deletes all but game_id's newest keep snapshots, then the chunks no
+        remaining snapshot of any game uses. Returns the number of chunks
+        deleted.
+        """
+        with self._lock:
+            for snapshot_id in self._snapshot_ids(game_id)[:-keep or None]:
+                os.remove(self._snapshot_path(game_id, snapshot_id))
+            used = set()
+            try:
+                game_ids = os.listdir(self.snapshots_dir)
+            except FileNotFoundError:
+                game_ids = []
+            for other_game_id in game_ids:
+                for snapshot_id in self._snapshot_ids(other_game_id):
+                    for entry in self.load_snapshot(other_game_id, snapshot_id)["files"].values():
+                        used.update(entry["chunks"])
+            deleted = 0
+            for path, relative_path, _ in list(_walk(self.chunks_dir)):
+                if os.path.basename(relative_path) not in used:
+                    os.remove(path)
+                    deleted += 1
+        return deleted
+
+    def store_size(self):
+        return sum(stat_result.st_size for _, _, stat_result in _walk(self.root))
+
+def _encode_chunk(data):
+    """
+    Returns the chunk as [kind, body]. Compressing the first 4 KiB tells
+    whether the rest is worth compressing at all.
+    """
+    if len(zlib.compress(data[:4096], 1)) < 0.9 * min(len(data), 4096):
+        compressed = zlib.compress(data, 1)
+        if len(compressed) < len(data):
+            return [_COMPRESSED, compressed]
+    return [_RAW, data]
+
+def _is_skipped(relative_path, skipped):
+    for skipped_path in skipped:
+        if relative_path == skipped_path or relative_path.startswith(skipped_path.rstrip("/") + "/" if skipped_path else ""):
+            return True
+    return False
+
+def _walk(directory, errors=None):
+    """
+    Yields (path, path relative to directory with / separators, stat) for
+    every file under directory. The relative paths of entries that could
+    not be read are appended to errors, folders with a trailing / ("" for
+    directory itself).
+    """
+    pending = [(directory, "")]
+    while pending:
+        folder, prefix = pending.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append((entry.path, prefix + entry.name + "/"))
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry.path, prefix + entry.name, entry.stat(follow_symlinks=False)
+                    except OSError:
+                        if errors is not None:
+                            errors.append(prefix + entry.name)
+                        continue
+        except OSError:
+            if errors is not None:
+                errors.append(prefix)
+            continue
+
+if __name__ == "__main__":
+    # Benchmark: a 40 MB save folder (one large world file and many small
+    # ones) backed up over many revisions, each touching a few files.
+    import random
+    import shutil
+    import tempfile
+
+    revisions = 30
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directory:
+        saves = os.path.join(directory, "saves")
+        os.makedirs(os.path.join(saves, "slots"))
+        world = bytearray(rng.randbytes(32 * 1024 * 1024))
+        with open(os.path.join(saves, "world.dat"), "wb") as f:
+            f.write(world)
+        for slot in range(200):
+            with open(os.path.join(saves, "slots", f"slot{slot}.sav"), "wb") as f:
+                f.write(rng.randbytes(40 * 1024))
+        source_size = sum(stat_result.st_size for _, _, stat_result in _walk(saves))
+
+        store = SaveBackupStore(os.path.join(directory, "store"))
+        started = time.perf_counter()
+        store.snapshot("game", saves)
+        first_time = time.perf_counter() - started
+        first_store = store.store_size()
+
+        snapshot_times = []
+        for revision in range(revisions):
+            # Each session rewrites one region of the world and a few slots
+            offset = rng.randrange(len(world) - 4096)
+            world[offset:offset + 4096] = rng.randbytes(4096)
+            with open(os.path.join(saves, "world.dat"), "wb") as f:
+                f.write(world)
+            for slot in rng.sample(range(200), 3):
+                with open(os.path.join(saves, "slots", f"slot{slot}.sav"), "wb") as f:
+                    f.write(rng.randbytes(40 * 1024))
+            started = time.perf_counter()
+            store.snapshot("game", saves)
+            snapshot_times.append(time.perf_counter() - started)
+
+        # An unchanged folder is only stat()ed
+        started = time.perf_counter()
+        store.snapshot("game", saves)
+        unchanged_time = time.perf_counter() - started
+
+        restored = os.path.join(directory, "restored")
+        started = time.perf_counter()
+        store.restore("game", 1, restored)
+        restore_time = time.perf_counter() - started
+        final_store = store.store_size()
+
+        mib = 1024 * 1024
+        print()
+        print(f"save folder: {source_size / mib:.1f} MiB in 201 files, {revisions} revisions")
+        print(f"first snapshot: {first_time * 1000:.0f} ms, store {first_store / mib:.1f} MiB")
+        print(f"incremental snapshots: {sum(snapshot_times) / len(snapshot_times) * 1000:.0f} ms on average")
+        print(f"unchanged snapshot: {unchanged_time * 1000:.1f} ms")
+        print(f"store after all revisions: {final_store / mib:.1f} MiB "
+              f"(full copies would take {source_size * (revisions + 2) / mib:.0f} MiB)")
+        print(f"restore of the first snapshot: {restore_time * 1000:.0f} ms")
+        shutil.rmtree(restored)
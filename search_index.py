@@ -0,0 +1,396 @@
+import re
+import heapq
+from bisect import bisect_left, insort
+
+# How much a match in each field counts towards a game's rank
+FIELD_WEIGHTS = {
+    "title": 10,
+    "developer": 4,
+    "publisher": 4,
+    "genre": 3,
+    "platform": 3,
+    "description": 1,
+}
+# Short fields get an n-gram index for true substring matching. Descriptions
+# are too long for that and are matched by word prefix instead.
+SUBSTRING_FIELDS = ("title", "platform", "genre", "developer", "publisher")
+TOKEN_PATTERN = re.compile(r"\w+")
+# Tokens up to this long are indexed by their deletions for one-typo matching
+# of short words, which often share no trigram with what they were meant to be.
+SHORT_TOKEN_LENGTH = 6
+
+def _normalize(value):
+    return str(value or "").casefold()
+
+def _grams(text):
+    """
+    Trigrams of text padded at the end, so every position in text starts a
+    trigram and one- or two-character queries are a prefix of some trigram.
+    """
+    padded = text + "\0\0"
+    return {padded[i:i + 3] for i in range(len(text))}
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)} or {text}
+
+def _deletes(token):
+    """
+    token and every string one deletion away from it. Two strings within one
+    edit of each other (a swap of neighbours included) share one of these.
+    """
+    return {token[:i] + token[i + 1:] for i in range(len(token))} | {token}
+
+def _is_word_char(char):
+    # What TOKEN_PATTERN's \w matches
+    return char.isalnum() or char == "_"
+
+def _edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance between a and b (Levenshtein with swaps
+    of adjacent characters counted as one edit), or limit + 1 once it is
+    known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b and char_a != char_b:
+                distance = min(distance, before[j - 2] + 1)
+            current.append(distance)
+        # A swap reaches back two rows, so both must be past the limit
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+def _post(postings, keys, game_id):
+    # Cheaper than setdefault(key, set()), which builds a set for every key
+    for key in keys:
+        ids = postings.get(key)
+        if ids is None:
+            postings[key] = {game_id}
+        else:
+            ids.add(game_id)
+
+class SearchIndex:
+    """
+    Incrementally maintained search index over the library.
+
+    Substring queries on the short fields go through an n-gram index, word
+    prefixes go through a sorted token list, and words that match nothing
+    fall back to typo-tolerant matching against the token vocabulary.
+    """
+    def __init__(self):
+        self.texts = {} # game id -> {field: normalized text} for SUBSTRING_FIELDS
+        self.grams = {field: {} for field in SUBSTRING_FIELDS} # field -> gram -> game ids
+        self.exact = {field: {} for field in SUBSTRING_FIELDS} # field -> whole text -> game ids
+        self.leading = {field: {} for field in SUBSTRING_FIELDS} # field -> first token -> game ids
+        self.tokens = {field: {} for field in FIELD_WEIGHTS} # field -> token -> game ids
+        self.token_counts = {} # token -> number of (game, field) postings using it
+        self.sorted_tokens = []
+        self.token_trigrams = {} # trigram -> tokens, for typo-tolerant lookup
+        self.token_deletes = {} # deletion -> short tokens, for typo-tolerant lookup
+
+    def clear(self):
+        self.__init__()
+
+    def add(self, game_id, game):
+        texts = {}
+        for field in FIELD_WEIGHTS:
+            text = _normalize(game.get(field))
+            if field in SUBSTRING_FIELDS:
+                texts[field] = text
+                _post(self.grams[field], _grams(text), game_id)
+                _post(self.exact[field], (text,), game_id)
+                leading = TOKEN_PATTERN.match(text)
+                if leading:
+                    _post(self.leading[field], (leading.group(),), game_id)
+            tokens = set(TOKEN_PATTERN.findall(text))
+            _post(self.tokens[field], tokens, game_id)
+            for token in tokens:
+                self._retain_token(token)
+        self.texts[game_id] = texts
+
+    def remove(self, game_id, game):
+        self.texts.pop(game_id, None)
+        for field in FIELD_WEIGHTS:
+            text = _normalize(game.get(field))
+            if field in SUBSTRING_FIELDS:
+                for gram in _grams(text):
+                    self._discard(self.grams[field], gram, game_id)
+                self._discard(self.exact[field], text, game_id)
+                leading = TOKEN_PATTERN.match(text)
+                if leading:
+                    self._discard(self.leading[field], leading.group(), game_id)
+            for token in set(TOKEN_PATTERN.findall(text)):
+                if self._discard(self.tokens[field], token, game_id):
+                    self._release_token(token)
+
+    def _discard(self, postings, key, game_id):
+        ids = postings.get(key)
+        if ids is None or game_id not in ids:
+            return False
+        ids.discard(game_id)
+        if not ids:
+            del postings[key]
+        return True
+
+    def _retain_token(self, token):
+        count = self.token_counts.get(token, 0)
+        self.token_counts[token] = count + 1
+        if count == 0:
+            insort(self.sorted_tokens, token)
+            _post(self.token_trigrams, _trigrams(token), token)
+            if len(token) <= SHORT_TOKEN_LENGTH and not token.isdigit():
+                _post(self.token_deletes, _deletes(token), token)
+
+    def _release_token(self, token):
+        count = self.token_counts[token] - 1
+        if count:
+            self.token_counts[token] = count
+            return
+        del self.token_counts[token]
+        del self.sorted_tokens[bisect_left(self.sorted_tokens, token)]
+        for trigram in _trigrams(token):
+            self._discard(self.token_trigrams, trigram, token)
+        if len(token) <= SHORT_TOKEN_LENGTH and not token.isdigit():
+            for deletion in _deletes(token):
+                self._discard(self.token_deletes, deletion, token)
+
+    def search(self, query, fields=None, limit=None):
+        """
+        Returns the ids of games matching every word of query, best match
+        first. With a limit only the top `limit` ids are ranked and returned.
+        """
+        fields = [field for field in (fields or FIELD_WEIGHTS) if field in FIELD_WEIGHTS]
+        words = _normalize(query).split()
+        if not words or not fields:
+            return []
+        if limit is not None and len(words) == 1 and TOKEN_PATTERN.fullmatch(words[0]):
+            return self._top_matches(words[0], fields, limit) or self._top_fuzzy(words[0], fields, limit)
+
+        scores = None
+        # Match the most selective word first; later words only have to check
+        # the games that are still in the running.
+        for word in sorted(words, key=lambda word: self._estimate(word, fields)):
+            candidates = None if scores is None else set(scores)
+            word_scores = self._match_word(word, fields, candidates) or self._match_fuzzy(word, fields, candidates)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {game_id: score + scores[game_id] for game_id, score in word_scores.items()}
+            if not scores:
+                return []
+        if limit is not None and limit < len(scores):
+            return heapq.nlargest(limit, scores, key=scores.__getitem__)
+        return sorted(scores, key=scores.__getitem__, reverse=True)
+
+    def _top_matches(self, word, fields, limit):
+        """
+        The best `limit` games for a single-word query. Every game in a tier
+        (say, titles that start with word) has the same score, so tiers are
+        taken best first and the search stops once `limit` games are found,
+        without scoring the games in the tiers below.
+        """
+        tiers = []
+        for field in fields:
+            weight = FIELD_WEIGHTS[field]
+            if field in SUBSTRING_FIELDS:
+                tiers += [(weight * 4, "exact", field), (weight * 3, "leading", field),
+                          (weight * 2, "word", field), (weight, "inside", field)]
+            else:
+                tiers += [(weight * 2, "token", field), (weight, "word", field)]
+        tiers.sort(key=lambda tier: tier[0], reverse=True)
+        found = {}
+        for _, kind, field in tiers:
+            for game_id in self._tier_ids(kind, field, word):
+                if game_id not in found:
+                    found[game_id] = None
+                    if len(found) == limit:
+                        return list(found)
+        return list(found)
+
+    def _tier_ids(self, kind, field, word):
+        if kind == "exact":
+            return self.exact[field].get(word, ())
+        if kind == "token":
+            return self.tokens[field].get(word, ())
+        if kind == "inside":
+            texts = self.texts
+            return (game_id for game_id in self._gram_candidates(field, word) if word in texts[game_id][field])
+        postings = self.leading[field] if kind == "leading" else self.tokens[field]
+        return (game_id for token in self._prefixed_tokens(word) for game_id in postings.get(token, ()))
+
+    def _estimate(self, word, fields):
+        """
+        Rough upper bound on how many games word can match, used to order query words.
+        """
+        estimate = 0
+        for field in fields:
+            if field in SUBSTRING_FIELDS:
+                postings = self.grams[field]
+                if len(word) < 3:
+                    estimate += sum(len(ids) for trigram, ids in postings.items() if trigram.startswith(word))
+                else:
+                    estimate += min(len(postings.get(trigram, ())) for trigram in _trigrams(word))
+            else:
+                estimate += len(self.tokens[field].get(word, ()))
+        return estimate
+
+    def _match_word(self, word, fields, candidates=None):
+        scores = {}
+        for field in fields:
+            weight = FIELD_WEIGHTS[field]
+            if field in SUBSTRING_FIELDS:
+                for game_id in self._gram_candidates(field, word, candidates):
+                    text = self.texts[game_id][field]
+                    position = text.find(word)
+                    if position < 0:
+                        continue
+                    if text == word:
+                        score = weight * 4
+                    elif position == 0:
+                        score = weight * 3
+                    elif not _is_word_char(text[position - 1]):
+                        score = weight * 2
+                    else:
+                        score = weight
+                    if score > scores.get(game_id, 0):
+                        scores[game_id] = score
+            else:
+                postings = self.tokens[field]
+                for token in self._prefixed_tokens(word):
+                    score = weight * (2 if token == word else 1)
+                    token_ids = postings.get(token)
+                    if not token_ids:
+                        continue
+                    if candidates is not None:
+                        token_ids = candidates & token_ids
+                    for game_id in token_ids:
+                        if score > scores.get(game_id, 0):
+                            scores[game_id] = score
+        return scores
+
+    def _gram_candidates(self, field, word, candidates=None):
+        postings = self.grams[field]
+        if len(word) < 3:
+            # Short queries are rare and broad; collect every trigram they start
+            matches = set()
+            for trigram, ids in postings.items():
+                if trigram.startswith(word):
+                    matches |= ids
+            return matches if candidates is None else matches & candidates
+        id_sets = [] if candidates is None else [candidates]
+        for trigram in _trigrams(word):
+            ids = postings.get(trigram)
+            if not ids:
+                return ()
+            id_sets.append(ids)
+        id_sets.sort(key=len)
+        return id_sets[0].intersection(*id_sets[1:])
+
+    def _prefixed_tokens(self, prefix):
+        sorted_tokens = self.sorted_tokens
+        for position in range(bisect_left(sorted_tokens, prefix), len(sorted_tokens)):
+            token = sorted_tokens[position]
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def _match_fuzzy(self, word, fields, candidates=None):
+        """
+        Matches word against indexed tokens allowing one typo (two for longer
+        words). A typo is an insertion, deletion, substitution or swap.
+        """
+        scores = {}
+        for token, distance in self._close_tokens(word):
+            for field in fields:
+                score = FIELD_WEIGHTS[field] / (distance + 1)
+                token_ids = self.tokens[field].get(token)
+                if not token_ids:
+                    continue
+                if candidates is not None:
+                    token_ids = candidates & token_ids
+                for game_id in token_ids:
+                    if score > scores.get(game_id, 0):
+                        scores[game_id] = score
+        return scores
+
+    def _top_fuzzy(self, word, fields, limit):
+        """
+        _match_fuzzy for a single-word query, taking (token, field) postings
+        best score first until `limit` games are found.
+        """
+        tiers = [(FIELD_WEIGHTS[field] / (distance + 1), field, token)
+                 for token, distance in self._close_tokens(word) for field in fields]
+        tiers.sort(key=lambda tier: tier[0], reverse=True)
+        found = {}
+        for _, field, token in tiers:
+            for game_id in self.tokens[field].get(token, ()):
+                if game_id not in found:
+                    found[game_id] = None
+                    if len(found) == limit:
+                        return list(found)
+        return list(found)
+
+    def _close_tokens(self, word):
+        """
+        Returns (token, distance) for the indexed tokens within the typo limit of word.
+        """
+        if len(word) < 3:
+            return []
+        limit = 1 if len(word) <= 5 else 2
+        if limit == 1:
+            close_tokens = set()
+            for deletion in _deletes(word):
+                close_tokens.update(self.token_deletes.get(deletion, ()))
+        else:
+            shared = {}
+            for trigram in _trigrams(word):
+                for token in self.token_trigrams.get(trigram, ()):
+                    shared[token] = shared.get(token, 0) + 1
+            # A token within `limit` edits of word must share at least this many trigrams with it
+            needed = max(1, len(word) - 2 - 3 * limit)
+            close_tokens = [token for token, count in shared.items() if count >= needed]
+        matches = []
+        for token in close_tokens:
+            distance = _edit_distance(word, token, limit)
+            if distance <= limit:
+                matches.append((token, distance))
+        return matches
+
+if __name__ == "__main__":
+    # Query latency benchmark on a synthetic 100k game library
+    import random
+    import time
+
+    random.seed(1)
+    words = ["dark", "souls", "space", "quest", "legend", "racing", "city", "empire", "star", "knight",
+             "tactics", "simulator", "shadow", "dragon", "galaxy", "farm", "war", "hunter", "zero", "rogue"]
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i in range(100000):
+        index.add(i, {
+            "title": f"{' '.join(random.sample(words, 3))} {i}",
+            "platform": random.choice(["PC", "PC (Steam)", "PS2", "GameCube"]),
+            "genre": random.choice(["Action", "RPG", "Strategy", "Puzzle"]),
+            "developer": f"Studio {i % 500}",
+            "publisher": f"Publisher {i % 120}",
+            "description": " ".join(random.sample(words, 8)),
+        })
+    print(f"Indexed 100000 games in {time.perf_counter() - start:.2f}s")
+
+    for limit in (None, 200):
+        print(f"limit={limit}")
+        for query, fields in [("12345", ["title"]), ("dragon galaxy 777", None), ("studio 42", ["developer"]),
+                              ("galaxi", ["title"]), ("knigth", ["title"]), ("drak", ["title"]),
+                              ("ro", ["title"]), ("shadow", None)]:
+            start = time.perf_counter()
+            for _ in range(20):
+                results = index.search(query, fields, limit)
+            elapsed = (time.perf_counter() - start) / 20
+            print(f"{query!r:22} {len(results):6} results  {elapsed * 1000:8.3f} ms")
@@ -0,0 +1,205 @@
+import os
+import time
+import threading
+import psutil
+
+def _path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+class SessionTracker:
+    """
+    Records how long launched games run.
+
+    Each session gets a waiter thread that blocks until the game's processes
+    exit (Popen.wait / psutil.Process.wait, which sleep in the OS rather than
+    poll), so idle sessions cost no CPU. Steam launches hand back no process,
+    so the game is picked up when a ProcessSnapshotService sees its
+    executable start.
+
+    on_session_end(game_id, start, end) is called with Unix timestamps on the
+    waiter thread when a session finishes, once per session and never after
+    stop, which hands the sessions still running to the caller instead.
+    """
+    def __init__(self, on_session_end, snapshot_service):
+        self.on_session_end = on_session_end
+        self.snapshot_service = snapshot_service
+        self._lock = threading.Lock()
+        self._awaiting = {} # executable path key -> (game id, executable path, deadline)
+        self._active = {} # game id -> session start
+        self._stopped = False
+        snapshot_service.subscribe(self._on_process_states_changed)
+
+    def active_sessions(self):
+        with self._lock:
+            return dict(self._active)
+
+    def track_process(self, game_id, popen, executable_path=None):
+        """
+        Tracks a game started with subprocess.Popen. The session lasts until
+        the process and everything it started have exited; a launcher that
+        exits early hands over to the processes running from the game's folder.
+        """
+        try:
+            root = psutil.Process(popen.pid)
+            start = root.create_time()
+        except psutil.Error:
+            root, start = None, time.time()
+        self._start_waiter(game_id, start, popen=popen, processes=[root] if root else [],
+                           folder=os.path.dirname(executable_path) if executable_path else None)
+
+    def track_executable(self, game_id, executable_path, timeout=600):
+        """
+        Tracks a game launched indirectly (steam://rungameid/...): the session
+        starts when its executable appears within timeout seconds.
+        """
+        if not executable_path:
+            return
+        with self._lock:
+            self._awaiting[_path_key(executable_path)] = (game_id, executable_path, time.time() + timeout)
+        self.snapshot_service.watch([executable_path])
+        # It may be running already, e.g. when Steam was quicker than a tick
+        if self.snapshot_service.is_running(executable_path):
+            self._on_process_states_changed({executable_path: True})
+
+    def stop(self):
+        """
+        Stops tracking. Returns {game id: session start} of the sessions
+        still running, for the caller to record up to now; their waiters
+        end without calling on_session_end.
+        """
+        with self._lock:
+            self._stopped = True
+            self._awaiting.clear()
+            active, self._active = self._active, {}
+        return active
+
+    def _on_process_states_changed(self, changes):
+        now = time.time()
+        for path, running in changes.items():
+            if not running:
+                continue
+            with self._lock:
+                awaiting = self._awaiting.pop(_path_key(path), None)
+            if awaiting is None:
+                continue
+            game_id, executable_path, deadline = awaiting
+            if now > deadline:
+                continue
+            processes = _processes_running(executable_path)
+            if processes:
+                start = min(process.create_time() for process in processes)
+                self._start_waiter(game_id, start, processes=processes, folder=os.path.dirname(executable_path))
+
+    def _start_waiter(self, game_id, start, popen=None, processes=(), folder=None):
+        with self._lock:
+            if self._stopped or game_id in self._active:
+                return
+            self._active[game_id] = start
+        threading.Thread(target=self._wait, args=(game_id, start, popen, list(processes), folder), daemon=True).start()
+
+    def _wait(self, game_id, start, popen, processes, folder):
+        try:
+            if popen is not None:
+                # Children are looked up before the launcher can exit and orphan them
+                processes = processes + _children(processes)
+                popen.wait()
+            _wait_for_all(processes)
+            if folder:
+                # Launchers often exit as soon as the game itself is running
+                _wait_for_all(_processes_in_folder(folder))
+        except Exception as e:
+            print(f"Error tracking play session for game {game_id}: {e}")
+        finally:
+            # Whoever takes the session out of _active records it: this waiter or stop
+            with self._lock:
+                ended = self._active.pop(game_id, None) is not None
+        if ended:
+            self.on_session_end(game_id, start, time.time())
+
+def _children(processes):
+    children = []
+    for process in processes:
+        try:
+            children.extend(process.children(recursive=True))
+        except psutil.Error:
+            pass
+    return children
+
+def _wait_for_all(processes):
+    """
+    Blocks until every process, and any children they start meanwhile, has exited.
+    """
+    pending = list(processes)
+    while pending:
+        process = pending.pop()
+        try:
+            # Take the children first: once the process exits they are orphaned
+            pending.extend(process.children(recursive=True))
+            process.wait()
+        except psutil.Error:
+            continue
+
+def _processes_running(executable_path):
+    key = _path_key(executable_path)
+    processes = []
+    for process in psutil.process_iter(["exe"]):
+        exe = process.info["exe"]
+        if exe and _path_key(exe) == key:
+            processes.append(process)
+    return processes
+
+def _processes_in_folder(folder):
+    prefix = _path_key(folder) + os.sep
+    processes = []
+    for process in psutil.process_iter(["exe"]):
+        exe = process.info["exe"]
+        if exe and _path_key(exe).startswith(prefix) and process.pid != os.getpid():
+            processes.append(process)
+    return processes
+
+if __name__ == "__main__":
+    # Stand-in games on Linux: a direct launch, a launcher that starts the
+    # game and exits straight away, and a "Steam" launch matched by executable.
+    import shutil
+    import subprocess
+    import sys
+    import tempfile
+    from process_snapshot import ProcessSnapshotService
+
+    finished = {}
+    done = threading.Event()
+
+    def on_session_end(game_id, start, end):
+        finished[game_id] = end - start
+        if len(finished) == 3:
+            done.set()
+
+    service = ProcessSnapshotService(interval=0.5)
+    service.start()
+    tracker = SessionTracker(on_session_end, service)
+    with tempfile.TemporaryDirectory() as directory:
+        sleep = os.path.realpath(shutil.which("sleep"))
+
+        def install(name):
+            os.mkdir(os.path.join(directory, name))
+            return shutil.copy(sleep, os.path.join(directory, name, "game"))
+
+        direct_game = install("direct")
+        tracker.track_process("direct", subprocess.Popen([direct_game, "2"]), direct_game)
+        launched_game = install("launcher")
+        launcher = subprocess.Popen([sys.executable, "-c",
+                                     f"import subprocess; subprocess.Popen([{launched_game!r}, '3'])"])
+        tracker.track_process("launcher", launcher, launched_game)
+        steam_game = install("steam")
+        tracker.track_executable("steam", steam_game)
+        time.sleep(1)
+        steam_process = subprocess.Popen([steam_game, "2"]) # what Steam would start
+
+        cpu_before = time.process_time()
+        done.wait(timeout=15)
+        print(f"tracker CPU while waiting: {(time.process_time() - cpu_before) * 1000:.1f} ms")
+        steam_process.wait()
+    tracker.stop()
+    service.stop()
+    for game_id, duration in sorted(finished.items()):
+        print(f"{game_id}: {duration:.1f} s")
@@ -40,6 +40,20 @@ class SettingsDialog(QDialog):
         theme_layout.addWidget(self.theme_combo)
         self.main_layout.addLayout(theme_layout)
 
+        # Library Storage
+        storage_layout = QHBoxLayout()
+        storage_label = QLabel("Library Storage (applies on restart):")
+        self.storage_combo = QComboBox()
+        self.storage_combo.addItems(["JSON", "SQLite"])
+
+        # Load saved storage backend
+        saved_storage_pref = self.settings.value("library_storage", "JSON")
+        self.storage_combo.setCurrentText(saved_storage_pref)
+
+        storage_layout.addWidget(storage_label)
+        storage_layout.addWidget(self.storage_combo)
+        self.main_layout.addLayout(storage_layout)
+
         # Steam Web API Key
         api_key_layout = QHBoxLayout()
         api_key_label = QLabel("Steam Web API Key:")
@@ -89,6 +103,7 @@ class SettingsDialog(QDialog):
         self.settings.setValue("artwork_display_preference", self.artwork_combo.currentText())
         self.settings.setValue("theme_preference", self.theme_combo.currentText())
         self.settings.setValue("steam_web_api_key", self.api_key_input.text())
+        self.settings.setValue("library_storage", self.storage_combo.currentText())
         self.settings.setValue("config_file_location", self.config_path_input.text())
         self.accept()
 
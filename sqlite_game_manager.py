@@ -0,0 +1,504 @@
+import os
+import sqlite3
+import uuid
+from library_journal import LibraryJournal
+from game_record import changed_fields
+
+# Scalar game fields stored as columns of the games table, in JSON schema order
+SCALAR_FIELDS = [
+    "title", "platform", "genre", "executable_path", "launch_arguments", "cloud_save_path",
+    "steam_app_id", "developer", "publisher", "game_type", "os_list", "release_state", "description",
+]
+FTS_FIELDS = ["title", "developer", "publisher", "description"]
+# What search_by "all" covers, the same fields as GameManager's "all"
+SEARCH_ALL_FIELDS = ["title", "platform", "genre", "developer", "publisher", "description"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    platform TEXT NOT NULL DEFAULT '',
+    genre TEXT NOT NULL DEFAULT '',
+    executable_path TEXT NOT NULL DEFAULT '',
+    executable_path_key TEXT NOT NULL DEFAULT '',
+    launch_arguments TEXT NOT NULL DEFAULT '',
+    cloud_save_path TEXT NOT NULL DEFAULT '',
+    steam_app_id TEXT NOT NULL DEFAULT '',
+    developer TEXT NOT NULL DEFAULT '',
+    publisher TEXT NOT NULL DEFAULT '',
+    game_type TEXT NOT NULL DEFAULT '',
+    os_list TEXT NOT NULL DEFAULT '',
+    release_state TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    playtime_seconds INTEGER NOT NULL DEFAULT 0,
+    last_played INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS games_platform ON games (platform COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS games_genre ON games (genre COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS games_steam_app_id ON games (steam_app_id);
+CREATE INDEX IF NOT EXISTS games_executable_path_key ON games (executable_path_key);
+
+CREATE TABLE IF NOT EXISTS iso_paths (
+    game_id TEXT NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (game_id, position)
+);
+CREATE TABLE IF NOT EXISTS artwork (
+    game_id TEXT NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (game_id, kind)
+);
+CREATE TABLE IF NOT EXISTS workshop_content_paths (
+    game_id TEXT NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (game_id, position)
+);
+CREATE TABLE IF NOT EXISTS play_sessions (
+    game_id TEXT NOT NULL REFERENCES games (id) ON DELETE CASCADE,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    duration INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS play_sessions_game_id ON play_sessions (game_id, start);
+"""
+# Integer columns added to the games table after the first release,
+# with their column definitions for upgrading older databases
+ADDED_COLUMNS = {
+    "playtime_seconds": "INTEGER NOT NULL DEFAULT 0",
+    "last_played": "INTEGER NOT NULL DEFAULT 0",
+}
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5 (
+    title, developer, publisher, description,
+    content='games', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS games_fts_insert AFTER INSERT ON games BEGIN
+    INSERT INTO games_fts (rowid, title, developer, publisher, description)
+    VALUES (new.rowid, new.title, new.developer, new.publisher, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS games_fts_delete AFTER DELETE ON games BEGIN
+    INSERT INTO games_fts (games_fts, rowid, title, developer, publisher, description)
+    VALUES ('delete', old.rowid, old.title, old.developer, old.publisher, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS games_fts_update AFTER UPDATE ON games BEGIN
+    INSERT INTO games_fts (games_fts, rowid, title, developer, publisher, description)
+    VALUES ('delete', old.rowid, old.title, old.developer, old.publisher, old.description);
+    INSERT INTO games_fts (rowid, title, developer, publisher, description)
+    VALUES (new.rowid, new.title, new.developer, new.publisher, new.description);
+END;
+"""
+
+def _executable_path_key(executable_path):
+    return os.path.normcase(os.path.normpath(executable_path)) if executable_path else ""
+
+class SQLiteGameManager:
+    """
+    GameManager backed by a SQLite database instead of games.json.
+
+    Rows are only read when asked for, so large libraries can be paged with
+    get_games_page/iter_games instead of being held in memory. Title,
+    developer, publisher and description are searchable through FTS5 when
+    the SQLite build has it.
+    """
+    def __init__(self, db_file=None):
+        self.db_file = db_file or os.path.join(os.path.dirname(__file__), "games.db")
+        self.connection = sqlite3.connect(self.db_file)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self._upgrade_schema()
+        self.connection.executescript(SCHEMA)
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 is not available, falling back to LIKE search: {e}")
+            self.has_fts = False
+        self.connection.commit()
+
+    def _upgrade_schema(self):
+        columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(games)")}
+        if not columns:
+            return # new database, created from SCHEMA
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE games ADD COLUMN {column} {definition}")
+
+    def save_games(self):
+        self.connection.commit()
+
+    def flush(self):
+        self.connection.commit()
+
+    def load_games(self):
+        # Rows are read on demand; there is nothing to load up front.
+        pass
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def _insert_game(self, game):
+        columns = ["id", "executable_path_key"] + SCALAR_FIELDS + list(ADDED_COLUMNS)
+        values = [game["id"], _executable_path_key(game.get("executable_path", ""))]
+        values += [str(game.get(field) or "") for field in SCALAR_FIELDS]
+        values += [int(game.get(column) or 0) for column in ADDED_COLUMNS]
+        self.connection.execute(
+            f"INSERT INTO games ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", values)
+        self._insert_children(game)
+        self.connection.executemany(
+            "INSERT INTO play_sessions (game_id, start, end, duration) VALUES (?, ?, ?, ?)",
+            [(game["id"], session["start"], session["end"], session["duration"]) for session in game.get("play_sessions") or []])
+
+    def _insert_children(self, game):
+        self.connection.executemany(
+            "INSERT INTO iso_paths (game_id, position, path) VALUES (?, ?, ?)",
+            [(game["id"], position, path) for position, path in enumerate(game.get("iso_paths") or [])])
+        self.connection.executemany(
+            "INSERT INTO artwork (game_id, kind, path) VALUES (?, ?, ?)",
+            [(game["id"], kind, path) for kind, path in (game.get("artwork") or {}).items()])
+        self.connection.executemany(
+            "INSERT INTO workshop_content_paths (game_id, position, path) VALUES (?, ?, ?)",
+            [(game["id"], position, path) for position, path in enumerate(game.get("workshop_content_paths") or [])])
+
+    def _rows_to_games(self, rows):
+        """
+        Turns games rows into game dicts, fetching child rows for all of them at once.
+        """
+        games = {}
+        for row in rows:
+            game = {"id": row["id"]}
+            for field in SCALAR_FIELDS:
+                game[field] = row[field]
+            game["iso_paths"] = []
+            game["artwork"] = {}
+            game["workshop_content_paths"] = []
+            for column in ADDED_COLUMNS:
+                game[column] = row[column]
+            game["play_sessions"] = []
+            games[row["id"]] = game
+        if not games:
+            return []
+
+        # Stay well below SQLite's bound-parameter limit
+        ids = list(games)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            for row in self.connection.execute(
+                    f"SELECT game_id, path FROM iso_paths WHERE game_id IN ({placeholders}) ORDER BY game_id, position", chunk):
+                games[row["game_id"]]["iso_paths"].append(row["path"])
+            for row in self.connection.execute(
+                    f"SELECT game_id, kind, path FROM artwork WHERE game_id IN ({placeholders})", chunk):
+                games[row["game_id"]]["artwork"][row["kind"]] = row["path"]
+            for row in self.connection.execute(
+                    f"SELECT game_id, path FROM workshop_content_paths WHERE game_id IN ({placeholders}) ORDER BY game_id, position", chunk):
+                games[row["game_id"]]["workshop_content_paths"].append(row["path"])
+            for row in self.connection.execute(
+                    f"SELECT game_id, start, end, duration FROM play_sessions WHERE game_id IN ({placeholders}) ORDER BY game_id, start", chunk):
+                games[row["game_id"]]["play_sessions"].append({"start": row["start"], "end": row["end"], "duration": row["duration"]})
+        return list(games.values())
+
+    def add_game(self, title, platform, genre, executable_path="", launch_arguments="", iso_paths=None, artwork=None,
+                 cloud_save_path="", workshop_content_paths=None, steam_app_id="",
+                 developer="", publisher="", game_type="", os_list="", release_state="", description=""):
+        game = {
+            "id": uuid.uuid4().hex,
+            "title": title,
+            "platform": platform,
+            "genre": genre,
+            "executable_path": executable_path,
+            "launch_arguments": launch_arguments,
+            "iso_paths": iso_paths or [],
+            "artwork": artwork or {},
+            "cloud_save_path": cloud_save_path,
+            "steam_app_id": steam_app_id,
+            "workshop_content_paths": workshop_content_paths or [],
+            "developer": developer,
+            "publisher": publisher,
+            "game_type": game_type,
+            "os_list": os_list,
+            "release_state": release_state,
+            "description": description
+        }
+        with self.connection:
+            self._insert_game(game)
+        print(f"Added game: {title}")
+        return game["id"]
+
+    def add_games(self, records):
+        """
+        Bulk add for imports: like merge_games, but games that are already in
+        the library are left untouched.
+        """
+        return self.merge_games(records, update_existing=False)
+
+    def merge_games(self, records, update_existing=True):
+        """
+        Adds game records in one transaction, updating instead of duplicating
+        games matched by steam_app_id or executable path. See
+        GameManager.merge_games.
+        """
+        report = {"added": [], "updated": [], "skipped": []}
+        with self.connection:
+            for record in records:
+                game = self._find_duplicate(record)
+                if game is None:
+                    game = dict(record, id=record.get("id") or uuid.uuid4().hex)
+                    self._insert_game(game)
+                    report["added"].append(game["id"])
+                    continue
+                changes = changed_fields(game, record) if update_existing else {}
+                if not changes:
+                    report["skipped"].append(game["id"])
+                    continue
+                game.update(changes)
+                self._update_game(game)
+                report["updated"].append(game["id"])
+        print(f"Merged games: {len(report['added'])} added, {len(report['updated'])} updated, {len(report['skipped'])} skipped")
+        return report
+
+    def _find_duplicate(self, record):
+        steam_app_id = str(record.get("steam_app_id") or "")
+        if steam_app_id:
+            game = self.find_game_by_steam_app_id(steam_app_id)
+            if game is not None:
+                return game
+        key = _executable_path_key(record.get("executable_path") or "")
+        if key:
+            # Games with different Steam app ids never match
+            rows = self.connection.execute(
+                "SELECT * FROM games WHERE executable_path_key = ? AND (? = '' OR steam_app_id = '') ORDER BY rowid LIMIT 1",
+                (key, steam_app_id)).fetchall()
+            games = self._rows_to_games(rows)
+            if games:
+                return games[0]
+        return None
+
+    def count_games(self):
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def get_games_page(self, offset, limit):
+        rows = self.connection.execute(
+            "SELECT * FROM games ORDER BY rowid LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return self._rows_to_games(rows)
+
+    def iter_games(self, page_size=500):
+        """
+        Yields every game, reading page_size rows at a time.
+        """
+        for page in self.load_games_progressively(page_size):
+            yield from page
+
+    def load_games_progressively(self, batch_size=500):
+        """
+        Yields the library in lists of batch_size games. The database is
+        already open, so this only lets the UI fill its table page by page
+        the same way it does for GameManager.
+        """
+        last_rowid = 0
+        while True:
+            rows = self.connection.execute(
+                "SELECT * FROM games WHERE rowid > ? ORDER BY rowid LIMIT ?", (last_rowid, batch_size)).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1]["rowid"]
+            yield self._rows_to_games(rows)
+
+    def get_all_games(self):
+        return list(self.iter_games())
+
+    def get_game(self, game_id):
+        rows = self.connection.execute("SELECT * FROM games WHERE id = ?", (game_id,)).fetchall()
+        games = self._rows_to_games(rows)
+        return games[0] if games else None
+
+    def find_games(self, **criteria):
+        """
+        Returns the games whose fields equal every given value,
+        e.g. find_games(platform="PC (Steam)", genre="Action").
+        """
+        clauses = []
+        values = []
+        for field, value in criteria.items():
+            if field in ("platform", "genre"):
+                clauses.append(f"{field} = ? COLLATE NOCASE")
+                values.append(str(value))
+            elif field == "steam_app_id":
+                clauses.append("steam_app_id = ?")
+                values.append(str(value))
+            elif field == "executable_path":
+                clauses.append("executable_path_key = ?")
+                values.append(_executable_path_key(value))
+            else:
+                raise ValueError(f"Field '{field}' is not indexed.")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection.execute(f"SELECT * FROM games {where} ORDER BY rowid", values).fetchall()
+        return self._rows_to_games(rows)
+
+    def find_game_by_steam_app_id(self, steam_app_id):
+        games = self.find_games(steam_app_id=steam_app_id)
+        return games[0] if games else None
+
+    def find_game_by_executable_path(self, executable_path):
+        games = self.find_games(executable_path=executable_path)
+        return games[0] if games else None
+
+    def search_games(self, query, search_by="title", limit=None):
+        """
+        Full-text search over title, developer, publisher and description.
+        Every word in the query is matched as a prefix. Platform and genre
+        are matched as substrings. search_by "all" covers all six fields,
+        full-text matches first. With a limit only the first `limit` matches
+        are returned.
+        """
+        words = query.split()
+        if not words:
+            return self.get_all_games()
+        # SQLite reads a negative LIMIT as no limit
+        row_limit = -1 if limit is None else limit
+        if self.has_fts and (search_by in FTS_FIELDS or search_by == "all"):
+            # Quote each word so FTS5 syntax characters in the query are taken literally
+            terms = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+            match = terms if search_by == "all" else f"{search_by} : ({terms})"
+            rows = self.connection.execute(
+                "SELECT games.* FROM games_fts JOIN games ON games.rowid = games_fts.rowid "
+                "WHERE games_fts MATCH ? ORDER BY rank LIMIT ?", (match, row_limit)).fetchall()
+            if search_by != "all" or len(rows) == limit:
+                return self._rows_to_games(rows)
+            matched = {row["rowid"] for row in rows}
+            rows += [row for row in self._like_rows(query, ["platform", "genre"], row_limit) if row["rowid"] not in matched]
+            return self._rows_to_games(rows[:limit])
+
+        fields = SEARCH_ALL_FIELDS if search_by == "all" else [search_by]
+        if any(field not in SCALAR_FIELDS for field in fields):
+            return []
+        return self._rows_to_games(self._like_rows(query, fields, row_limit))
+
+    def _like_rows(self, query, fields, row_limit=-1):
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where = " OR ".join(f"{field} LIKE ? ESCAPE '\\'" for field in fields)
+        return self.connection.execute(
+            f"SELECT * FROM games WHERE {where} ORDER BY rowid LIMIT ?", [pattern] * len(fields) + [row_limit]).fetchall()
+
+    def edit_game(self, game_id, new_title, new_platform, new_genre, new_executable_path, new_launch_arguments, new_iso_paths, new_artwork, new_cloud_save_path, new_steam_app_id, new_workshop_content_paths,
+                  new_developer, new_publisher, new_game_type, new_os_list, new_release_state, new_description):
+        game = {
+            "id": game_id,
+            "title": new_title,
+            "platform": new_platform,
+            "genre": new_genre,
+            "executable_path": new_executable_path,
+            "launch_arguments": new_launch_arguments,
+            "iso_paths": new_iso_paths,
+            "artwork": new_artwork,
+            "cloud_save_path": new_cloud_save_path,
+            "steam_app_id": new_steam_app_id,
+            "workshop_content_paths": new_workshop_content_paths,
+            "developer": new_developer,
+            "publisher": new_publisher,
+            "game_type": new_game_type,
+            "os_list": new_os_list,
+            "release_state": new_release_state,
+            "description": new_description
+        }
+        with self.connection:
+            if not self._update_game(game):
+                print(f"Error: No game with id {game_id} to edit.")
+                return False
+        print(f"Edited game {game_id}: {new_title}")
+        return True
+
+    def _update_game(self, game):
+        assignments = ", ".join(f"{field} = ?" for field in ["executable_path_key"] + SCALAR_FIELDS)
+        values = [_executable_path_key(game.get("executable_path") or "")]
+        values += [str(game.get(field) or "") for field in SCALAR_FIELDS]
+        cursor = self.connection.execute(f"UPDATE games SET {assignments} WHERE id = ?", values + [game["id"]])
+        if cursor.rowcount == 0:
+            return False
+        # Play sessions are only ever added, by record_play_session
+        for table in ("iso_paths", "artwork", "workshop_content_paths"):
+            self.connection.execute(f"DELETE FROM {table} WHERE game_id = ?", (game["id"],))
+        self._insert_children(game)
+        return True
+
+    def record_play_session(self, game_id, start, end):
+        """
+        Adds a finished play session (Unix timestamps) to the game's play
+        history and total playtime.
+        """
+        start, end = int(start), int(end)
+        duration = max(0, end - start)
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE games SET playtime_seconds = playtime_seconds + ?, last_played = MAX(last_played, ?) WHERE id = ?",
+                (duration, end, game_id))
+            if cursor.rowcount == 0:
+                print(f"Error: No game with id {game_id} to record a play session for.")
+                return False
+            self.connection.execute("INSERT INTO play_sessions (game_id, start, end, duration) VALUES (?, ?, ?, ?)",
+                                    (game_id, start, end, duration))
+        print(f"Recorded {duration} s played for game {game_id}")
+        return True
+
+    def delete_game(self, game_id):
+        with self.connection:
+            row = self.connection.execute("SELECT title FROM games WHERE id = ?", (game_id,)).fetchone()
+            if row is None:
+                return False
+            self.connection.execute("DELETE FROM games WHERE id = ?", (game_id,))
+        print(f"Deleted game: {row['title']}")
+        return True
+
+def _remove_database(db_file):
+    for path in (db_file, db_file + "-wal", db_file + "-shm"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def migrate_from_json(json_file, db_file):
+    """
+    One-shot import of an existing games.json into a new SQLite library.
+    Returns the number of games migrated; on failure db_file is not created.
+    """
+    if os.path.exists(db_file):
+        raise FileExistsError(f"Refusing to migrate into existing database {db_file}")
+    # Changes not yet compacted into games.json live in its journal, which
+    # may be all there is of a library that has never been compacted.
+    journal = LibraryJournal(json_file)
+    if not os.path.exists(json_file) and not os.path.exists(journal.journal_path):
+        raise FileNotFoundError(f"No library to migrate at {json_file}")
+    game_list, _ = journal.load()
+
+    # Built beside db_file and moved into place only once complete, so a
+    # failed migration leaves no database behind and is retried next time
+    temp_file = db_file + ".migrating"
+    _remove_database(temp_file)
+    try:
+        manager = SQLiteGameManager(temp_file)
+        try:
+            with manager.connection:
+                for game in game_list:
+                    manager._insert_game(game)
+            manager.connection.execute("PRAGMA journal_mode = DELETE") # folds the WAL into the file
+        finally:
+            manager.close()
+        os.replace(temp_file, db_file)
+    except BaseException:
+        _remove_database(temp_file)
+        raise
+    print(f"Migrated {len(game_list)} games from {json_file} to {db_file}")
+    return len(game_list)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("Usage: python sqlite_game_manager.py <games.json> <games.db>")
+        sys.exit(1)
+    migrate_from_json(sys.argv[1], sys.argv[2])
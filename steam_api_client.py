@@ -0,0 +1,317 @@
+import copy
+import time
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from response_cache import ResponseCache, STALE_WHILE_REVALIDATE_ENDPOINTS, cache_key, serves_stale
+
+STEAM_API_URL = "https://api.steampowered.com"
+# Statuses worth another try: rate limited or a server-side hiccup
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Most ids the batch endpoints accept in one call
+MAX_IDS_PER_CALL = 100
+
+def batch_ids(ids, size=MAX_IDS_PER_CALL):
+    """
+    Returns the ids as strings, de-duplicated in input order, and split
+    into chunks of at most size.
+    """
+    unique = list(dict.fromkeys(str(id_) for id_ in ids))
+    return unique, [unique[start:start + size] for start in range(0, len(unique), size)]
+
+def in_input_order(ids, results, id_field):
+    """
+    Merges the item lists of batched calls into one list in the order of
+    ids; ids the API returned nothing for are left out.
+    """
+    by_id = {str(item.get(id_field)): item for items in results for item in items}
+    return [by_id[id_] for id_ in ids if id_ in by_id]
+
+class SteamApiError(Exception):
+    """
+    A Steam Web API call failed for good: an error status, a network
+    error after the last retry, or a response that is not JSON.
+    """
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+class RateLimiter:
+    """
+    Token bucket: up to burst requests at once, refilled at rate per second.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class SteamApiClient:
+    """
+    The one HTTP client for Steam Web API calls.
+
+    Requests go through a pooled requests.Session, so calls to the same
+    host reuse their keep-alive connections instead of a new TLS handshake
+    each. Each host has its own RateLimiter; every request has a
+    (connect, read) timeout; 429 and 5xx responses and network errors are
+    retried up to max_retries times with exponential backoff, honouring
+    Retry-After. Safe to share between threads.
+
+    Identical requests made while one is already in flight wait for its
+    response instead of going out again.
+
+    With a ResponseCache, fresh responses are served from it, stale ones
+    are revalidated with a conditional request, and a stale response is
+    served when the API cannot be reached. For the endpoints in
+    stale_while_revalidate (True for all) a stale response is returned at
+    once and revalidated in the background.
+    """
+    def __init__(self, base_url=STEAM_API_URL, timeout=(5.0, 15.0), max_retries=3, backoff=0.5, max_backoff=8.0,
+                 rate=10.0, burst=10, pool_size=10, cache=None, stale_while_revalidate=False):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate = rate
+        self.burst = burst
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+        self.cache = cache
+        self.stale_while_revalidate = stale_while_revalidate
+        self._revalidating = set()
+        self._in_flight = {} # cache key -> Future of the request being made
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        with self._limiters_lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(self.rate, self.burst)
+            return limiter
+
+    def _retry_delay(self, attempt, response):
+        delay = self.backoff * 2 ** attempt
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        return min(delay, self.max_backoff)
+
+    def get(self, path, params=None, timeout=None, use_cache=True):
+        """
+        GETs base_url/path and returns the decoded JSON. Raises SteamApiError.
+        """
+        key = (cache_key(path, params), use_cache)
+        with self._limiters_lock:
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                future = self._in_flight[key] = Future()
+                future.waiters = 0
+            else:
+                in_flight.waiters += 1
+        if in_flight is not None:
+            # Each waiter gets its own copy to change as it likes
+            return copy.deepcopy(in_flight.result())
+        try:
+            data = self._get(path, params, timeout, use_cache)
+        except BaseException as e:
+            with self._limiters_lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._limiters_lock:
+            del self._in_flight[key]
+            shared = future.waiters > 0
+        # Waiters copy from a snapshot, so this caller may change data freely
+        future.set_result(copy.deepcopy(data) if shared else None)
+        return data
+
+    def get_many(self, calls, workers=8):
+        """
+        Makes (path, params) calls concurrently and returns their JSON in
+        the same order. Raises the first SteamApiError.
+        """
+        calls = list(calls)
+        if len(calls) <= 1:
+            return [self.get(*call) for call in calls]
+        with ThreadPoolExecutor(max_workers=min(workers, len(calls))) as executor:
+            return list(executor.map(lambda call: self.get(*call), calls))
+
+    def _get(self, path, params, timeout, use_cache):
+        cached = self.cache.lookup(path, params) if self.cache is not None and use_cache else None
+        if cached is not None:
+            if cached.fresh:
+                return cached.data()
+            if serves_stale(self.stale_while_revalidate, path):
+                self._revalidate_in_background(path, params, timeout, cached)
+                return cached.data()
+        try:
+            return self._fetch(path, params, timeout, cached if use_cache else None)
+        except SteamApiError as e:
+            # Offline or the API is having trouble: an old answer beats none
+            if cached is not None and (e.status is None or e.status in RETRY_STATUSES):
+                print(f"Serving cached response for {path}: {e}")
+                return cached.data()
+            raise
+
+    def _fetch(self, path, params, timeout, cached):
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        response = self._request(path, params, timeout, headers)
+        if response.status_code == 304 and cached is not None:
+            self.cache.refresh(cached, path)
+            return cached.data()
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise SteamApiError(f"Response from {path} is not JSON: {e}", response.status_code)
+        if self.cache is not None:
+            self.cache.store(path, params, data, response.headers.get("ETag", ""), response.headers.get("Last-Modified", ""))
+        return data
+
+    def _revalidate_in_background(self, path, params, timeout, cached):
+        key = cache_key(path, params)
+        with self._limiters_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                self._fetch(path, params, timeout, cached)
+            except SteamApiError as e:
+                print(f"Could not revalidate cached response for {path}: {e}")
+            finally:
+                with self._limiters_lock:
+                    self._revalidating.discard(key)
+        threading.Thread(target=revalidate, daemon=True).start()
+
+    def _request(self, path, params, timeout, headers):
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        limiter = self._limiter(url)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            response = None
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout or self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = SteamApiError(f"Request to {path} failed: {e}")
+            except requests.exceptions.RequestException as e:
+                # Redirect loops, broken chunked bodies, bad URLs: retrying will not help
+                raise SteamApiError(f"Request to {path} failed: {e}")
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                error = SteamApiError(f"Request to {path} failed with HTTP {response.status_code}", response.status_code)
+            if attempt == self.max_retries:
+                raise error
+            time.sleep(self._retry_delay(attempt, response))
+        if response.status_code >= 400:
+            raise SteamApiError(f"Request to {path} failed with HTTP {response.status_code}", response.status_code)
+        return response
+
+    def close(self):
+        self.session.close()
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def shared_steam_api_client():
+    """
+    The SteamApiClient every Steam Web API call in Gameshelf shares, so
+    they share its connections, rate limits and response cache too.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            try:
+                cache = ResponseCache()
+            except sqlite3.Error as e:
+                print(f"Steam API responses will not be cached: {e}")
+                cache = None
+            _shared_client = SteamApiClient(cache=cache, stale_while_revalidate=STALE_WHILE_REVALIDATE_ENDPOINTS)
+        return _shared_client
+
+if __name__ == "__main__":
+    # Times the client against a local stand-in for api.steampowered.com;
+    # tests/test_steam_api_client.py checks its behaviour.
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+    from steam_integrator import get_steam_player_summaries
+    from steam_workshop_integrator import SteamWorkshopIntegrator
+
+    connections = set()
+    hits = {}
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # keep-alive
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            connections.add(self.client_address)
+            path, _, query = self.path.partition("?")
+            params = {key: values[0] for key, values in parse_qs(query).items()}
+            hits[path] = hits.get(path, 0) + 1
+            body = {"ok": True}
+            if path == "/ISteamUser/GetPlayerSummaries/v2/":
+                body = {"response": {"players": [{"steamid": steamid} for steamid in params["steamids"].split(",")]}}
+            elif path == "/IPublishedFileService/GetDetails/v1/":
+                time.sleep(0.1)
+                body = {"response": {"publishedfiledetails": [{"publishedfileid": value, "title": f"item {value}"}
+                                                              for key, value in params.items() if key.startswith("publishedfileids")]}}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = SteamApiClient(base_url=base_url, timeout=(1.0, 0.5), backoff=0.05, rate=50, burst=5)
+
+    started = time.monotonic()
+    for _ in range(30):
+        client.get("ok/")
+    print(f"30 requests at 50/s with a burst of 5: {time.monotonic() - started:.2f} s "
+          f"over {len(connections)} connection(s)")
+
+    many_ids = [str(76561190000000000 + number) for number in range(250)]
+    started = time.monotonic()
+    get_steam_player_summaries("key", many_ids, client=client)
+    print(f"summaries of 250 players in {hits['/ISteamUser/GetPlayerSummaries/v2/']} calls: "
+          f"{time.monotonic() - started:.2f} s")
+    started = time.monotonic()
+    SteamWorkshopIntegrator(api_key="key", client=client).get_workshop_item_details([str(n) for n in range(300, 0, -1)])
+    print(f"details of 300 items in {hits['/IPublishedFileService/GetDetails/v1/']} concurrent calls: "
+          f"{time.monotonic() - started:.2f} s")
+    server.shutdown()
@@ -1,9 +1,17 @@
 import winreg
 import os
-import psutil
 import re
-import vdf # Added import for vdf
-import requests
+import vdf_parser
+from appinfo_reader import AppInfoReader
+from executable_finder import shared_executable_finder
+from process_snapshot import current_snapshot
+from manifest_cache import ManifestCache
+from artwork_index import shared_artwork_index
+from workshop_inventory import WorkshopInventory
+from steam_api_client import SteamApiError, shared_steam_api_client, batch_ids, in_input_order
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 def find_steam_install_path():
     try:
@@ -57,16 +65,18 @@ def get_steam_library_folders(steam_install_path):
         return [steam_install_path] # Fallback to default if not found
 
     try:
-        with open(library_folders_vdf_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        # Regex to find paths within "path" keys
-        # This regex looks for lines like "\"1\"\t\t\"E:\\SteamLibrary\""
-        # and extracts the path. It handles escaped backslashes.
-        # It specifically targets numeric keys for library folders.
-        paths = re.findall(r'"\d+"\s+"(.+?)"', content)
-        
-        for path in paths:
+        data = vdf_parser.load(library_folders_vdf_path)
+        root = next((value for key, value in data.items() if key.lower() == "libraryfolders"), {})
+
+        # Libraries are numbered entries. The old format maps each number
+        # straight to a path; the new one maps it to a block with a "path" key
+        # and the apps installed there. Other keys (ContentStatsID, ...) are skipped.
+        for key, entry in root.items():
+            if not key.isdigit():
+                continue
+            path = entry.get("path") if isinstance(entry, dict) else entry
+            if not path:
+                continue
             # Ensure the path ends with 'steamapps'
             steamapps_path = os.path.join(path, 'steamapps')
             if os.path.exists(steamapps_path):
@@ -88,53 +98,138 @@ def get_steam_library_folders(steam_install_path):
     return library_folders
 
 
-def get_installed_steam_games(library_folders):
+def get_installed_steam_games(library_folders, use_cache=True):
+    """
+    Returns {appid: game_info} for every installed game. With use_cache,
+    manifests unchanged since the last scan are not read again.
+    """
+    cache = ManifestCache() if use_cache else None
     steam_games = {}
-    for lib_folder in library_folders:
-        steamapps_path = lib_folder # lib_folder already points to steamapps
-        for filename in os.listdir(steamapps_path):
-            if filename.startswith("appmanifest_") and filename.endswith(".acf"):
-                acf_path = os.path.join(steamapps_path, filename)
-                game_info = parse_acf_file(acf_path)
-                if game_info and "appid" in game_info and "name" in game_info and "installdir" in game_info:
-                    game_info['full_install_path'] = os.path.join(lib_folder.replace('steamapps', ''), 'common', game_info['installdir'])
-                    steam_games[game_info["appid"]] = game_info
+    for game_info in iter_installed_steam_games(library_folders, cache=cache):
+        steam_games[game_info["appid"]] = game_info
+    if cache is not None:
+        cache.save()
     return steam_games
 
+def iter_installed_steam_games(library_folders, workers_per_drive=4, cache=None):
+    """
+    Yields the parsed appmanifest of every installed game as soon as it is
+    read. Library folders on the same drive share one pool of reader
+    threads and each drive gets its own, so a scan takes about as long as
+    the slowest drive rather than all of them in turn. Manifests found in
+    the optional ManifestCache are not read at all; the caller saves it.
+    """
+    drives = {}
+    for lib_folder in library_folders:
+        drives.setdefault(_drive_key(lib_folder), []).append(lib_folder)
+
+    results = queue.Queue()
+    for drive_folders in drives.values():
+        threading.Thread(target=_scan_drive, args=(drive_folders, workers_per_drive, results, cache), daemon=True).start()
+
+    # Each drive thread puts None on the queue when it is done
+    remaining = len(drives)
+    while remaining:
+        game_info = results.get()
+        if game_info is None:
+            remaining -= 1
+        else:
+            yield game_info
+    if cache is not None:
+        cache.prune(library_folders)
+
+def _drive_key(path):
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return os.path.splitdrive(os.path.abspath(path))[0]
+
+def _scan_drive(library_folders, workers, results, cache):
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for lib_folder in library_folders:
+                try:
+                    with os.scandir(lib_folder) as entries:
+                        for entry in entries:
+                            if not (entry.name.startswith("appmanifest_") and entry.name.endswith(".acf")):
+                                continue
+                            if cache is not None:
+                                # On Windows the stat comes with the directory listing
+                                stat_result = entry.stat()
+                                game_info = cache.get(entry.path, stat_result)
+                                if game_info is not None:
+                                    game_info = _installed_game(lib_folder, game_info)
+                                    if game_info:
+                                        results.put(game_info)
+                                    continue
+                            else:
+                                stat_result = None
+                            futures.append(executor.submit(_read_manifest, lib_folder, entry.path, stat_result, cache))
+                except OSError as e:
+                    print(f"Error scanning Steam library {lib_folder}: {e}")
+            for future in as_completed(futures):
+                game_info = future.result()
+                if game_info:
+                    results.put(game_info)
+    finally:
+        results.put(None)
+
+def _read_manifest(lib_folder, acf_path, stat_result, cache):
+    game_info = parse_acf_file(acf_path)
+    if cache is not None:
+        cache.put(acf_path, stat_result, game_info)
+    return _installed_game(lib_folder, game_info)
+
+def _installed_game(lib_folder, game_info):
+    if "appid" in game_info and "name" in game_info and "installdir" in game_info:
+        # lib_folder is the library's steamapps folder
+        game_info['full_install_path'] = os.path.join(lib_folder, 'common', game_info['installdir'])
+        return game_info
+    return None
+
+# AppState values parse_acf_file reads, and those a manifest must have
+MANIFEST_KEYS = frozenset(("appid", "name", "installdir", "buildid", "stateflags", "sizeondisk", "lastupdated"))
+REQUIRED_MANIFEST_KEYS = frozenset(("appid", "name", "installdir"))
+
 def parse_acf_file(acf_path):
+    """
+    Reads an appmanifest_<appid>.acf. Besides appid, name and installdir the
+    result carries the manifest's StateFlags, SizeOnDisk and LastUpdated (as
+    ints) and buildid, under their lowercased names.
+    """
     game_info = {}
     try:
-        with open(acf_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        # Simple regex to extract appid, name, and installdir
-        appid_match = re.search(r'"appid"\s+"(\d+)"', content)
-        name_match = re.search(r'"name"\s+"(.+?)"', content)
-        installdir_match = re.search(r'"installdir"\s+"(.+?)"', content)
-
-        if appid_match: game_info["appid"] = appid_match.group(1)
-        if name_match: game_info["name"] = name_match.group(1)
-        if installdir_match: game_info["installdir"] = installdir_match.group(1)
+        with open(acf_path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        fields = vdf_parser.read_values(text, "AppState", MANIFEST_KEYS)
+        if fields is None or not REQUIRED_MANIFEST_KEYS <= fields.keys():
+            # Not laid out the way Steam writes manifests; parse all of it
+            data = vdf_parser.loads(text)
+            app_state = next((value for key, value in data.items() if key.lower() == "appstate"), None)
+            if not isinstance(app_state, dict):
+                return game_info
+            fields = {key.lower(): value for key, value in app_state.items() if isinstance(value, str)}
+
+        for key in ("appid", "name", "installdir", "buildid"):
+            if fields.get(key):
+                game_info[key] = fields[key]
+        for key in ("stateflags", "sizeondisk", "lastupdated"):
+            if fields.get(key, "").isdigit():
+                game_info[key] = int(fields[key])
 
     except Exception as e:
         print(f"Error parsing ACF file {acf_path}: {e}")
     return game_info
 
 def get_steam_artwork_paths(steam_install_path, appid):
-    artwork_paths = {}
-    base_artwork_path = os.path.join(steam_install_path, "appcache", "librarycache", str(appid))
-
-    if os.path.exists(base_artwork_path):
-        # These are the specific filenames you provided
-        artwork_paths["hero"] = os.path.join(base_artwork_path, "library_hero.jpg")
-        artwork_paths["grid"] = os.path.join(base_artwork_path, "library_600x900.jpg")
-        artwork_paths["header"] = os.path.join(base_artwork_path, "library_header.jpg")
-        artwork_paths["logo"] = os.path.join(base_artwork_path, "logo.png")
-        # The icon path provided was a hash, which might be dynamic. Let's include it as an example.
-        artwork_paths["icon"] = os.path.join(base_artwork_path, "82afae56cfd88514886adb316b6d0f672dcbfaea.jpg")
-    
-    # Filter out paths that don't actually exist
-    return {k: v for k, v in artwork_paths.items() if os.path.exists(v)}
+    """
+    Returns {kind: path} of the hero, grid, header, logo and icon artwork
+    Steam has cached for appid, from the install's shared ArtworkIndex.
+    """
+    if not steam_install_path:
+        return {}
+    return shared_artwork_index(steam_install_path).get(appid)
 
 def get_steam_cloud_save_paths(userdata_path, appid):
     """
@@ -159,23 +254,40 @@ def get_steam_cloud_save_paths(userdata_path, appid):
         return cloud_save_path
     return None
 
+_workshop_inventories = {}
+_workshop_inventories_lock = threading.Lock()
+
+def get_workshop_inventory(steam_path):
+    """
+    The WorkshopInventory of all of a Steam install's library folders,
+    created on first use and shared afterwards. It is empty until
+    refreshed; refresh_if_stale picks up items Steam installed, updated
+    or removed since.
+    """
+    key = os.path.normcase(os.path.abspath(steam_path))
+    with _workshop_inventories_lock:
+        inventory = _workshop_inventories.get(key)
+        if inventory is None:
+            library_folders = get_steam_library_folders(steam_path)
+            # get_steam_library_folders falls back to the install itself without libraryfolders.vdf
+            default_steamapps_path = os.path.join(steam_path, "steamapps")
+            if default_steamapps_path not in library_folders:
+                library_folders.insert(0, default_steamapps_path)
+            inventory = _workshop_inventories[key] = WorkshopInventory(library_folders)
+        return inventory
+
 def get_steam_workshop_content_paths(steam_path, appid):
     """
-    Finds the local Steam Workshop content paths for a given app ID.
+    Finds the local Steam Workshop content paths for a given app ID, in
+    any library folder, from the shared workshop inventory, refreshing it
+    first if a workshop folder changed. UI code should refresh the
+    inventory on a worker and read content_paths instead.
     """
-    workshop_paths = []
     if not steam_path or not appid:
-        return workshop_paths
-
-    # The workshop content is typically in steam_path/steamapps/workshop/content/<appid>
-    workshop_content_base_path = os.path.join(steam_path, "steamapps", "workshop", "content", str(appid))
-
-    if os.path.exists(workshop_content_base_path) and os.path.isdir(workshop_content_base_path):
-        for item_id in os.listdir(workshop_content_base_path):
-            item_path = os.path.join(workshop_content_base_path, item_id)
-            if os.path.isdir(item_path):
-                workshop_paths.append(item_path)
-    return workshop_paths
+        return []
+    inventory = get_workshop_inventory(steam_path)
+    inventory.refresh_if_stale()
+    return inventory.content_paths(appid)
 
 def is_steam_running():
     """
@@ -187,68 +299,24 @@ def is_steam_game_running(game_executable_path):
     """
     Checks if a specific Steam game's executable is currently running.
     """
-    print(f"[DEBUG] is_steam_game_running: Checking for executable path: {game_executable_path}")
-    if not game_executable_path:
-        print("[DEBUG] is_steam_game_running: No executable path provided.")
-        return False
-    # Extract the executable name from the full path
-    executable_name = os.path.basename(game_executable_path)
-    print(f"[DEBUG] is_steam_game_running: Extracted executable name: {executable_name}")
-    return is_process_running(executable_name)
+    return current_snapshot().is_running(game_executable_path)
 
 def is_process_running(process_name):
     """
     Checks if a process with the given name is currently running.
     """
-    print(f"[DEBUG] is_process_running: Looking for process: {process_name}")
-    for process in psutil.process_iter(['name']):
-        current_process_name = process.info['name']
-        print(f"[DEBUG] is_process_running: Found process: {current_process_name}")
-        if current_process_name.lower() == process_name.lower():
-            print(f"[DEBUG] is_process_running: Match found for {process_name}")
-            return True
-    print(f"[DEBUG] is_process_running: No match found for {process_name}")
-    return False
+    return current_snapshot().has_name(process_name)
 
 
 def find_game_executable(game_install_path, game_name):
-    # Common executable names/patterns to look for
-    potential_executables = [
-        f"{game_name}.exe",
-        f"{game_name.replace(' ', '')}.exe", # Remove spaces
-        f"{game_name.replace(' ', '_')}.exe", # Replace spaces with underscores
-        f"{game_name.split(' ')[0]}.exe", # First word
-        "launcher.exe",
-        "game.exe",
-        "steam.exe" # Fallback, though unlikely to be the actual game
-    ]
-
-    # Common subdirectories to search
-    search_dirs = [
-        game_install_path,
-        os.path.join(game_install_path, "Binaries", "Win64"),
-        os.path.join(game_install_path, "Binaries", "Win32"),
-        os.path.join(game_install_path, "x64"),
-        os.path.join(game_install_path, "x86"),
-        os.path.join(game_install_path, "bin"),
-    ]
-
-    for directory in search_dirs:
-        if os.path.exists(directory):
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if file.lower().endswith(".exe"):
-                        # Check if the executable name is in our list of potentials
-                        for potential_name in potential_executables:
-                            if file.lower() == potential_name.lower():
-                                return os.path.join(root, file)
-                        
-                        # Heuristic: if the file name contains the game name, consider it
-                        if game_name.lower() in file.lower():
-                            return os.path.join(root, file)
-
-    # If no specific executable is found, return None
-    return None
+    """
+    Returns the most likely game executable in game_install_path, or None.
+    ExecutableFinder.find_for_games does the same for many games at once.
+    """
+    finder = shared_executable_finder()
+    candidates = finder.find(game_install_path, game_name)
+    finder.save() # only writes when the folder had to be scanned again
+    return candidates[0] if candidates else None
 
 def get_game_details_from_appinfo_vdf(steam_path, appids):
     """
@@ -262,12 +330,12 @@ def get_game_details_from_appinfo_vdf(steam_path, appids):
         return game_details
 
     try:
-        with open(appinfo_vdf_path, "rb") as f:
-            appinfo_data = vdf.binary_load(f)
-
-        for appid in appids:
-            if str(appid) in appinfo_data:
-                app_data = appinfo_data[str(appid)]
+        # Only the requested apps are decoded; see appinfo_reader.py
+        with AppInfoReader(appinfo_vdf_path) as appinfo_data:
+            for appid in appids:
+                app_data = appinfo_data.get(appid)
+                if app_data is None:
+                    continue
                 details = {
                     "type": app_data.get("common", {}).get("type"),
                     "developer": app_data.get("extended", {}).get("developer"),
@@ -341,65 +409,62 @@ def get_current_steam_user_id(steam_userdata_path):
             return entry
     return None
 
-def get_steam_friends_list(steam_api_key, steam_id):
+def get_steam_friends_list(steam_api_key, steam_id, client=None):
     """
     Fetches the friend list for a given SteamID using the Steam Web API.
-    Requires a valid Steam Web API key.
+    Requires a valid Steam Web API key. Goes through client, by default
+    the shared SteamApiClient.
     """
     if not steam_api_key or not steam_id:
         print("Steam API Key or SteamID is missing. Cannot fetch friends list.")
         return None
 
-    # Steam Web API endpoint for GetFriendList
-    url = f"http://api.steampowered.com/ISteamUser/GetFriendList/v1/?key={steam_api_key}&steamid={steam_id}&relationship=friend"
+    client = client or shared_steam_api_client()
+    params = {"key": steam_api_key, "steamid": steam_id, "relationship": "friend"}
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
-        data = response.json()
+        data = client.get("ISteamUser/GetFriendList/v1/", params=params)
 
         if "friendslist" in data and "friends" in data["friendslist"]:
             return data["friendslist"]["friends"]
         else:
             print(f"Unexpected response format for friends list: {data}")
             return None
-    except requests.exceptions.RequestException as e:
+    except SteamApiError as e:
         print(f"Error fetching Steam friends list: {e}")
         return None
-    except ValueError as e:
-        print(f"Error parsing JSON response for friends list: {e}")
-        return None
 
-def get_steam_player_summaries(steam_api_key, steam_ids):
+def get_steam_player_summaries(steam_api_key, steam_ids, client=None):
     """
     Fetches player summaries for a list of SteamIDs using the Steam Web API.
-    Requires a valid Steam Web API key.
+    Requires a valid Steam Web API key. Goes through client, by default
+    the shared SteamApiClient.
+
+    The endpoint takes at most 100 SteamIDs per call, so the unique ids
+    are fetched in chunks of 100 at the same time; players come back in
+    the order of steam_ids.
     """
     if not steam_api_key or not steam_ids:
         print("Steam API Key or SteamIDs are missing. Cannot fetch player summaries.")
         return None
 
-    # Steam Web API endpoint for GetPlayerSummaries
-    # steam_ids should be a comma-separated string of SteamIDs
-    steam_ids_str = ",".join(steam_ids)
-    url = f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v2/?key={steam_api_key}&steamids={steam_ids_str}"
+    client = client or shared_steam_api_client()
+    steam_ids, chunks = batch_ids(steam_ids)
+    # The endpoint takes the SteamIDs as one comma-separated string
+    calls = [("ISteamUser/GetPlayerSummaries/v2/", {"key": steam_api_key, "steamids": ",".join(chunk)}) for chunk in chunks]
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
-        data = response.json()
-
-        if "response" in data and "players" in data["response"]:
-            return data["response"]["players"]
-        else:
-            print(f"Unexpected response format for player summaries: {data}")
-            return None
-    except requests.exceptions.RequestException as e:
+        results = []
+        for data in client.get_many(calls):
+            if "response" in data and "players" in data["response"]:
+                results.append(data["response"]["players"])
+            else:
+                print(f"Unexpected response format for player summaries: {data}")
+                return None
+        return in_input_order(steam_ids, results, "steamid")
+    except SteamApiError as e:
         print(f"Error fetching Steam player summaries: {e}")
         return None
-    except ValueError as e:
-        print(f"Error parsing JSON response for player summaries: {e}")
-        return None
 
 def check_steamworks_sdk_installed(steam_path):
     """
@@ -1,117 +1,248 @@
-import requests
+from steam_api_client import SteamApiError, shared_steam_api_client, batch_ids, in_input_order
+
+QUERY_FILES_PATH = "IPublishedFileService/QueryFiles/v1/"
+GET_DETAILS_PATH = "IPublishedFileService/GetDetails/v1/"
+
+# What each view asks the API for and keeps from each item. "list" is the
+# search results table, "detail" a single item's page and "full" everything
+# the parser knows about. QueryFiles only sends the extra data (children,
+# previews, vote data, ...) whose return_* flag is set, and GetDetails the
+# data whose include* flag is set, so a smaller profile is a smaller response.
+# Every section a profile asks for has a field that reads it.
+PROJECTIONS = {
+    "list": {
+        "query_flags": ("return_short_description",),
+        "details_flags": ("short_description",),
+        "fields": ("title", "description", "publishedfileid", "creator", "preview_url"),
+    },
+    "detail": {
+        "query_flags": ("return_metadata", "return_tags", "return_kv_tags", "return_vote_data", "return_details"),
+        "details_flags": ("includetags", "includekvtags", "includevotes", "includemetadata"),
+        "fields": ("title", "description", "publishedfileid", "creator", "preview_url", "tags", "subscriptions",
+                   "favorited", "views", "kvtags", "vote_data"),
+    },
+    "full": {
+        "query_flags": ("return_metadata", "return_tags", "return_for_sale_data", "return_kv_tags", "return_children",
+                        "return_previews", "return_walkthrough", "return_vote_data", "return_playtime_stats",
+                        "return_details"),
+        "details_flags": ("includetags", "includeadditionalpreviews", "includechildren", "includekvtags",
+                          "includevotes", "includemetadata", "includeforsaleitems"),
+        "fields": ("title", "description", "publishedfileid", "creator", "preview_url", "tags", "subscriptions",
+                   "favorited", "views", "kvtags", "vote_data", "children", "previews", "walkthrough",
+                   "playtime_stats", "for_sale_data"),
+    },
+}
+# The profiles searches and detail lookups use unless told otherwise
+SEARCH_PROJECTION = "list"
+DETAILS_PROJECTION = "detail"
+
+def _description(item_data):
+    if "description" in item_data:
+        return item_data["description"]
+    return item_data.get("file_description", item_data.get("short_description", "N/A"))
+
+# How each field is read from an item of the API response
+FIELD_PARSERS = {
+    "title": lambda item_data: item_data.get("title", "N/A"),
+    "description": _description,
+    "publishedfileid": lambda item_data: item_data.get("publishedfileid", "N/A"),
+    "creator": lambda item_data: item_data.get("creator", "N/A"),
+    "preview_url": lambda item_data: item_data.get("preview_url", ""),
+    "tags": lambda item_data: [tag["tag"] for tag in item_data.get("tags", [])],
+    "subscriptions": lambda item_data: item_data.get("subscriptions", 0),
+    "favorited": lambda item_data: item_data.get("favorited", 0),
+    "views": lambda item_data: item_data.get("views", 0),
+    "kvtags": lambda item_data: item_data.get("kvtags", []),
+    "vote_data": lambda item_data: item_data.get("vote_data", {}),
+    "children": lambda item_data: [child["publishedfileid"] for child in item_data.get("children", [])],
+    "previews": lambda item_data: [preview["url"] for preview in item_data.get("previews", []) if preview.get("url")],
+    "walkthrough": lambda item_data: item_data.get("walkthrough", []),
+    "playtime_stats": lambda item_data: item_data.get("playtime_stats", {}),
+    "for_sale_data": lambda item_data: item_data.get("for_sale_data", {}),
+}
+
+def projection(profile):
+    try:
+        return PROJECTIONS[profile]
+    except KeyError:
+        raise ValueError(f"Unknown workshop projection: {profile}") from None
+
+def query_files_params(api_key, appid, search_text="", page=1, num_per_page=10, profile=SEARCH_PROJECTION):
+    params = {
+        "key": api_key,
+        "appid": appid,
+        "search_text": search_text,
+        "page": page,
+        "numperpage": num_per_page,
+        "querytype": 9,  # 9 for rankedByVote, 0 for rankedByPublicationDate
+    }
+    for flag in projection(profile)["query_flags"]:
+        params[flag] = 1
+    return params
+
+def get_details_params(api_key, publishedfileids, profile=DETAILS_PROJECTION):
+    params = {
+        "key": api_key,
+        "itemcount": len(publishedfileids)
+    }
+    for i, fileid in enumerate(publishedfileids):
+        params[f"publishedfileids[{i}]"] = fileid
+    for flag in projection(profile)["details_flags"]:
+        params[flag] = 1
+    return params
+
+def parse_workshop_item(item_data, profile):
+    """
+    Returns the fields of profile's projection read from item_data; the
+    rest of the item is never looked at.
+    """
+    return {field: FIELD_PARSERS[field](item_data) for field in projection(profile)["fields"]}
+
+def parse_workshop_items(data, profile):
+    """
+    Returns the parsed items of a QueryFiles or GetDetails response, or
+    None if the response does not have the expected format.
+    """
+    if "response" in data and "publishedfiledetails" in data["response"]:
+        parsers = [(field, FIELD_PARSERS[field]) for field in projection(profile)["fields"]]
+        return [{field: parser(item_data) for field, parser in parsers}
+                for item_data in data["response"]["publishedfiledetails"]]
+    return None
 
 class SteamWorkshopIntegrator:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, client=None):
         self.api_key = api_key
-        self.base_url = "https://api.steampowered.com/IPublishedFileService/"
+        self.client = client or shared_steam_api_client()
 
-    def search_workshop_items(self, appid, search_text="", page=1, num_per_page=10):
+    def search_workshop_items(self, appid, search_text="", page=1, num_per_page=10, profile=SEARCH_PROJECTION):
         """
-        Searches Steam Workshop items using the Steam Web API.
+        Searches Steam Workshop items using the Steam Web API. profile names
+        the projection (see PROJECTIONS) to request and parse.
         """
         if not self.api_key:
             print("Steam Web API Key not provided. Cannot search workshop items.")
             return {"items": [], "total_results": 0}
 
-        endpoint = "QueryFiles/v1/"
-        url = f"{self.base_url}{endpoint}"
-
-        params = {
-            "key": self.api_key,
-            "appid": appid,
-            "search_text": search_text,
-            "page": page,
-            "numperpage": num_per_page,
-            "querytype": 9,  # 9 for rankedByVote, 0 for rankedByPublicationDate
-            "return_metadata": 1,
-            "return_tags": 1,
-            "return_for_sharing": 1,
-            "return_kv_tags": 1,
-            "return_children": 1,
-            "return_previews": 1,
-            "return_walkthrough": 1,
-            "return_vote_data": 1,
-            "return_playtime_stats": 1,
-            "return_details": 1,
-        }
+        params = query_files_params(self.api_key, appid, search_text, page, num_per_page, profile)
 
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if "response" in data and "publishedfiledetails" in data["response"]:
-                items = []
-                for item_data in data["response"]["publishedfiledetails"]:
-                    items.append({
-                        "title": item_data.get("title", "N/A"),
-                        "description": item_data.get("description", "N/A"),
-                        "publishedfileid": item_data.get("publishedfileid", "N/A"),
-                        "creator": item_data.get("creator", "N/A"),
-                        "preview_url": item_data.get("preview_url", ""),
-                        "tags": [tag["tag"] for tag in item_data.get("tags", [])],
-                        "subscriptions": item_data.get("subscriptions", 0),
-                        "favorited": item_data.get("favorited", 0),
-                        "views": item_data.get("views", 0),
-                        "kvtags": item_data.get("kvtags", [])
-                    })
-                total_results = data["response"].get("totalcount", 0)
-                return {"items": items, "total_results": total_results}
-            else:
-                print(f"Unexpected response format for workshop search: {data}")
-                return {"items": [], "total_results": 0}
-        except requests.exceptions.RequestException as e:
+            data = self.client.get(QUERY_FILES_PATH, params=params)
+        except SteamApiError as e:
             print(f"Error searching Steam Workshop: {e}")
             return {"items": [], "total_results": 0}
-        except ValueError as e:
-            print(f"Error parsing JSON response for workshop search: {e}")
+
+        items = parse_workshop_items(data, profile)
+        if items is None:
+            print(f"Unexpected response format for workshop search: {data}")
             return {"items": [], "total_results": 0}
+        total_results = data["response"].get("totalcount", 0)
+        return {"items": items, "total_results": total_results}
 
-    def get_workshop_item_details(self, publishedfileids):
+    def get_workshop_item_details(self, publishedfileids, profile=DETAILS_PROJECTION):
         """
-        Gets details of Steam Workshop items using the Steam Web API.
+        Gets details of Steam Workshop items using the Steam Web API. The
+        unique ids are fetched in chunks of up to 100 at the same time;
+        items come back in the order of publishedfileids.
         """
         if not self.api_key:
             print("Steam Web API Key not provided. Cannot get workshop item details.")
             return {"items": []}
 
-        endpoint = "GetDetails/v1/"
-        url = f"{self.base_url}{endpoint}"
-
-        params = {
-            "key": self.api_key,
-            "itemcount": len(publishedfileids)
-        }
-        for i, fileid in enumerate(publishedfileids):
-            params[f"publishedfileids[{i}]"] = fileid
+        publishedfileids, chunks = batch_ids(publishedfileids)
+        calls = [(GET_DETAILS_PATH, get_details_params(self.api_key, chunk, profile)) for chunk in chunks]
 
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if "response" in data and "publishedfiledetails" in data["response"]:
-                items = []
-                for item_data in data["response"]["publishedfiledetails"]:
-                    items.append({
-                        "title": item_data.get("title", "N/A"),
-                        "description": item_data.get("description", "N/A"),
-                        "publishedfileid": item_data.get("publishedfileid", "N/A"),
-                        "creator": item_data.get("creator", "N/A"),
-                        "preview_url": item_data.get("preview_url", ""),
-                        "tags": [tag["tag"] for tag in item_data.get("tags", [])],
-                        "subscriptions": item_data.get("subscriptions", 0),
-                        "favorited": item_data.get("favorited", 0),
-                        "views": item_data.get("views", 0),
-                        "kvtags": item_data.get("kvtags", [])
-                    })
-                return {"items": items}
-            else:
-                print(f"Unexpected response format for workshop item details: {data}")
-                return {"items": []}
-        except requests.exceptions.RequestException as e:
+            responses = self.client.get_many(calls)
+        except SteamApiError as e:
             print(f"Error getting Steam Workshop item details: {e}")
             return {"items": []}
-        except ValueError as e:
-            print(f"Error parsing JSON response for workshop item details: {e}")
-            return {"items": []}
+
+        results = []
+        for data in responses:
+            items = parse_workshop_items(data, profile)
+            if items is None:
+                print(f"Unexpected response format for workshop item details: {data}")
+                return {"items": []}
+            results.append(items)
+        return {"items": in_input_order(publishedfileids, results, "publishedfileid")}
+
+if __name__ == "__main__":
+    # Benchmark: payload size and decode + parse time of a 100-item
+    # QueryFiles page under each projection. The fixture responses are
+    # synthesized in the shape of real ones: the base fields every item has,
+    # plus the sections each return_* flag adds.
+    import json
+    import random
+    import time
+
+    rng = random.Random(1)
+    words = ["hat", "map", "sword", "skin", "crate", "texture", "sound", "mod", "pack", "arena", "red", "blue"]
+
+    def sentence(count):
+        return " ".join(rng.choice(words) for _ in range(count))
+
+    def fixture_item(number, flags):
+        item = {
+            "result": 1, "publishedfileid": str(100000000 + number), "creator": str(76561190000000000 + number),
+            "creator_appid": 440, "consumer_appid": 440, "consumer_shortcutid": 0, "filename": f"item{number}.zip",
+            "file_size": str(rng.randrange(10 ** 8)), "preview_file_size": str(rng.randrange(10 ** 6)),
+            "preview_url": f"https://steamuserimages-a.akamaihd.net/ugc/{rng.randrange(10 ** 18)}/{rng.randrange(16 ** 40):040X}/",
+            "url": "", "hcontent_file": str(rng.randrange(10 ** 19)), "hcontent_preview": str(rng.randrange(10 ** 19)),
+            "title": sentence(4), "time_created": 1500000000 + number, "time_updated": 1600000000 + number,
+            "visibility": 0, "flags": 1536, "workshop_file": False, "workshop_accepted": True,
+            "show_subscribe_all": False, "num_comments_public": rng.randrange(500), "banned": False,
+            "ban_reason": "", "banner": "76561197960265728", "can_be_deleted": True, "app_name": "Team Fortress 2",
+            "file_type": 0, "can_subscribe": True, "subscriptions": rng.randrange(10 ** 6),
+            "favorited": rng.randrange(10 ** 5), "followers": 0, "lifetime_subscriptions": rng.randrange(10 ** 6),
+            "lifetime_favorited": rng.randrange(10 ** 5), "lifetime_followers": 0,
+            "lifetime_playtime": str(rng.randrange(10 ** 9)), "lifetime_playtime_sessions": str(rng.randrange(10 ** 6)),
+            "views": rng.randrange(10 ** 7), "num_children": 4, "num_reports": 0, "language": 0,
+            "maybe_inappropriate_sex": False, "maybe_inappropriate_violence": False,
+            "revision_change_number": "12", "revision": 1, "available_revisions": [1],
+            "ban_text_check_result": 5,
+        }
+        if "return_short_description" in flags:
+            item["short_description"] = sentence(30)
+        if "return_details" in flags:
+            item["file_description"] = sentence(250)
+        if "return_metadata" in flags:
+            item["metadata"] = json.dumps({"version": "1.2", "authors": [sentence(2) for _ in range(3)]})
+        if "return_tags" in flags:
+            item["tags"] = [{"tag": tag, "display_name": tag.title()} for tag in rng.sample(words, 4)]
+        if "return_kv_tags" in flags:
+            item["kvtags"] = [{"key": f"key{index}", "value": sentence(2)} for index in range(3)]
+        if "return_children" in flags:
+            item["children"] = [{"publishedfileid": str(rng.randrange(10 ** 9)), "sortorder": index, "file_type": 0}
+                                for index in range(4)]
+        if "return_previews" in flags:
+            item["previews"] = [{"previewid": str(rng.randrange(10 ** 9)), "sortorder": index,
+                                 "url": f"https://steamuserimages-a.akamaihd.net/ugc/{rng.randrange(10 ** 18)}/",
+                                 "size": rng.randrange(10 ** 6), "filename": f"preview{index}.jpg", "preview_type": 0}
+                                for index in range(6)]
+        if "return_walkthrough" in flags:
+            item["walkthrough"] = [{"step": index, "text": sentence(20)} for index in range(3)]
+        if "return_vote_data" in flags:
+            item["vote_data"] = {"score": rng.random(), "votes_up": rng.randrange(10 ** 5), "votes_down": rng.randrange(10 ** 4)}
+        if "return_playtime_stats" in flags:
+            item["playtime_stats"] = {"playtime_seconds": str(rng.randrange(10 ** 9)), "num_sessions": str(rng.randrange(10 ** 6))}
+        if "return_for_sale_data" in flags:
+            item["for_sale_data"] = {"is_for_sale": False, "price_category": 0, "estatus": 0, "price_category_floor": 0,
+                                     "price_is_pay_what_you_want": False, "discount_percentage": 0}
+        return item
+
+    rounds = 200
+    results = {}
+    for profile, spec in PROJECTIONS.items():
+        payload = json.dumps({"response": {"total": 5000, "publishedfiledetails":
+                                           [fixture_item(number, spec["query_flags"]) for number in range(100)]}}).encode()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            items = parse_workshop_items(json.loads(payload), profile)
+        elapsed = (time.perf_counter() - started) / rounds
+        results[profile] = (len(payload), elapsed)
+
+    full_size, full_time = results["full"]
+    print("100-item QueryFiles page (synthesized fixtures):")
+    for profile, (size, elapsed) in results.items():
+        print(f"  {profile:>6}: {size / 1024:7.1f} KiB ({size / full_size:4.0%} of full), "
+              f"decode + parse {elapsed * 1000:.2f} ms ({elapsed / full_time:4.0%} of full)")
@@ -0,0 +1,48 @@
+import os
+import pytest
+from appinfo_reader import AppInfoReader, MAGIC_V27, MAGIC_V28, MAGIC_V29, write_appinfo
+
+def app(appid):
+    return {
+        "appid": appid,
+        "common": {"name": f"Game {appid}", "type": "Game", "associations": {"0": {"type": "developer", "name": "Studio"}}},
+        "config": {"installdir": f"Game {appid}", "launch": {"0": {"executable": "bin/game.exe"}}},
+    }
+
+APPS = {appid: app(appid) for appid in (730, 10, 570)}
+
+@pytest.mark.parametrize("magic", [MAGIC_V27, MAGIC_V28, MAGIC_V29])
+def test_every_version_round_trips(tmp_path, magic):
+    path = str(tmp_path / "appinfo.vdf")
+    write_appinfo(path, APPS, magic)
+    with AppInfoReader(path, str(tmp_path / "index.bin")) as reader:
+        assert reader.app_ids() == [10, 570, 730]
+        assert len(reader) == 3 and 570 in reader and 1 not in reader
+        assert all(reader.get(appid) == data for appid, data in APPS.items())
+        assert reader.get(1) is None
+
+def test_saved_index_is_reused_until_the_file_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "appinfo.vdf")
+    index_file = str(tmp_path / "index.bin")
+    write_appinfo(path, APPS)
+    AppInfoReader(path, index_file).close()
+    assert os.path.exists(index_file)
+
+    builds = []
+    build_index = AppInfoReader._build_index
+    monkeypatch.setattr(AppInfoReader, "_build_index", lambda reader: builds.append(1) or build_index(reader))
+    with AppInfoReader(path, index_file) as reader:
+        assert reader.get(730) == APPS[730]
+    assert builds == []
+
+    write_appinfo(path, {**APPS, 440: app(440)})
+    with AppInfoReader(path, index_file) as reader:
+        assert reader.app_ids() == [10, 440, 570, 730]
+        assert reader.get(440) == app(440)
+    assert builds == [1]
+
+def test_unreadable_file_raises_value_error(tmp_path):
+    path = tmp_path / "appinfo.vdf"
+    path.write_bytes(b"not an appinfo file")
+    with pytest.raises(ValueError):
+        AppInfoReader(str(path), str(tmp_path / "index.bin"))
@@ -0,0 +1,46 @@
+import os
+import time
+from artwork_index import ArtworkIndex
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+def test_refresh_picks_up_artwork_added_in_a_subfolder(tmp_path):
+    librarycache = str(tmp_path / "librarycache")
+    touch(os.path.join(librarycache, "620", "library_hero.jpg"))
+    os.makedirs(os.path.join(librarycache, "620", "english"))
+    index = ArtworkIndex(librarycache)
+    assert index.refresh() == 1
+    assert set(index.get(620)) == {"hero"}
+
+    app_folder = os.path.join(librarycache, "620")
+    app_mtime_ns = os.stat(app_folder).st_mtime_ns
+    time.sleep(0.01)
+    touch(os.path.join(app_folder, "english", "logo.png"))
+    assert os.stat(app_folder).st_mtime_ns == app_mtime_ns # only the subfolder changed
+    assert index.refresh() == 1
+    assert index.get(620)["logo"] == os.path.join(app_folder, "english", "logo.png")
+    assert index.refresh() == 0
+
+def test_index_finds_each_kind_of_artwork(tmp_path):
+    librarycache = str(tmp_path / "librarycache")
+    for name in ("library_hero.jpg", "library_600x900.jpg", "header.jpg", "logo.png", f"{10:040x}.jpg"):
+        touch(os.path.join(librarycache, "10", name))
+    touch(os.path.join(librarycache, "5_library_hero.jpg")) # old flat layout
+    index = ArtworkIndex(librarycache)
+    index.refresh()
+    assert set(index.get(10)) == {"hero", "grid", "header", "logo", "icon"}
+    assert index.get(10)["icon"].endswith(f"{10:040x}.jpg")
+    assert index.get(5) == {"hero": os.path.join(librarycache, "5_library_hero.jpg")}
+
+def test_refresh_rescans_only_changed_folders(tmp_path):
+    librarycache = str(tmp_path / "librarycache")
+    for appid in (10, 20, 30):
+        touch(os.path.join(librarycache, str(appid), "header.jpg"))
+    index = ArtworkIndex(librarycache)
+    assert index.refresh() == 3
+    time.sleep(0.01)
+    touch(os.path.join(librarycache, "20", "library_hero.jpg"))
+    assert index.refresh() == 1
+    assert set(index.get(20)) == {"header", "hero"}
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from urllib.parse import parse_qsl
+import httpx
+from async_steam_api import AsyncRunner, AsyncSteamApi, AsyncSteamApiClient
+from response_cache import ResponseCache
+
+QUERY_FILES = "IPublishedFileService/QueryFiles/v1/"
+
+def run_with_stand_in(cache, stale_while_revalidate, calls):
+    """
+    Runs calls(client) against a stand-in API that answers every request
+    with how many it has answered so far. Returns (result, requests made).
+    """
+    answered = []
+
+    def handler(request):
+        answered.append(request.url.path)
+        return httpx.Response(200, json={"response": {"answer": len(answered)}})
+
+    async def main():
+        client = AsyncSteamApiClient(base_url="http://stand-in", cache=cache, stale_while_revalidate=stale_while_revalidate)
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._semaphore = asyncio.Semaphore(client.max_concurrency)
+        try:
+            return await calls(client)
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), answered
+
+def expire_everything(cache):
+    cache.connection.execute("UPDATE responses SET expires_at = ?", (time.time() - 1,))
+
+def test_stale_response_is_returned_at_once_and_revalidated(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    cache.store(QUERY_FILES, {"page": 1}, {"response": {"answer": 0}})
+    expire_everything(cache)
+
+    async def calls(client):
+        stale = await client.get(QUERY_FILES, {"page": 1})
+        await asyncio.gather(*client._revalidating.values())
+        return stale, await client.get(QUERY_FILES, {"page": 1})
+
+    (stale, revalidated), answered = run_with_stand_in(cache, {QUERY_FILES}, calls)
+    assert stale["response"]["answer"] == 0
+    assert revalidated["response"]["answer"] == 1
+    assert len(answered) == 1
+    cache.close()
+
+def test_endpoints_without_stale_while_revalidate_wait_for_the_api(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    path = "ISteamUser/GetFriendList/v1/"
+    cache.store(path, {"steamid": "1"}, {"response": {"answer": 0}})
+    expire_everything(cache)
+
+    async def calls(client):
+        return await client.get(path, {"steamid": "1"})
+
+    data, answered = run_with_stand_in(cache, {QUERY_FILES}, calls)
+    assert data["response"]["answer"] == 1 and len(answered) == 1
+    cache.close()
+
+def run_api(calls):
+    """
+    Runs calls(api) against a stand-in API that returns ten workshop items
+    per search page and player summaries in reverse order. Returns
+    (result, {path: [params of each request]}).
+    """
+    requests = {}
+
+    async def handler(request):
+        params = dict(parse_qsl(request.url.query.decode()))
+        requests.setdefault(request.url.path, []).append(params)
+        await asyncio.sleep(0.05)
+        if request.url.path.endswith("GetPlayerSummaries/v2/"):
+            steam_ids = params["steamids"].split(",")
+            return httpx.Response(200, json={"response": {"players": [{"steamid": steam_id}
+                                                                      for steam_id in reversed(steam_ids)]}})
+        page = int(params.get("page", 1))
+        return httpx.Response(200, json={"response": {"totalcount": 50, "publishedfiledetails": [
+            {"publishedfileid": str(page * 100 + number), "title": f"page {page} item {number}"} for number in range(10)]}})
+
+    async def main():
+        client = AsyncSteamApiClient(base_url="http://stand-in", rate=1000, burst=100)
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._semaphore = asyncio.Semaphore(client.max_concurrency)
+        try:
+            return await calls(AsyncSteamApi("key", client))
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), requests
+
+def test_search_pages_come_back_in_page_order():
+    result, requests = run_api(lambda api: api.search_workshop_pages(440, "hat", pages=5))
+    titles = [item["title"] for item in result["items"]]
+    assert len(titles) == 50 and titles[0] == "page 1 item 0" and titles[-1] == "page 5 item 9"
+    assert result["total_results"] == 50
+    assert len(requests["/IPublishedFileService/QueryFiles/v1/"]) == 5
+
+def test_player_summaries_are_batched_deduplicated_and_in_order():
+    friend_ids = [str(76561190000000000 + number) for number in range(250)]
+    players, requests = run_api(lambda api: api.get_player_summaries(friend_ids + friend_ids[:50]))
+    assert [player["steamid"] for player in players] == friend_ids
+    calls = requests["/ISteamUser/GetPlayerSummaries/v2/"]
+    assert len(calls) == 3 and all(len(call["steamids"].split(",")) <= 100 for call in calls)
+
+def test_identical_searches_in_flight_share_one_request():
+    async def calls(api):
+        return await asyncio.gather(api.search_workshop_items(440, "hat"), api.search_workshop_items(440, "hat"))
+
+    (first, second), requests = run_api(calls)
+    assert first == second and first is not second
+    assert len(requests["/IPublishedFileService/QueryFiles/v1/"]) == 1
+
+def test_runner_delivers_results_through_the_callback():
+    runner = AsyncRunner()
+    delivered = threading.Event()
+    outcome = {}
+
+    async def answer():
+        await asyncio.sleep(0.05)
+        return 42
+
+    def on_done(result, error):
+        outcome.update(result=result, error=error)
+        delivered.set()
+
+    try:
+        runner.submit(answer(), on_done)
+        assert delivered.wait(5)
+        assert outcome == {"result": 42, "error": None}
+    finally:
+        runner.stop()
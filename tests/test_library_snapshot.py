@@ -0,0 +1,41 @@
+import json
+from game_record import Game, _synthetic_game_dicts
+from library_schema import read_library, library_document
+from library_snapshot import LibrarySnapshot, write_snapshot
+
+def library(count):
+    # Through games.json and Game, as GameManager would save it
+    document = json.loads(json.dumps(library_document(list(_synthetic_game_dicts(count)))))
+    return [Game.from_dict(game).to_dict() for game in read_library(document)[0]]
+
+def test_round_trip(tmp_path):
+    games = library(2000)
+    path = str(tmp_path / "games.snapshot")
+    write_snapshot(path, games)
+    with LibrarySnapshot(path) as snapshot:
+        assert len(snapshot) == len(games)
+        assert [game.to_dict() for game in snapshot] == games
+        assert snapshot[len(games) - 1].to_dict() == games[-1]
+
+def test_lookup_by_id(tmp_path):
+    games = library(500)
+    path = str(tmp_path / "games.snapshot")
+    write_snapshot(path, games)
+    with LibrarySnapshot(path) as snapshot:
+        for game in games[::7]:
+            assert snapshot.get(game["id"]).to_dict() == game
+        assert snapshot.get("no such id") is None
+
+def test_unknown_keys_and_unicode_survive(tmp_path):
+    game = Game.from_dict({"id": "a" * 32, "title": "Ōkami HD ✓", "platform": "PC", "genre": "Action",
+                           "iso_paths": ["D:/ōkami.iso"], "artwork": {"hero": "h.jpg"}, "rating": "5"}).to_dict()
+    path = str(tmp_path / "games.snapshot")
+    write_snapshot(path, [game])
+    with LibrarySnapshot(path) as snapshot:
+        assert snapshot.get(game["id"]).to_dict() == game
+
+def test_empty_library(tmp_path):
+    path = str(tmp_path / "games.snapshot")
+    write_snapshot(path, [])
+    with LibrarySnapshot(path) as snapshot:
+        assert len(snapshot) == 0 and list(snapshot) == []
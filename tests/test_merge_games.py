@@ -0,0 +1,64 @@
+import os
+import pytest
+from game_manager import GameManager
+from game_record import EXECUTABLE_NOT_FOUND, changed_fields
+from sqlite_game_manager import SQLiteGameManager
+
+def steam_record(**fields):
+    record = {
+        "title": "Portal 2",
+        "platform": "PC (Steam)",
+        "genre": "Puzzle",
+        "executable_path": "",
+        "launch_arguments": "steam://rungameid/620",
+        "artwork": {"hero": "hero.jpg"},
+        "steam_app_id": "620",
+        "workshop_content_paths": [],
+        "developer": "Valve",
+    }
+    record.update(fields)
+    return record
+
+@pytest.fixture(params=["json", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "json":
+        game_manager = GameManager(autoload=False)
+        game_manager.games_file = str(tmp_path / "games.json")
+        yield game_manager
+        game_manager.close()
+    else:
+        game_manager = SQLiteGameManager(str(tmp_path / "games.db"))
+        yield game_manager
+        game_manager.close()
+
+def test_reimport_keeps_edited_fields(manager):
+    game_id = manager.merge_games([steam_record()])["added"][0]
+    game = dict(manager.get_game(game_id))
+    manager.edit_game(game_id, "Portal 2 (co-op)", game["platform"], "Co-op", "C:/Games/portal2.exe",
+                      game["launch_arguments"], [], game["artwork"], "", game["steam_app_id"], [],
+                      game["developer"], "", "", "", "", "")
+
+    report = manager.merge_games([steam_record(artwork={"hero": "new_hero.jpg"}, workshop_content_paths=["C:/w/1"],
+                                               publisher="Valve")])
+
+    assert report["updated"] == [game_id]
+    game = manager.get_game(game_id)
+    assert game["title"] == "Portal 2 (co-op)"
+    assert game["genre"] == "Co-op"
+    assert game["executable_path"] == "C:/Games/portal2.exe"
+    # Empty fields are filled and the fields the import owns are refreshed
+    assert game["publisher"] == "Valve"
+    assert dict(game["artwork"]) == {"hero": "new_hero.jpg"}
+    assert list(game["workshop_content_paths"]) == ["C:/w/1"]
+
+def test_reimport_never_writes_the_not_found_placeholder(manager):
+    game_id = manager.merge_games([steam_record(executable_path="C:/Games/portal2.exe")])["added"][0]
+    manager.merge_games([steam_record(executable_path=EXECUTABLE_NOT_FOUND)])
+    assert manager.get_game(game_id)["executable_path"] == "C:/Games/portal2.exe"
+
+def test_changed_fields_fills_empty_fields_only():
+    existing = {"title": "Edited", "genre": "", "executable_path": EXECUTABLE_NOT_FOUND, "artwork": {}}
+    record = {"title": "Original", "genre": "Action", "executable_path": os.path.join("C:", "game.exe"),
+              "artwork": {"logo": "logo.png"}}
+    assert changed_fields(existing, record) == {"genre": "Action", "executable_path": record["executable_path"],
+                                                "artwork": {"logo": "logo.png"}}
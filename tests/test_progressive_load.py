@@ -0,0 +1,51 @@
+import json
+import pytest
+from game_manager import GameManager
+from library_schema import SCHEMA_VERSION
+
+def write_library(path, count):
+    games = [{"id": f"{number:032x}", "title": f"Game {number}", "platform": "PC", "genre": "Action"}
+             for number in range(count)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"schema_version": SCHEMA_VERSION, "games": games}, f)
+
+@pytest.fixture
+def manager(tmp_path):
+    game_manager = GameManager(autoload=False)
+    game_manager.games_file = str(tmp_path / "games.json")
+    yield game_manager
+    game_manager.close()
+
+def test_abandoned_load_reads_the_rest_and_saves_again(manager):
+    write_library(manager.games_file, 50)
+    batches = manager.load_games_progressively(batch_size=10)
+    assert len(next(batches)) == 10
+    batches.close()
+    assert len(manager.get_all_games()) == 50
+
+    manager.add_game("New", "PC", "Puzzle")
+    manager.save_games()
+    manager.flush()
+    with open(manager.games_file, encoding="utf-8") as f:
+        assert len(json.load(f)["games"]) == 51
+
+def test_failed_load_disables_saving_instead_of_dropping_writes(manager):
+    write_library(manager.games_file, 50)
+    with open(manager.games_file, "r+", encoding="utf-8") as f:
+        text = f.read()
+        f.seek(0)
+        f.write(text[:len(text) // 2])
+        f.truncate()
+    with open(manager.games_file, "rb") as f:
+        damaged = f.read()
+
+    with pytest.raises(ValueError):
+        for _ in manager.load_games_progressively(batch_size=10):
+            pass
+    assert manager.load_error is not None
+
+    manager.add_game("New", "PC", "Puzzle")
+    manager.save_games()
+    manager.flush()
+    with open(manager.games_file, "rb") as f:
+        assert f.read() == damaged
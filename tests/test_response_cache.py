@@ -0,0 +1,104 @@
+import time
+import pytest
+import requests
+from response_cache import ResponseCache
+from steam_api_client import SteamApiClient
+
+QUERY_FILES = "IPublishedFileService/QueryFiles/v1/"
+SUMMARIES = "ISteamUser/GetPlayerSummaries/v2/"
+
+class StandInResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+class StandInSession:
+    """
+    Answers with an ETag per path, 304 when the request sends it back, or
+    fails every request once offline is set.
+    """
+    def __init__(self):
+        self.offline = False
+        self.answers = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        if self.offline:
+            raise requests.exceptions.ConnectionError("offline")
+        etag = f'"{url}"'
+        if headers.get("If-None-Match") == etag:
+            self.answers.append(304)
+            return StandInResponse(304)
+        self.answers.append(200)
+        return StandInResponse(200, {"response": {"page": params.get("page"), "answer": len(self.answers)}},
+                               {"ETag": etag})
+
+@pytest.fixture
+def cache(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=10 * 1024)
+    yield response_cache
+    response_cache.close()
+
+def client_for(cache, **options):
+    client = SteamApiClient(base_url="http://stand-in", cache=cache, max_retries=0, rate=1000, burst=100, **options)
+    client.session = StandInSession()
+    return client
+
+def expire(cache, seconds_ago=1):
+    cache.connection.execute("UPDATE responses SET expires_at = ?", (time.time() - seconds_ago,))
+
+def test_key_and_parameter_order_share_an_entry(cache):
+    cache.store(QUERY_FILES, {"appid": 440, "page": 1, "key": "secret"}, {"response": {}})
+    cached = cache.lookup(QUERY_FILES, {"key": "other", "page": 1, "appid": 440})
+    assert cached is not None and cached.fresh and cached.data() == {"response": {}}
+    assert cache.lookup(QUERY_FILES, {"appid": 440, "page": 2}) is None
+
+def test_fresh_responses_are_served_from_the_cache(cache):
+    client = client_for(cache)
+    first = client.get(QUERY_FILES, {"page": 1})
+    assert client.get(QUERY_FILES, {"page": 1}) == first
+    assert client.session.answers == [200]
+
+def test_stale_responses_are_revalidated_with_a_conditional_request(cache):
+    client = client_for(cache)
+    first = client.get(QUERY_FILES, {"page": 1})
+    expire(cache)
+    assert client.get(QUERY_FILES, {"page": 1}) == first
+    assert client.session.answers == [200, 304]
+    assert cache.lookup(QUERY_FILES, {"page": 1}).fresh
+
+def test_stale_response_is_served_when_the_api_cannot_be_reached(cache):
+    client = client_for(cache)
+    first = client.get(QUERY_FILES, {"page": 1})
+    expire(cache)
+    client.session.offline = True
+    assert client.get(QUERY_FILES, {"page": 1}) == first
+
+def test_stale_while_revalidate_returns_the_stale_response_at_once(cache):
+    client = client_for(cache, stale_while_revalidate={QUERY_FILES})
+    first = client.get(QUERY_FILES, {"page": 1})
+    expire(cache)
+    client.session.offline = True
+    assert client.get(QUERY_FILES, {"page": 1}) == first
+
+def test_least_recently_used_entries_are_evicted(cache):
+    padding = "x" * 2000
+    for page in range(1, 5):
+        cache.store(QUERY_FILES, {"page": page}, {"padding": padding})
+    cache.lookup(QUERY_FILES, {"page": 1})
+    for page in range(5, 8):
+        cache.store(QUERY_FILES, {"page": page}, {"padding": padding})
+    assert cache.size() <= 10 * 1024
+    assert cache.lookup(QUERY_FILES, {"page": 1}) is not None
+    assert cache.lookup(QUERY_FILES, {"page": 2}) is None
+    assert cache.lookup(QUERY_FILES, {"page": 7}) is not None
+
+def test_player_summaries_are_dropped_soon_after_their_ttl(cache):
+    cache.store(SUMMARIES, {"steamids": "1"}, {"response": {"players": []}})
+    cache.store(QUERY_FILES, {"page": 1}, {"response": {}})
+    expire(cache, seconds_ago=10 * 60)
+    assert cache.lookup(SUMMARIES, {"steamids": "1"}) is None
+    assert cache.lookup(QUERY_FILES, {"page": 1}) is not None
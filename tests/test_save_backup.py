@@ -0,0 +1,74 @@
+import os
+import threading
+from save_backup import SaveBackupStore
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_snapshot_restore_round_trip(tmp_path):
+    saves = str(tmp_path / "saves")
+    write(os.path.join(saves, "slot1.sav"), b"first" * 1000)
+    write(os.path.join(saves, "profiles", "player.cfg"), b"name=player")
+    store = SaveBackupStore(str(tmp_path / "store"), chunk_size=1024)
+    store.snapshot("game", saves)
+
+    restored = str(tmp_path / "restored")
+    assert store.restore("game", 1, restored) == 2
+    with open(os.path.join(restored, "slot1.sav"), "rb") as f:
+        assert f.read() == b"first" * 1000
+    assert store.restore("game", 1, restored) == 0 # already up to date
+
+def test_unchanged_files_are_not_hashed_again(tmp_path):
+    saves = str(tmp_path / "saves")
+    write(os.path.join(saves, "world.dat"), b"world" * 1000)
+    write(os.path.join(saves, "slot1.sav"), b"slot" * 1000)
+    store = SaveBackupStore(str(tmp_path / "store"), chunk_size=1024)
+    store.snapshot("game", saves)
+    assert store.snapshot("game", saves)["stats"]["files_hashed"] == 0
+
+    write(os.path.join(saves, "slot1.sav"), b"slot" * 999 + b"SLOT")
+    os.utime(os.path.join(saves, "slot1.sav"), ns=(10 ** 18, 10 ** 18)) # same size, so make the change visible
+    stats = store.snapshot("game", saves)["stats"]
+    assert stats["files_hashed"] == 1
+    assert stats["new_chunks"] == 1 # only the last chunk of the slot changed
+
+def test_each_snapshot_restores_its_own_contents(tmp_path):
+    saves = str(tmp_path / "saves")
+    store = SaveBackupStore(str(tmp_path / "store"), chunk_size=1024)
+    for number, revision in enumerate((b"one", b"two", b"three")):
+        write(os.path.join(saves, "world.dat"), revision * 1000)
+        os.utime(os.path.join(saves, "world.dat"), ns=(number * 10 ** 9, number * 10 ** 9))
+        store.snapshot("game", saves)
+
+    restored = str(tmp_path / "restored")
+    for snapshot_id, revision in ((1, b"one"), (3, b"three"), (2, b"two")):
+        store.restore("game", snapshot_id, restored)
+        with open(os.path.join(restored, "world.dat"), "rb") as f:
+            assert f.read() == revision * 1000
+
+def test_prune_waits_for_a_restore_in_progress(tmp_path):
+    saves = str(tmp_path / "saves")
+    write(os.path.join(saves, "slot1.sav"), b"old" * 1000)
+    store = SaveBackupStore(str(tmp_path / "store"), chunk_size=1024)
+    store.snapshot("game", saves)
+    write(os.path.join(saves, "slot1.sav"), b"new" * 1000)
+    store.snapshot("game", saves)
+
+    # Pruning to the newest snapshot deletes the chunks of the one being restored
+    read_chunk = store._read_chunk
+    pruner = threading.Thread(target=store.prune, args=("game", 1))
+    def read_chunk_while_pruning(digest):
+        if not pruner.is_alive() and pruner.ident is None:
+            pruner.start()
+            pruner.join(0.2)
+        return read_chunk(digest)
+    store._read_chunk = read_chunk_while_pruning
+
+    restored = str(tmp_path / "restored")
+    store.restore("game", 1, restored)
+    pruner.join()
+    with open(os.path.join(restored, "slot1.sav"), "rb") as f:
+        assert f.read() == b"old" * 1000
+    assert [snapshot["id"] for snapshot in store.snapshots("game")] == [2]
@@ -0,0 +1,45 @@
+from search_index import SearchIndex
+
+GAMES = {
+    1: {"title": "Dark Souls", "developer": "FromSoftware", "genre": "RPG"},
+    2: {"title": "Dragon Quest", "developer": "Square Enix", "genre": "RPG"},
+    3: {"title": "Space Tactics", "developer": "Studio 42", "genre": "Strategy"},
+    4: {"title": "The Dark Knight", "developer": "Studio 7", "genre": "Action"},
+}
+
+def index_of(games):
+    index = SearchIndex()
+    for game_id, game in games.items():
+        index.add(game_id, game)
+    return index
+
+def test_every_word_has_to_match():
+    index = index_of(GAMES)
+    assert index.search("dark souls") == [1]
+    assert index.search("studio", ["developer"]) in ([3, 4], [4, 3])
+    assert index.search("dark space") == []
+
+def test_titles_starting_with_the_word_rank_first():
+    assert index_of(GAMES).search("dark", ["title"]) == [1, 4]
+
+def test_substrings_and_prefixes_match():
+    index = index_of(GAMES)
+    assert index.search("tact", ["title"]) == [3]
+    assert index.search("ouls", ["title"]) == [1]
+
+def test_typos_fall_back_to_fuzzy_matching():
+    index = index_of(GAMES)
+    assert index.search("drak souls", ["title"]) == [1]
+    assert index.search("tcatics", ["title"]) == [3]
+    assert index.search("drak", ["title"], limit=1) == [1]
+
+def test_limit_keeps_the_best_matches():
+    index = index_of(GAMES)
+    assert index.search("dark", ["title"], limit=1) == index.search("dark", ["title"])[:1]
+
+def test_removed_games_are_no_longer_found():
+    index = index_of(GAMES)
+    index.remove(1, GAMES[1])
+    assert index.search("dark", ["title"]) == [4]
+    assert index.search("souls") == []
+    assert "souls" not in index.token_counts
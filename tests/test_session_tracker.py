@@ -0,0 +1,95 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from process_snapshot import ProcessSnapshotService
+from session_tracker import SessionTracker
+
+class Sessions:
+    """
+    Collects on_session_end calls and lets a test wait for them.
+    """
+    def __init__(self):
+        self.ended = []
+        self._condition = threading.Condition()
+
+    def __call__(self, game_id, start, end):
+        with self._condition:
+            self.ended.append((game_id, end - start))
+            self._condition.notify_all()
+
+    def wait_for(self, count, timeout=10):
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self.ended) >= count, timeout)
+
+@pytest.fixture
+def service():
+    snapshot_service = ProcessSnapshotService(interval=0.1)
+    snapshot_service.start()
+    yield snapshot_service
+    snapshot_service.stop()
+
+@pytest.fixture
+def game_folder(tmp_path):
+    """
+    Returns install(name): a copy of sleep as tmp_path/<name>/game, so each
+    stand-in game has its own executable and folder.
+    """
+    sleep = shutil.which("sleep")
+    if sleep is None:
+        pytest.skip("needs a sleep executable")
+    def install(name):
+        os.mkdir(tmp_path / name)
+        return str(shutil.copy(os.path.realpath(sleep), tmp_path / name / "game"))
+    return install
+
+def test_direct_launch_is_recorded_once(service, game_folder):
+    sessions = Sessions()
+    tracker = SessionTracker(sessions, service)
+    game = game_folder("direct")
+    process = subprocess.Popen([game, "0.5"])
+    tracker.track_process("direct", process, game)
+    # Tracking the same game again while it runs is ignored
+    tracker.track_process("direct", process, game)
+    assert sessions.wait_for(1)
+    time.sleep(0.3)
+    assert [game_id for game_id, _ in sessions.ended] == ["direct"]
+    assert 0.3 < sessions.ended[0][1] < 5
+    assert tracker.active_sessions() == {}
+
+def test_launcher_hands_over_to_the_game(service, game_folder):
+    sessions = Sessions()
+    tracker = SessionTracker(sessions, service)
+    game = game_folder("launcher")
+    launcher = subprocess.Popen([sys.executable, "-c", f"import subprocess; subprocess.Popen([{game!r}, '1'])"])
+    tracker.track_process("launcher", launcher, game)
+    assert sessions.wait_for(1)
+    assert sessions.ended[0][1] >= 0.8
+
+def test_steam_launch_starts_when_the_executable_appears(service, game_folder):
+    sessions = Sessions()
+    tracker = SessionTracker(sessions, service)
+    game = game_folder("steam")
+    tracker.track_executable("steam", game)
+    process = subprocess.Popen([game, "0.5"]) # what Steam would start
+    assert sessions.wait_for(1)
+    process.wait()
+    assert sessions.ended[0][0] == "steam"
+
+def test_stop_hands_back_running_sessions_and_reports_nothing_later(service, game_folder):
+    sessions = Sessions()
+    tracker = SessionTracker(sessions, service)
+    game = game_folder("running")
+    process = subprocess.Popen([game, "0.3"])
+    tracker.track_process("running", process, game)
+    running = tracker.stop()
+    assert list(running) == ["running"]
+    process.wait()
+    time.sleep(0.5)
+    assert sessions.ended == []
+    # Nothing new is tracked after stop
+    tracker.track_process("later", subprocess.Popen([game, "0"]), game)
+    assert tracker.active_sessions() == {}
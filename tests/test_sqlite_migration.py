@@ -0,0 +1,36 @@
+import json
+import pytest
+from library_schema import SCHEMA_VERSION
+from sqlite_game_manager import SQLiteGameManager, migrate_from_json
+
+def write_library(path, titles):
+    games = [{"id": f"{number:032x}", "title": title, "platform": "PC", "genre": "Action"}
+             for number, title in enumerate(titles)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"schema_version": SCHEMA_VERSION, "games": games}, f)
+
+def test_migration_moves_the_library_into_place(tmp_path):
+    json_file, db_file = str(tmp_path / "games.json"), str(tmp_path / "games.db")
+    write_library(json_file, ["Portal", "Half-Life"])
+    assert migrate_from_json(json_file, db_file) == 2
+    manager = SQLiteGameManager(db_file)
+    assert sorted(game["title"] for game in manager.iter_games()) == ["Half-Life", "Portal"]
+    manager.close()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["games.db", "games.json"]
+
+def test_failed_migration_leaves_no_database(tmp_path, monkeypatch):
+    json_file, db_file = str(tmp_path / "games.json"), str(tmp_path / "games.db")
+    write_library(json_file, ["Portal", "Half-Life"])
+    inserted = []
+    def failing_insert(self, game):
+        inserted.append(game)
+        if len(inserted) == 2:
+            raise OSError("disk full")
+    monkeypatch.setattr(SQLiteGameManager, "_insert_game", failing_insert)
+    with pytest.raises(OSError):
+        migrate_from_json(json_file, db_file)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["games.json"]
+
+    # The next start migrates again
+    monkeypatch.undo()
+    assert migrate_from_json(json_file, db_file) == 2
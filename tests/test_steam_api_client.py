@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import pytest
+import requests
+from steam_api_client import SteamApiClient, SteamApiError
+from steam_workshop_integrator import SteamWorkshopIntegrator
+
+class FailingSession:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        raise self.error
+
+def client_with(error):
+    client = SteamApiClient(base_url="http://127.0.0.1:9", max_retries=2, backoff=0, rate=1000, burst=100)
+    client.session = FailingSession(error)
+    return client
+
+@pytest.mark.parametrize("error", [requests.exceptions.TooManyRedirects("loop"),
+                                   requests.exceptions.ChunkedEncodingError("cut off"),
+                                   requests.exceptions.InvalidURL("bad")])
+def test_other_request_errors_become_steam_api_errors_without_retrying(error):
+    client = client_with(error)
+    with pytest.raises(SteamApiError):
+        client.get("ISteamUser/GetFriendList/v1/", {"steamid": "1"})
+    assert client.session.calls == 1
+
+def test_connection_errors_are_retried():
+    client = client_with(requests.exceptions.ConnectionError("refused"))
+    with pytest.raises(SteamApiError):
+        client.get("ISteamUser/GetFriendList/v1/", {"steamid": "1"})
+    assert client.session.calls == 3
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    A local stand-in for api.steampowered.com. hits counts the requests
+    per path.
+    """
+    protocol_version = "HTTP/1.1"
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        hits = self.hits[path] = self.hits.get(path, 0) + 1
+        status, body, headers = 200, {"ok": True}, {}
+        if path == "/flaky/": # fails twice, then works
+            if hits <= 2:
+                status = 503
+        elif path == "/limited/":
+            if hits == 1:
+                status, headers = 429, {"Retry-After": "1"}
+        elif path == "/slow/":
+            time.sleep(2)
+        elif path == "/pause/":
+            time.sleep(0.3)
+        elif path == "/ISteamUser/GetPlayerSummaries/v2/":
+            steam_ids = params["steamids"].split(",")
+            if len(steam_ids) > 100:
+                status = 400
+            body = {"response": {"players": [{"steamid": steamid} for steamid in reversed(steam_ids)]}}
+        elif path == "/IPublishedFileService/GetDetails/v1/":
+            body = {"response": {"publishedfiledetails": [{"publishedfileid": value} for key, value in params.items()
+                                                          if key.startswith("publishedfileids")]}}
+        else:
+            status = 404
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except BrokenPipeError:
+            pass # the client timed out first
+
+@pytest.fixture
+def server():
+    StandInHandler.hits = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def client(server):
+    steam_client = SteamApiClient(base_url=server, timeout=(1.0, 1.0), backoff=0.01, rate=1000, burst=100)
+    yield steam_client
+    steam_client.close()
+
+def test_server_errors_are_retried(client):
+    assert client.get("flaky/") == {"ok": True}
+    assert StandInHandler.hits["/flaky/"] == 3
+
+def test_retry_after_is_honoured(client):
+    started = time.monotonic()
+    assert client.get("limited/") == {"ok": True}
+    assert time.monotonic() - started >= 1
+    assert StandInHandler.hits["/limited/"] == 2
+
+def test_client_errors_are_not_retried(client):
+    with pytest.raises(SteamApiError) as raised:
+        client.get("missing/")
+    assert raised.value.status == 404
+    assert StandInHandler.hits["/missing/"] == 1
+
+def test_read_timeout_raises(server):
+    client = SteamApiClient(base_url=server, timeout=(1.0, 0.2), max_retries=1, backoff=0)
+    with pytest.raises(SteamApiError):
+        client.get("slow/")
+    assert StandInHandler.hits["/slow/"] == 2
+
+def test_identical_requests_in_flight_share_one_call(client):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first, second = executor.map(lambda _: client.get("pause/", {"id": "7"}), range(2))
+    assert first == second and first is not second
+    assert StandInHandler.hits["/pause/"] == 1
+
+def test_different_requests_are_not_coalesced(client):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda number: client.get("pause/", {"id": str(number)}), range(2)))
+    assert StandInHandler.hits["/pause/"] == 2
+
+def test_player_summaries_are_batched_deduplicated_and_in_order(client):
+    pytest.importorskip("winreg") # steam_integrator reads the Steam path from the registry
+    from steam_integrator import get_steam_player_summaries
+    steam_ids = [str(76561190000000000 + number) for number in range(250)]
+    players = get_steam_player_summaries("key", steam_ids + steam_ids[:50], client=client)
+    assert [player["steamid"] for player in players] == steam_ids
+    assert StandInHandler.hits["/ISteamUser/GetPlayerSummaries/v2/"] == 3
+
+def test_workshop_details_keep_the_requested_order(client):
+    ids = [str(number) for number in range(300, 0, -1)]
+    details = SteamWorkshopIntegrator(api_key="key", client=client).get_workshop_item_details(ids)
+    assert [item["publishedfileid"] for item in details["items"]] == ids
+    assert StandInHandler.hits["/IPublishedFileService/GetDetails/v1/"] == 3
@@ -0,0 +1,76 @@
+import pytest
+from steam_workshop_integrator import (PROJECTIONS, FIELD_PARSERS, SEARCH_PROJECTION, DETAILS_PROJECTION,
+                                       SteamWorkshopIntegrator, get_details_params, parse_workshop_items,
+                                       query_files_params)
+
+ITEM = {
+    "publishedfileid": "42", "title": "Red hat", "creator": "7", "preview_url": "https://example.com/hat.jpg",
+    "short_description": "A hat", "file_description": "A red hat for the heavy",
+    "tags": [{"tag": "Hats", "display_name": "Hats"}], "kvtags": [{"key": "class", "value": "heavy"}],
+    "subscriptions": 10, "favorited": 2, "views": 300, "vote_data": {"score": 0.9, "votes_up": 9, "votes_down": 1},
+    "children": [{"publishedfileid": "43", "sortorder": 0, "file_type": 0}],
+    "previews": [{"previewid": "1", "url": "https://example.com/preview.jpg"}, {"previewid": "2", "youtubevideoid": "x"}],
+    "walkthrough": [{"step": 1, "text": "Wear it"}], "playtime_stats": {"playtime_seconds": "60", "num_sessions": "1"},
+    "for_sale_data": {"is_for_sale": False}, "file_size": "1000", "lifetime_playtime": "123",
+}
+
+class RecordingClient:
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def get(self, path, params=None):
+        self.calls.append((path, params))
+        return self.data
+
+    def get_many(self, calls):
+        return [self.get(*call) for call in calls]
+
+@pytest.mark.parametrize("profile", sorted(PROJECTIONS))
+def test_items_keep_exactly_the_profile_fields(profile):
+    items = parse_workshop_items({"response": {"publishedfiledetails": [ITEM]}}, profile)
+    assert list(items[0]) == list(PROJECTIONS[profile]["fields"])
+
+@pytest.mark.parametrize("profile", sorted(PROJECTIONS))
+def test_every_field_has_a_parser(profile):
+    assert set(PROJECTIONS[profile]["fields"]) <= set(FIELD_PARSERS)
+
+def test_list_profile_asks_for_little():
+    params = query_files_params("key", 440, profile="list")
+    assert [key for key in params if key.startswith("return_")] == ["return_short_description"]
+    items = parse_workshop_items({"response": {"publishedfiledetails": [ITEM]}}, "list")
+    assert items == [{"title": "Red hat", "description": "A red hat for the heavy", "publishedfileid": "42",
+                      "creator": "7", "preview_url": "https://example.com/hat.jpg"}]
+
+def test_full_profile_reads_the_extra_sections_it_asks_for():
+    item = parse_workshop_items({"response": {"publishedfiledetails": [ITEM]}}, "full")[0]
+    assert item["children"] == ["43"]
+    assert item["previews"] == ["https://example.com/preview.jpg"]
+    assert item["walkthrough"] == ITEM["walkthrough"]
+    assert item["vote_data"] == ITEM["vote_data"]
+    assert item["playtime_stats"] == ITEM["playtime_stats"]
+    assert item["for_sale_data"] == ITEM["for_sale_data"]
+
+def test_missing_sections_get_empty_values():
+    item = parse_workshop_items({"response": {"publishedfiledetails": [{"publishedfileid": "1"}]}}, "full")[0]
+    assert item["children"] == [] and item["previews"] == [] and item["vote_data"] == {}
+    assert item["title"] == "N/A" and item["description"] == "N/A"
+
+def test_unknown_profile_raises():
+    with pytest.raises(ValueError):
+        query_files_params("key", 440, profile="everything")
+
+def test_module_defaults_match_the_method_defaults():
+    assert SEARCH_PROJECTION == "list" and DETAILS_PROJECTION == "detail"
+    assert "return_short_description" in query_files_params("key", 440)
+    assert "includetags" in get_details_params("key", ["1"])
+
+def test_search_and_details_use_their_default_profiles():
+    client = RecordingClient({"response": {"totalcount": 1, "publishedfiledetails": [ITEM]}})
+    integrator = SteamWorkshopIntegrator(api_key="key", client=client)
+    results = integrator.search_workshop_items(440, "hat")
+    assert list(results["items"][0]) == list(PROJECTIONS["list"]["fields"])
+    assert "return_tags" not in client.calls[-1][1]
+    details = integrator.get_workshop_item_details(["42"])
+    assert list(details["items"][0]) == list(PROJECTIONS["detail"]["fields"])
+    assert client.calls[-1][1]["includetags"] == 1
@@ -0,0 +1,25 @@
+import vdf_parser
+from vdf_parser import read_values
+
+KEYS = ("appid", "name", "installdir")
+
+def test_read_values_matches_loads_on_a_manifest():
+    text = vdf_parser._synthetic_manifest(620)
+    app_state = vdf_parser.loads(text)["AppState"]
+    assert read_values(text, "AppState", KEYS) == {key: app_state[key] for key in KEYS}
+
+def test_read_values_stops_at_the_first_nested_block():
+    text = '"AppState" { "appid" "1" "UserConfig" { "name" "nested" } "name" "late" }'
+    assert read_values(text, "AppState", KEYS) == {"appid": "1"}
+
+def test_read_values_handles_escaped_quotes_before_braces():
+    text = '"AppState"\n{\n\t"name"\t\t"a \\"quoted\\"{ title"\n\t"appid"\t\t"5"\n}'
+    assert read_values(text, "AppState", KEYS) == {"name": 'a "quoted"{ title', "appid": "5"}
+
+def test_read_values_rejects_other_blocks_and_short_text():
+    for text in ("", "{", '"AppState"', '"Other" { "appid" "1" }', '\ufeff"Other" { }'):
+        assert read_values(text, "AppState", KEYS) is None
+    assert read_values('\ufeff"appstate" { "AppID" "7" }', "AppState", KEYS) == {"appid": "7"}
+
+def test_read_values_leaves_comments_to_loads():
+    assert read_values('"AppState" { // installed by hand\n "appid" "1" }', "AppState", KEYS) is None
@@ -0,0 +1,68 @@
+import os
+import pytest
+from workshop_inventory import WorkshopInventory
+
+def install(lib_folder, appid, item_ids, downloaded=True):
+    """
+    Writes appid's appworkshop manifest listing item_ids and, if
+    downloaded, a 100-byte file in each item folder.
+    """
+    workshop_folder = os.path.join(lib_folder, "workshop")
+    os.makedirs(workshop_folder, exist_ok=True)
+    entries = []
+    for item_id in item_ids:
+        if downloaded:
+            item_folder = os.path.join(workshop_folder, "content", str(appid), str(item_id))
+            os.makedirs(item_folder)
+            with open(os.path.join(item_folder, "item.bin"), "wb") as f:
+                f.write(b"x" * 100)
+        entries.append(f'"{item_id}" {{ "size" "100" "timeupdated" "1700000000" }}')
+    with open(os.path.join(workshop_folder, f"appworkshop_{appid}.acf"), "w") as f:
+        f.write(f'"AppWorkshop" {{ "appid" "{appid}" "WorkshopItemsInstalled" {{ {" ".join(entries)} }} }}')
+
+@pytest.fixture
+def libraries(tmp_path):
+    folders = [str(tmp_path / name / "steamapps") for name in ("C", "D")]
+    install(folders[0], 440, [1, 2])
+    install(folders[1], 620, [3])
+    return folders
+
+def test_items_of_every_library_are_listed(libraries, tmp_path):
+    inventory = WorkshopInventory(libraries, str(tmp_path / "cache.json"))
+    assert inventory.refresh() == 3
+    assert inventory.app_ids() == {"440", "620"}
+    assert [item["id"] for item in inventory.items(440)] == ["1", "2"]
+    assert inventory.content_paths(620) == [os.path.join(libraries[1], "workshop", "content", "620", "3")]
+    assert inventory.items(440)[0]["disk_usage"] == 100
+    assert inventory.total_disk_usage(440) == 200
+
+def test_items_not_downloaded_yet_are_left_out(libraries, tmp_path):
+    install(libraries[0], 730, [4], downloaded=False)
+    inventory = WorkshopInventory(libraries, str(tmp_path / "cache.json"))
+    inventory.refresh()
+    assert inventory.items(730) == []
+
+def test_only_changed_items_are_measured_again(libraries, tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    WorkshopInventory(libraries, cache_file).refresh()
+    item_folder = os.path.join(libraries[1], "workshop", "content", "620", "3")
+    with open(os.path.join(item_folder, "new.bin"), "wb") as f:
+        f.write(b"x" * 50)
+    os.utime(item_folder, ns=(10 ** 18, 10 ** 18))
+
+    inventory = WorkshopInventory(libraries, cache_file)
+    assert inventory.refresh() == 1
+    assert inventory.total_disk_usage(620) == 150
+    assert inventory.refresh() == 0
+
+def test_staleness_follows_the_manifests(libraries, tmp_path):
+    inventory = WorkshopInventory(libraries, str(tmp_path / "cache.json"))
+    assert inventory.is_stale()
+    inventory.refresh()
+    assert not inventory.is_stale()
+    assert inventory.refresh_if_stale() is None
+
+    os.utime(os.path.join(libraries[0], "workshop", "appworkshop_440.acf"), ns=(0, 0))
+    assert inventory.is_stale()
+    assert inventory.refresh_if_stale() == 0
+    assert inventory.refresh_if_stale() is None
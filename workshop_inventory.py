@@ -0,0 +1,304 @@
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from library_persistence import atomic_write_json
+import vdf_parser
+
+CACHE_VERSION = 1
+WORKSHOP_CACHE_FILE = os.path.join(os.path.dirname(__file__), "workshop_cache.json")
+_APPWORKSHOP_FILE = re.compile(r"appworkshop_(\d+)\.acf", re.IGNORECASE)
+
+def _section(data, name):
+    section = next((value for key, value in data.items() if key.lower() == name), None)
+    return section if isinstance(section, dict) else {}
+
+def _int(value):
+    return int(value) if isinstance(value, str) and value.isdigit() else 0
+
+def parse_appworkshop_file(acf_path):
+    """
+    Reads an appworkshop_<appid>.acf. Returns {item id: {"size",
+    "timeupdated", "timetouched"}} for the items Steam has installed.
+    """
+    items = {}
+    try:
+        data = vdf_parser.load(acf_path)
+    except (OSError, ValueError) as e:
+        print(f"Error parsing workshop manifest {acf_path}: {e}")
+        return items
+    app_workshop = _section(data, "appworkshop")
+    details = _section(app_workshop, "workshopitemdetails")
+    for item_id, item in _section(app_workshop, "workshopitemsinstalled").items():
+        if not isinstance(item, dict):
+            continue
+        fields = {key.lower(): value for key, value in item.items()}
+        detail = details.get(item_id)
+        detail = {key.lower(): value for key, value in detail.items()} if isinstance(detail, dict) else {}
+        items[item_id] = {
+            "size": _int(fields.get("size")),
+            "timeupdated": _int(fields.get("timeupdated") or detail.get("timeupdated")),
+            "timetouched": _int(detail.get("timetouched")),
+        }
+    return items
+
+def _disk_usage(path):
+    total = 0
+    pending = [path]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+class WorkshopInventory:
+    """
+    The Workshop items installed in every Steam library folder, read from
+    the appworkshop_<appid>.acf manifests and workshop/content/<appid>.
+
+    refresh reparses only manifests whose mtime or size changed, and
+    measures an item's disk usage again only when its folder's mtime or
+    the manifest's timeupdated changed; the measurements run on a thread
+    pool and are kept in cache_file between runs. Lookups read the
+    in-memory inventory and never touch the disk; is_stale tells, from a
+    few stats, whether Steam has changed a workshop folder since.
+    """
+    def __init__(self, library_folders, cache_file=WORKSHOP_CACHE_FILE):
+        self.library_folders = list(library_folders)
+        self.cache_file = cache_file
+        self.manifests = {} # manifest path -> {"mtime_ns", "size", "appid", "items"}
+        self.disk_usage = {} # item folder -> {"mtime_ns", "timeupdated", "bytes"}
+        self._items = {} # appid -> {item id: item}
+        self.folder_mtimes = {} # workshop and content/<appid> folder -> mtime_ns, None if missing
+        self.manifest_stamps = {} # manifest path -> (mtime_ns, size) as of the last refresh
+        self.refreshed = False
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable workshop cache {self.cache_file}: {e}")
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.manifests = data.get("manifests", {})
+            self.disk_usage = data.get("disk_usage", {})
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            document = {"version": CACHE_VERSION, "manifests": dict(self.manifests), "disk_usage": dict(self.disk_usage)}
+            self._dirty = False
+        try:
+            atomic_write_json(self.cache_file, document, indent=None)
+        except OSError as e:
+            print(f"Error saving workshop cache: {e}")
+
+    def _manifest_items(self, path, stat_result, appid):
+        cached = self.manifests.get(path)
+        if cached and cached["mtime_ns"] == stat_result.st_mtime_ns and cached["size"] == stat_result.st_size:
+            return cached["items"]
+        items = parse_appworkshop_file(path)
+        self.manifests[path] = {"mtime_ns": stat_result.st_mtime_ns, "size": stat_result.st_size,
+                                "appid": appid, "items": items}
+        self._dirty = True
+        return items
+
+    def is_stale(self):
+        """
+        True until the first refresh, and afterwards once a workshop
+        folder, a content/<appid> folder or an appworkshop manifest has
+        changed. Steam rewrites the manifest whenever it installs, updates
+        or removes an item, so this never has to walk the item folders.
+        """
+        if not self.refreshed:
+            return True
+        with self._lock:
+            folder_mtimes, manifest_stamps = self.folder_mtimes, self.manifest_stamps
+        for folder, mtime_ns in folder_mtimes.items():
+            if _mtime_ns(folder) != mtime_ns:
+                return True
+        for path, (mtime_ns, size) in manifest_stamps.items():
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                return True
+            if (stat_result.st_mtime_ns, stat_result.st_size) != (mtime_ns, size):
+                return True
+        return False
+
+    def refresh_if_stale(self, workers=8):
+        """
+        Refreshes the inventory if is_stale. Returns the number of item
+        folders measured, or None if the inventory was up to date.
+        """
+        with self._refresh_lock:
+            return self._refresh(workers) if self.is_stale() else None
+
+    def refresh(self, workers=8):
+        """
+        Rebuilds the inventory from the library folders and saves the cache.
+        Returns the number of item folders whose disk usage was measured.
+        Refreshes from several threads run one after the other.
+        """
+        with self._refresh_lock:
+            return self._refresh(workers)
+
+    def _refresh(self, workers):
+        inventory = {}
+        manifest_stats = {}
+        # Taken before scanning, so a change made during the scan leaves the inventory stale
+        folder_mtimes = {}
+        for lib_folder in self.library_folders:
+            workshop_folder = os.path.join(lib_folder, "workshop")
+            folder_mtimes[workshop_folder] = _mtime_ns(workshop_folder)
+            try:
+                with os.scandir(workshop_folder) as entries:
+                    manifests = [(entry.path, entry.stat(), match.group(1)) for entry in entries
+                                 for match in [_APPWORKSHOP_FILE.fullmatch(entry.name)] if match]
+            except OSError:
+                continue
+            for path, stat_result, appid in manifests:
+                manifest_stats[path] = stat_result
+                content_folder = os.path.join(workshop_folder, "content", appid)
+                folder_mtimes[content_folder] = _mtime_ns(content_folder)
+                for item_id, item in self._manifest_items(path, stat_result, appid).items():
+                    item = dict(item, id=item_id, path=os.path.join(content_folder, item_id))
+                    inventory.setdefault(appid, {})[item_id] = item
+        for path in [path for path in self.manifests if path not in manifest_stats]:
+            del self.manifests[path]
+            self._dirty = True
+
+        # Items whose folder is missing are in the manifest but not downloaded yet
+        to_measure = []
+        folders_seen = set()
+        for items in inventory.values():
+            for item_id, item in list(items.items()):
+                try:
+                    mtime_ns = os.stat(item["path"]).st_mtime_ns
+                except OSError:
+                    del items[item_id]
+                    continue
+                folders_seen.add(item["path"])
+                cached = self.disk_usage.get(item["path"])
+                if cached and cached["mtime_ns"] == mtime_ns and cached["timeupdated"] == item["timeupdated"]:
+                    item["disk_usage"] = cached["bytes"]
+                else:
+                    to_measure.append((item, mtime_ns))
+        if to_measure:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                sizes = executor.map(lambda entry: _disk_usage(entry[0]["path"]), to_measure)
+                for (item, mtime_ns), size in zip(to_measure, sizes):
+                    item["disk_usage"] = size
+                    self.disk_usage[item["path"]] = {"mtime_ns": mtime_ns, "timeupdated": item["timeupdated"], "bytes": size}
+            self._dirty = True
+        for path in [path for path in self.disk_usage if path not in folders_seen]:
+            del self.disk_usage[path]
+            self._dirty = True
+
+        with self._lock:
+            self._items = inventory
+            self.folder_mtimes = folder_mtimes
+            self.manifest_stamps = {path: (stat_result.st_mtime_ns, stat_result.st_size)
+                                    for path, stat_result in manifest_stats.items()}
+        self.refreshed = True
+        self.save()
+        return len(to_measure)
+
+    def items(self, appid):
+        """
+        Returns the installed items of appid as dicts with id, path, size
+        (from the manifest), disk_usage, timeupdated and timetouched.
+        """
+        with self._lock:
+            items = self._items.get(str(appid), {})
+            return [dict(item) for _, item in sorted(items.items())]
+
+    def content_paths(self, appid):
+        with self._lock:
+            items = self._items.get(str(appid), {})
+            return [items[item_id]["path"] for item_id in sorted(items)]
+
+    def total_disk_usage(self, appid):
+        with self._lock:
+            return sum(item.get("disk_usage", 0) for item in self._items.get(str(appid), {}).values())
+
+    def app_ids(self):
+        with self._lock:
+            return set(self._items)
+
+if __name__ == "__main__":
+    # Benchmark on a synthesized library: the first refresh measures every
+    # item, the next one only the item that changed.
+    import tempfile
+    import time
+
+    apps, items_per_app, files_per_item = 20, 50, 20
+    with tempfile.TemporaryDirectory() as directory:
+        libraries = [os.path.join(directory, name, "steamapps") for name in ("C", "D")]
+        for library_number, lib_folder in enumerate(libraries):
+            workshop_folder = os.path.join(lib_folder, "workshop")
+            os.makedirs(workshop_folder)
+            for appid in range(library_number * 1000, library_number * 1000 + apps // 2):
+                installed = []
+                for item_id in range(appid * 100, appid * 100 + items_per_app):
+                    item_folder = os.path.join(workshop_folder, "content", str(appid), str(item_id))
+                    os.makedirs(item_folder)
+                    for file_number in range(files_per_item):
+                        with open(os.path.join(item_folder, f"{file_number}.bin"), "wb") as f:
+                            f.write(b"x" * 100)
+                    installed.append(f'"{item_id}" {{ "size" "{files_per_item * 100}" "timeupdated" "1700000000" }}')
+                with open(os.path.join(workshop_folder, f"appworkshop_{appid}.acf"), "w") as f:
+                    f.write(f'"AppWorkshop" {{ "appid" "{appid}" "WorkshopItemsInstalled" {{ {" ".join(installed)} }} }}')
+
+        cache_file = os.path.join(directory, "workshop_cache.json")
+        started = time.perf_counter()
+        measured = WorkshopInventory(libraries, cache_file).refresh()
+        cold = time.perf_counter() - started
+
+        changed_item = os.path.join(libraries[1], "workshop", "content", "1000", "100000")
+        with open(os.path.join(changed_item, "new.bin"), "wb") as f:
+            f.write(b"x" * 50)
+        inventory = WorkshopInventory(libraries, cache_file)
+        started = time.perf_counter()
+        remeasured = inventory.refresh()
+        warm = time.perf_counter() - started
+
+        started = time.perf_counter()
+        inventory.is_stale()
+        stale_check = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for appid in inventory.app_ids():
+            inventory.content_paths(appid)
+        lookups = time.perf_counter() - started
+
+        print(f"{apps} apps, {apps * items_per_app} items over {len(libraries)} libraries")
+        print(f"first refresh: {cold * 1000:.1f} ms ({measured} items measured)")
+        print(f"refresh after one item changed: {warm * 1000:.1f} ms ({remeasured} item measured)")
+        print(f"staleness check: {stale_check * 1000:.2f} ms")
+        print(f"content path lookups for every app: {lookups * 1000:.2f} ms")